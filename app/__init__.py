@@ -11,6 +11,11 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object('config.Config')
 
+    from config import DEFAULT_SECRET_KEY
+    if app.config.get('SECRET_KEY') in (None, '', DEFAULT_SECRET_KEY):
+        # Sessions are forgeable with the published key; invite routes answer 503 until it is set
+        app.logger.warning("SECRET_KEY is not set; set it in the environment to enable invites (see INSTALL.md).")
+
     db.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)  # Initialize Flask-Mail with your app
@@ -23,4 +28,22 @@ def create_app():
         from .routes import app as main_blueprint
         app.register_blueprint(main_blueprint)
 
+        # Register flask CLI commands
+        from .commands import register_commands
+        register_commands(app)
+
+        # Preference names rarely change; snapshot them once per worker
+        from sqlalchemy.exc import SQLAlchemyError
+        from .controllers.preference_taxonomy import load_taxonomy
+        try:
+            load_taxonomy()
+        except SQLAlchemyError:
+            # Tables not created yet (e.g. before the first migration); loaded on first use instead
+            db.session.rollback()
+        db.session.remove()
+
+        # Optionally purge expired invites in the background
+        from .controllers.invite_sweeper import start_invite_sweeper
+        start_invite_sweeper(app)
+
     return app
\ No newline at end of file
@@ -0,0 +1,146 @@
+import click
+from flask import current_app as app
+from flask.cli import AppGroup
+from werkzeug.exceptions import HTTPException
+
+places_cli = AppGroup('places', help='Manage places data sources.')
+groups_cli = AppGroup('groups', help='Maintain group data.')
+geocode_cli = AppGroup('geocode', help='Geocode user addresses.')
+suggestions_cli = AppGroup('suggestions', help='Maintain the similar user index.')
+invites_cli = AppGroup('invites', help='Maintain group invites.')
+
+
+@places_cli.command('import-poi')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_poi(path):
+    """Import a CSV or GeoJSON POI dataset into the local places provider."""
+    from .controllers.places_provider import LocalPlacesProvider
+
+    provider = LocalPlacesProvider(app.config['LOCAL_POI_DATABASE'])
+    count = provider.import_file(path)
+    click.echo(f"Imported {count} places into {app.config['LOCAL_POI_DATABASE']}")
+
+
+@places_cli.command('import-roads')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', type=click.Path(dir_okay=False), help='Graph file to write; defaults to ROAD_GRAPH_FILE.')
+def import_roads(path, output):
+    """Build the routing graph from an OSM XML road extract."""
+    from .controllers.road_routing import RoadGraph
+
+    output = output or app.config.get('ROAD_GRAPH_FILE')
+    if not output:
+        raise click.UsageError('Pass --output or set ROAD_GRAPH_FILE')
+    graph = RoadGraph.from_osm(path)
+    graph.save(output)
+    click.echo(f"Wrote {graph.node_count} nodes and {len(graph.indices)} road segments to {output}")
+
+
+@groups_cli.command('verify-aggregates')
+@click.option('--fix/--no-fix', default=True, help='Overwrite drifted aggregates with recomputed values.')
+@click.option('--batch-size', default=500, show_default=True, help='Groups recomputed per query.')
+def verify_aggregates(fix, batch_size):
+    """Recompute group location aggregates from member rows and report drift.
+
+    Meant to run periodically (e.g. from cron) to catch float drift or
+    writes that bypassed the controllers.
+    """
+    from .controllers.group_aggregates import GroupAggregates
+
+    report = GroupAggregates.verify(fix=fix, batch_size=batch_size)
+    action = 'fixed' if fix else 'found'
+    click.echo(f"Checked {report['checked']} groups, {action} {len(report['drifted'])} with drift")
+    for group_id in report['drifted']:
+        click.echo(f"  group {group_id}")
+
+
+@geocode_cli.command('import-gazetteer')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_gazetteer(path):
+    """Import a CSV of named places (name, lat, lng) into the local gazetteer."""
+    from .controllers.geocoding import GazetteerGeocoder
+
+    geocoder = GazetteerGeocoder(app.config['GAZETTEER_DATABASE'])
+    count = geocoder.import_file(path)
+    click.echo(f"Imported {count} names into {app.config['GAZETTEER_DATABASE']}")
+
+
+@geocode_cli.command('users')
+@click.option('--workers', type=int, help='Concurrent lookups; defaults to GEOCODE_MAX_WORKERS.')
+@click.option('--rate', type=float, help='Lookups per second; defaults to GEOCODE_RATE_PER_SECOND.')
+@click.option('--batch-size', default=200, show_default=True, help='Users loaded and committed per batch.')
+def geocode_users(workers, rate, batch_size):
+    """Geocode the address of every user without coordinates.
+
+    Addresses already in the geocode cache cost no lookups, so the command
+    is safe to re-run; lookups that failed upstream are retried next time.
+    """
+    from .controllers.user_controller import UserController
+
+    report = UserController.geocode_missing_locations(batch_size=batch_size, max_workers=workers, per_second=rate)
+    click.echo(
+        f"Checked {report['checked']} users: {report['located']} located, "
+        f"{report['not_found']} not found, {report['failed']} failed"
+    )
+
+
+@suggestions_cli.command('rebuild')
+@click.option('--batch-size', default=5000, show_default=True, help='Users indexed per transaction.')
+def rebuild_suggestions(batch_size):
+    """Recompute every user's preference signature and LSH buckets."""
+    from .controllers.suggestion_controller import SuggestionController
+
+    count = SuggestionController.rebuild(batch_size=batch_size)
+    click.echo(f"Indexed {count} users")
+
+
+@invites_cli.command('sweep')
+@click.option('--batch-size', type=int, help='Rows deleted per transaction; defaults to INVITE_SWEEP_BATCH_SIZE.')
+@click.option('--pause', type=float, help='Seconds between batches; defaults to INVITE_SWEEP_PAUSE.')
+def sweep_invites(batch_size, pause):
+    """Delete expired invite tokens and revocations in small batches."""
+    from .controllers.invite_sweeper import purge_expired_invites
+
+    report = purge_expired_invites(batch_size=batch_size, pause=pause)
+    click.echo(
+        f"Purged {report['invite_tokens']} invite tokens and {report['revoked_invites']} revocations "
+        f"in {report['seconds']:.2f}s"
+    )
+
+
+@invites_cli.command('generate')
+@click.argument('group_id', type=int)
+@click.option('--count', default=1, show_default=True, help='Invite links to generate, one per line.')
+def generate_invites(group_id, count):
+    """Print invite links for a group, e.g. to mail to a cohort."""
+    from .controllers.invitetoken_controller import InviteTokenController
+
+    try:
+        tokens = InviteTokenController.generate_invite_tokens(group_id, count)
+    except HTTPException as e:
+        raise click.ClickException(e.description)
+    for token in tokens:
+        click.echo(app.config['BASE_URL'] + '/join-group/' + token)
+
+
+@invites_cli.command('import-members')
+@click.argument('group_id', type=int)
+@click.argument('path', type=click.File('r', encoding='utf-8'))
+@click.option('--batch-size', default=500, show_default=True, help='Rows inserted per transaction.')
+def import_members(group_id, path, batch_size):
+    """Add the users listed in a CSV file (user_id and/or email columns) to a group."""
+    from .controllers.group_controller import GroupController
+
+    report = GroupController.import_members(group_id, path, batch_size=batch_size)
+    click.echo(
+        f"Read {report['rows']} rows: {report['added']} added, "
+        f"{report['skipped']} already members, {report['unknown']} unknown users"
+    )
+
+
+def register_commands(app):
+    app.cli.add_command(places_cli)
+    app.cli.add_command(groups_cli)
+    app.cli.add_command(geocode_cli)
+    app.cli.add_command(suggestions_cli)
+    app.cli.add_command(invites_cli)
@@ -1,24 +1,21 @@
 import requests
-import googlemaps
 from . import group_controller
-from config import API_KEY
-# Assuming you have the Google Maps client set up with your API key
-gmaps = googlemaps.Client(key=API_KEY)
+from flask import current_app as app
+from .places_provider import get_places_provider
+from .meeting_point import find_meeting_point
 
 def find_central_spot(group_id):
     # This would be replaced with your actual method to get locations
     member_locations = group_controller.GroupController.get_group_member_locations(group_id)
     
-    # Calculate centroid
-    avg_lat = sum(location[0] for location in member_locations) / len(member_locations)
-    avg_lng = sum(location[1] for location in member_locations) / len(member_locations)
-    centroid = (avg_lat, avg_lng)
+    # Calculate the meeting point
+    centroid = find_meeting_point(member_locations, app.config.get('MEETING_POINT_OBJECTIVE', 'median'))
 
     # Get preferences - this would be replaced with your actual method
     preferences = group_controller.GroupController.get_group_member_preferences(group_id)
 
     # Now use the Google Places API to find places near the centroid
-    places_result = gmaps.places_nearby(location=centroid, radius=5000, type='restaurant')
+    places_result = get_places_provider().places_nearby(location=centroid, radius=5000, type='restaurant')
 
     # Filter these places based on preferences (not shown)
     # ...
@@ -0,0 +1,298 @@
+import csv
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import googlemaps
+from flask import current_app as app
+from app import db
+from app.models import GeocodeEntry
+from utils.func import parse_lat_long
+from .places_guard import TokenBucket
+from .storage import SQLiteFileStore, cache_write
+
+
+def normalize_address(address):
+    """
+    Normalizes an address so trivially different spellings share one cache entry.
+
+    Case, accents, punctuation other than commas and repeated whitespace
+    are folded away, e.g. "  12 Oxford St.,  Osu " -> "12 oxford st, osu".
+    """
+    text = unicodedata.normalize('NFKD', address).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'[^\w,]+', ' ', text.casefold())
+    parts = [' '.join(part.split()) for part in text.split(',')]
+    return ', '.join(part for part in parts if part)[:255]
+
+
+class Geocoder:
+    """
+    Interface for address geocoders.
+
+    geocode takes a normalized address and returns a (lat, lng) tuple, or
+    None when the address is unknown. Upstream failures raise, so they are
+    not cached as misses.
+    """
+
+    name = 'base'
+
+    def geocode(self, address):
+        raise NotImplementedError
+
+
+class GoogleGeocoder(Geocoder):
+    """Geocoder backed by the Google Geocoding API."""
+
+    name = 'google'
+
+    def __init__(self, api_key, timeout=None):
+        self.client = googlemaps.Client(key=api_key, timeout=timeout)
+
+    def geocode(self, address):
+        results = self.client.geocode(address)
+        if not results:
+            return None
+        location = results[0]['geometry']['location']
+        return location['lat'], location['lng']
+
+
+class GazetteerGeocoder(SQLiteFileStore, Geocoder):
+    """
+    Offline geocoder backed by a gazetteer of named places.
+
+    Names live in a SQLite file keyed by their normalized form. An address
+    that is not itself a known name is retried without its leading
+    comma-separated parts, so "12 oxford st, osu, accra" resolves to Osu
+    when only neighbourhoods and towns are known.
+    """
+
+    name = 'gazetteer'
+
+    def create_schema(self):
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS gazetteer (
+                name TEXT PRIMARY KEY,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+
+    def import_file(self, path):
+        """
+        Imports named places from a CSV file with name, lat and lng columns.
+
+        Returns:
+        - Number of names imported.
+        """
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [
+                (normalize_address(row['name']), float(row['lat']), float(row['lng']))
+                for row in csv.DictReader(f)
+            ]
+        conn = self._connection()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO gazetteer (name, lat, lng) VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+    def geocode(self, address):
+        parts = address.split(', ')
+        candidates = [', '.join(parts[start:]) for start in range(len(parts))]
+        rows = self._connection().execute(
+            f"SELECT name, lat, lng FROM gazetteer WHERE name IN ({', '.join('?' * len(candidates))})",
+            candidates
+        ).fetchall()
+        found = {name: (lat, lng) for name, lat, lng in rows}
+        # The longest matching suffix is the most specific location
+        for candidate in candidates:
+            if candidate in found:
+                return found[candidate]
+        return None
+
+
+_geocoders = {}
+_geocoders_lock = threading.Lock()
+
+def get_geocoder(name=None):
+    """
+    Returns the configured geocoder, creating it on first use.
+
+    Parameters:
+    - name: 'google' or 'gazetteer'. Defaults to the GEOCODER setting.
+
+    Raises:
+    - ValueError: The geocoder name is unknown.
+    """
+    name = name or app.config.get('GEOCODER', 'google')
+    with _geocoders_lock:
+        geocoder = _geocoders.get(name)
+        if geocoder is None:
+            if name == 'google':
+                geocoder = GoogleGeocoder(app.config['API_KEY'], timeout=app.config.get('PLACES_API_TIMEOUT'))
+            elif name == 'gazetteer':
+                geocoder = GazetteerGeocoder(app.config['GAZETTEER_DATABASE'])
+            else:
+                raise ValueError(f"Unknown geocoder: {name}")
+            _geocoders[name] = geocoder
+        return geocoder
+
+
+class GeocodeCache:
+    """
+    Persistent cache of normalized address -> coordinates.
+
+    Found addresses are kept indefinitely; misses are cached too, for
+    GEOCODE_MISS_TTL seconds, so repeatedly submitted unknown addresses
+    do not reach the geocoder either.
+    """
+
+    @staticmethod
+    def get_many(addresses):
+        """
+        Looks up cached geocodes.
+
+        Parameters:
+        - addresses: Iterable of normalized addresses.
+
+        Returns:
+        - A dict of address -> (lat, lng) tuple, or None for a cached miss.
+        """
+        addresses = list(addresses)
+        if not addresses:
+            return {}
+        miss_ttl = app.config.get('GEOCODE_MISS_TTL', 86400)
+        entries = GeocodeEntry.query.filter(GeocodeEntry.address.in_(addresses)).all()
+        return {
+            entry.address: (entry.latitude, entry.longitude) if entry.found else None
+            for entry in entries
+            if entry.found or not entry.is_expired(miss_ttl)
+        }
+
+    @staticmethod
+    def set_many(locations, provider, commit=True):
+        """
+        Stores geocodes, replacing existing entries.
+
+        Parameters:
+        - locations: A dict of normalized address -> (lat, lng) tuple or None.
+        - provider: Name of the geocoder that produced them.
+        - commit: Commit the entries; when False they are flushed and the
+          caller commits them with its own changes.
+
+        Note:
+        - Cache write failures are rolled back and otherwise ignored.
+        """
+        if not locations:
+            return
+        now = datetime.utcnow()
+        with cache_write(commit):
+            existing = {
+                entry.address: entry
+                for entry in GeocodeEntry.query.filter(GeocodeEntry.address.in_(list(locations)))
+            }
+            for address, location in locations.items():
+                entry = existing.get(address)
+                if entry is None:
+                    entry = GeocodeEntry(address=address)
+                    db.session.add(entry)
+                entry.latitude, entry.longitude = location if location else (None, None)
+                entry.provider = provider
+                entry.created_at = now
+
+
+def _acquire(bucket):
+    # Blocks until the bucket has a token; batch jobs would rather wait than be rejected
+    while not bucket.try_acquire():
+        time.sleep(1.0 / bucket.rate)
+
+
+def geocode_many(addresses, geocoder=None, max_workers=None, per_second=None, commit=True):
+    """
+    Geocodes addresses through the cache, looking up each distinct miss once.
+
+    Cached addresses are answered with one query. The rest go to the
+    geocoder through a bounded worker pool, paced by a token bucket, and
+    their results are written back to the cache in one transaction.
+
+    Parameters:
+    - addresses: Iterable of raw addresses.
+    - geocoder: Geocoder to use; defaults to get_geocoder().
+    - max_workers: Concurrent lookups; defaults to GEOCODE_MAX_WORKERS.
+    - per_second: Lookup rate limit; defaults to GEOCODE_RATE_PER_SECOND.
+    - commit: Commit the new cache entries, see GeocodeCache.set_many.
+
+    Returns:
+    - A tuple (locations, failed): locations maps each normalized address
+      to a (lat, lng) tuple or None when unknown; failed holds the
+      normalized addresses whose lookup raised, which are left uncached.
+    """
+    geocoder = geocoder or get_geocoder()
+    addresses = {normalize_address(address) for address in addresses}
+    addresses.discard('')
+    locations = GeocodeCache.get_many(addresses)
+    pending = sorted(addresses - locations.keys())
+    if not pending:
+        return locations, set()
+
+    bucket = TokenBucket(
+        per_second or app.config.get('GEOCODE_RATE_PER_SECOND', 10), 1.0
+    )
+
+    def lookup(address):
+        _acquire(bucket)
+        return geocoder.geocode(address)
+
+    looked_up = {}
+    failed = set()
+    with ThreadPoolExecutor(max_workers=max_workers or app.config.get('GEOCODE_MAX_WORKERS', 4)) as pool:
+        futures = {address: pool.submit(lookup, address) for address in pending}
+        for address, future in futures.items():
+            try:
+                looked_up[address] = future.result()
+            except Exception:
+                # Upstream errors are not misses; leave them for the next run
+                failed.add(address)
+    GeocodeCache.set_many(looked_up, geocoder.name, commit)
+    locations.update(looked_up)
+    return locations, failed
+
+
+def resolve_location(text):
+    """
+    Resolves what a user typed as their location to coordinates.
+
+    Parameters:
+    - text: Either "lat, long" or a free-form address.
+
+    Returns:
+    - A (latitude, longitude) tuple.
+
+    Raises:
+    - ValueError: The address could not be found, or the geocoder is unavailable.
+    """
+    try:
+        latitude, longitude = parse_lat_long(text)
+        if -90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0:
+            return latitude, longitude
+    except ValueError:
+        pass
+
+    address = normalize_address(text)
+    if not address:
+        raise ValueError("Please enter an address or coordinates as 'lat, long'.")
+    cached = GeocodeCache.get_many([address])
+    if address in cached:
+        location = cached[address]
+    else:
+        geocoder = get_geocoder()
+        try:
+            location = geocoder.geocode(address)
+        except Exception as e:
+            raise ValueError("Address lookup is unavailable right now, please enter coordinates as 'lat, long'.") from e
+        GeocodeCache.set_many({address: location}, geocoder.name)
+    if location is None:
+        raise ValueError("Address not found.")
+    return location
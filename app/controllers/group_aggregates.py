@@ -0,0 +1,264 @@
+import math
+import numpy as np
+from sqlalchemy import case, or_
+from flask import current_app as app
+from app import db
+from app.models import Group, GroupMember, User
+from utils.geo import to_unit_vectors, from_unit_vector
+from utils import geohash
+
+
+def _unit_vector(lat, lng):
+    phi, lam = math.radians(lat), math.radians(lng)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def _located(lat, lng):
+    return lat is not None and lng is not None
+
+
+def _centroid_geohash(located_count, x, y, z):
+    if not located_count or math.hypot(x, y, z) < 1e-12:
+        return None
+    return geohash.encode(*from_unit_vector((x, y, z)), app.config.get('GEOHASH_PRECISION', 9))
+
+
+class GroupAggregates:
+    """
+    Keeps each group's running location aggregates in step with its members.
+
+    Every group stores the number of members with coordinates, the sums of
+    their unit vectors and their bounding box, so its centroid and extent
+    are read in O(1) instead of re-reading every member. Updates are
+    single UPDATE statements with relative increments, joining the caller's
+    transaction. Float sums can drift over many updates; verify() rebuilds
+    them from the member rows.
+
+    The centroid's geohash is stored too, in an indexed column, so nearby
+    group searches are prefix range scans. It cannot be derived in SQL, so
+    every update re-reads the touched groups' sums and re-encodes it.
+    """
+
+    @staticmethod
+    def _refresh_geohash(group_filter):
+        rows = db.session.query(
+            Group.id, Group.located_count, Group.sum_x, Group.sum_y, Group.sum_z, Group.centroid_geohash
+        ).filter(group_filter).all()
+        changed = [
+            {'id': group_id, 'centroid_geohash': new_hash}
+            for group_id, count, x, y, z, old_hash in rows
+            for new_hash in (_centroid_geohash(count, x, y, z),)
+            if new_hash != old_hash
+        ]
+        if changed:
+            db.session.execute(db.update(Group), changed)
+
+    @staticmethod
+    def _shift(group_filter, count, vector, sign):
+        x, y, z = vector
+        Group.query.filter(group_filter).update({
+            Group.located_count: Group.located_count + count,
+            Group.sum_x: Group.sum_x + sign * x,
+            Group.sum_y: Group.sum_y + sign * y,
+            Group.sum_z: Group.sum_z + sign * z,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def _expand(group_filter, lat, lng):
+        Group.query.filter(group_filter).update({
+            Group.min_lat: case((or_(Group.min_lat.is_(None), Group.min_lat > lat), lat), else_=Group.min_lat),
+            Group.max_lat: case((or_(Group.max_lat.is_(None), Group.max_lat < lat), lat), else_=Group.max_lat),
+            Group.min_lng: case((or_(Group.min_lng.is_(None), Group.min_lng > lng), lng), else_=Group.min_lng),
+            Group.max_lng: case((or_(Group.max_lng.is_(None), Group.max_lng < lng), lng), else_=Group.max_lng),
+        }, synchronize_session=False)
+
+    @staticmethod
+    def _shrink(group_filter, lat, lng, exclude_user_id=None):
+        # A box only needs rebuilding when the point that left was on one of its edges
+        def member_extreme(aggregate):
+            query = db.select(aggregate) \
+                .select_from(GroupMember) \
+                .join(User, User.id == GroupMember.user_id) \
+                .where(GroupMember.group_id == Group.id, User.latitude.isnot(None), User.longitude.isnot(None))
+            if exclude_user_id is not None:
+                query = query.where(User.id != exclude_user_id)
+            return query.scalar_subquery()
+
+        on_edge = or_(Group.min_lat == lat, Group.max_lat == lat, Group.min_lng == lng, Group.max_lng == lng)
+        Group.query.filter(group_filter, on_edge).update({
+            Group.min_lat: member_extreme(db.func.min(User.latitude)),
+            Group.max_lat: member_extreme(db.func.max(User.latitude)),
+            Group.min_lng: member_extreme(db.func.min(User.longitude)),
+            Group.max_lng: member_extreme(db.func.max(User.longitude)),
+        }, synchronize_session=False)
+        # Reset the sums of groups left without located members so rounding error does not linger
+        Group.query.filter(group_filter, Group.located_count == 0).update({
+            Group.sum_x: 0.0, Group.sum_y: 0.0, Group.sum_z: 0.0,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def add_member(group_id, lat, lng):
+        """
+        Adds a new member's location to a group's aggregates.
+
+        Note:
+        - Members without coordinates do not affect the aggregates.
+        """
+        if not _located(lat, lng):
+            return
+        group_filter = Group.id == group_id
+        GroupAggregates._shift(group_filter, 1, _unit_vector(lat, lng), 1)
+        GroupAggregates._expand(group_filter, lat, lng)
+        GroupAggregates._refresh_geohash(group_filter)
+
+    @staticmethod
+    def remove_member(group_id, lat, lng):
+        """
+        Removes a departing member's location from a group's aggregates.
+
+        Note:
+        - The membership must already be deleted in the session; it is
+          flushed so a bounding box rebuild no longer sees it.
+        """
+        if not _located(lat, lng):
+            return
+        db.session.flush()
+        group_filter = Group.id == group_id
+        GroupAggregates._shift(group_filter, -1, _unit_vector(lat, lng), -1)
+        GroupAggregates._shrink(group_filter, lat, lng)
+        GroupAggregates._refresh_geohash(group_filter)
+
+    @staticmethod
+    def _user_groups(user_id):
+        return Group.id.in_(
+            db.session.query(GroupMember.group_id).filter(GroupMember.user_id == user_id).scalar_subquery()
+        )
+
+    @staticmethod
+    def move_member(user_id, old_location, new_location):
+        """
+        Moves a user's location in the aggregates of every group they belong to.
+
+        Parameters:
+        - user_id: The ID of the user.
+        - old_location, new_location: (lat, lng) tuples; either may hold Nones
+          when the user had or has no coordinates.
+
+        Note:
+        - The user's new coordinates are flushed first so a bounding box
+          rebuild sees them.
+        """
+        if tuple(old_location) == tuple(new_location):
+            return
+        db.session.flush()
+        group_filter = GroupAggregates._user_groups(user_id)
+        if _located(*old_location):
+            GroupAggregates._shift(group_filter, -1, _unit_vector(*old_location), -1)
+        if _located(*new_location):
+            GroupAggregates._shift(group_filter, 1, _unit_vector(*new_location), 1)
+            GroupAggregates._expand(group_filter, *new_location)
+        if _located(*old_location):
+            GroupAggregates._shrink(group_filter, *old_location)
+        GroupAggregates._refresh_geohash(group_filter)
+
+    @staticmethod
+    def remove_user(user_id, lat, lng):
+        """Removes a user's location from every group they belong to, before the user is deleted."""
+        if not _located(lat, lng):
+            return
+        group_filter = GroupAggregates._user_groups(user_id)
+        GroupAggregates._shift(group_filter, -1, _unit_vector(lat, lng), -1)
+        # The memberships still exist until the delete is flushed, rebuild boxes without this user
+        GroupAggregates._shrink(group_filter, lat, lng, exclude_user_id=user_id)
+        GroupAggregates._refresh_geohash(group_filter)
+
+    @staticmethod
+    def centroid(group):
+        """
+        The group's spherical centroid from its stored sums.
+
+        Returns:
+        - A (lat, lng) tuple, or None when no member has coordinates.
+        """
+        if not group.located_count or math.hypot(group.sum_x, group.sum_y, group.sum_z) < 1e-12:
+            return None
+        return from_unit_vector((group.sum_x, group.sum_y, group.sum_z))
+
+    @staticmethod
+    def compute(group_ids):
+        """
+        Computes aggregates from scratch for a batch of groups with one query.
+
+        Returns:
+        - A dict of group_id -> dict of aggregate column values.
+        """
+        group_ids = list(group_ids)
+        rows = db.session.query(GroupMember.group_id, User.latitude, User.longitude) \
+            .join(User, User.id == GroupMember.user_id) \
+            .filter(GroupMember.group_id.in_(group_ids), User.latitude.isnot(None), User.longitude.isnot(None)) \
+            .all()
+
+        aggregates = {group_id: {
+            'located_count': 0, 'sum_x': 0.0, 'sum_y': 0.0, 'sum_z': 0.0,
+            'min_lat': None, 'max_lat': None, 'min_lng': None, 'max_lng': None, 'centroid_geohash': None,
+        } for group_id in group_ids}
+        if not rows:
+            return aggregates
+
+        owners = np.array([row[0] for row in rows])
+        coords = np.array([(row[1], row[2]) for row in rows], dtype=np.float64)
+        vectors = to_unit_vectors(coords)
+        order = np.argsort(owners, kind='stable')
+        ids, starts, counts = np.unique(owners[order], return_index=True, return_counts=True)
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        min_coords = np.minimum.reduceat(coords[order], starts, axis=0)
+        max_coords = np.maximum.reduceat(coords[order], starts, axis=0)
+        for index, group_id in enumerate(ids.tolist()):
+            aggregates[group_id] = {
+                'located_count': int(counts[index]),
+                'sum_x': float(sums[index, 0]), 'sum_y': float(sums[index, 1]), 'sum_z': float(sums[index, 2]),
+                'min_lat': float(min_coords[index, 0]), 'max_lat': float(max_coords[index, 0]),
+                'min_lng': float(min_coords[index, 1]), 'max_lng': float(max_coords[index, 1]),
+                'centroid_geohash': _centroid_geohash(int(counts[index]), *sums[index].tolist()),
+            }
+        return aggregates
+
+    @staticmethod
+    def verify(fix=True, batch_size=500, tolerance=1e-6):
+        """
+        Recomputes every group's aggregates and compares them with the stored values.
+
+        Parameters:
+        - fix: Overwrite drifted groups with the recomputed values and commit.
+        - batch_size: Groups recomputed per query.
+        - tolerance: Largest accepted absolute difference in the unit vector sums.
+
+        Returns:
+        - A dict with 'checked' and 'drifted' (IDs of groups whose stored
+          aggregates did not match).
+        """
+        checked = 0
+        drifted = []
+        last_id = 0
+        while True:
+            groups = Group.query.filter(Group.id > last_id).order_by(Group.id).limit(batch_size).all()
+            if not groups:
+                break
+            last_id = groups[-1].id
+            expected = GroupAggregates.compute(group.id for group in groups)
+            for group in groups:
+                checked += 1
+                values = expected[group.id]
+                matches = group.located_count == values['located_count'] and all(
+                    abs(getattr(group, name) - values[name]) <= tolerance for name in ('sum_x', 'sum_y', 'sum_z')
+                ) and all(
+                    getattr(group, name) == values[name] for name in ('min_lat', 'max_lat', 'min_lng', 'max_lng', 'centroid_geohash')
+                )
+                if not matches:
+                    drifted.append(group.id)
+                    if fix:
+                        for name, value in values.items():
+                            setattr(group, name, value)
+            if fix:
+                db.session.commit()
+        return {'checked': checked, 'drifted': drifted}
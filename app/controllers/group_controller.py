@@ -1,6 +1,9 @@
 # Import necessary modules and classes
-from app.models import Group, GroupMember, InviteToken, User
-from werkzeug.exceptions import BadRequest, NotFound
+import csv
+from itertools import islice
+from app.models import Group, GroupMember, User
+from sqlalchemy import func, or_
+from werkzeug.exceptions import BadRequest, Forbidden, NotFound
 from app import db
 from werkzeug.utils import secure_filename
 import os
@@ -8,6 +11,23 @@ from flask import current_app as app
 from utils.func import allowed_file
 from flask_mail import Message
 from app import mail
+from .group_snapshot import GroupSnapshot
+from .recommendation_controller import RecommendationController
+from .group_aggregates import GroupAggregates
+from .invitetoken_controller import InviteTokenController
+
+
+def _insert_ignoring_duplicates(model, unique_columns):
+    # An INSERT that skips rows violating a unique constraint, in the dialect's own syntax
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        # MySQL and MariaDB
+        return db.insert(model).prefix_with('IGNORE')
+    return insert(model).on_conflict_do_nothing(index_elements=list(unique_columns))
 
 # Define a GroupController class to handle group-related actions
 class GroupController:
@@ -49,6 +69,7 @@ class GroupController:
         # Automatically add the creator (user) as a member of the group
         member = GroupMember(user_id=user_id, group_id=group.id)
         db.session.add(member)
+        GroupAggregates.add_member(group.id, user.latitude, user.longitude)
         db.session.commit()
 
         # Return the newly created group object
@@ -64,35 +85,153 @@ class GroupController:
         if group is None:
             raise NotFound("Group not found.")
 
-        # Create a new InviteToken instance for the group
-        invite_token = InviteToken(group_id=group_id)
-        # Add the invite token to the database session and commit to save
-        db.session.add(invite_token)
-        db.session.commit()
-        # Return the token
-        return invite_token.token
+        # Sign a token carrying the group and its expiry; nothing is stored
+        return InviteTokenController.generate_invite_token(group.id)
 
     # Static method for a user to join a group using an invitation link
     @staticmethod
     def join_group_via_invite(token, user_id):
-        # Find the invite token in the database
-        invite_token = InviteToken.query.filter_by(token=token).first()
+        # Check the token's signature, expiry and revocation (legacy UUID tokens are looked up)
+        group_id = InviteTokenController.resolve_invite_token(token)
         # If the token is invalid or expired, raise an exception
-        if not invite_token or not invite_token.is_valid():
+        if group_id is None:
             raise BadRequest("Invalid or expired invite token.")
 
         # Check if the user is already a member of the group
-        if GroupMember.query.filter_by(group_id=invite_token.group_id, user_id=user_id).first():
+        if GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
             raise BadRequest("User already a member of the group.")
 
         # If not, create a new GroupMember instance for the user to join the group
-        new_member = GroupMember(group_id=invite_token.group_id, user_id=user_id)
+        new_member = GroupMember(group_id=group_id, user_id=user_id)
         # Add the new member to the database session and commit to save
         db.session.add(new_member)
+        # Fold the new member's location into the group's centroid and bounding box
+        user = User.query.get(user_id)
+        if user is not None:
+            GroupAggregates.add_member(group_id, user.latitude, user.longitude)
+        # The group's stored recommendations no longer reflect its members
+        RecommendationController.invalidate_group(group_id)
         db.session.commit()
         # Return the new member object
         return new_member
-    
+
+    # Static method to add many users to a group from a CSV file
+    @staticmethod
+    def import_members(group_id, csv_file, batch_size=500):
+        """
+        Adds the users listed in a CSV file to a group.
+
+        Parameters:
+        - group_id: The ID of the group.
+        - csv_file: Text file object with a header row and a user_id and/or
+          email column; each row names one user.
+        - batch_size: Rows read, inserted and committed per transaction.
+
+        Returns:
+        - A dict with the number of 'rows' read, members 'added', rows
+          'skipped' because the user already was a member (or was listed
+          twice) and rows naming an 'unknown' user.
+
+        Raises:
+        - NotFound: The group does not exist.
+        - BadRequest: The file has neither a user_id nor an email column.
+
+        Note:
+        - The file is streamed. Each batch resolves its users with one
+          query and inserts them with one statement that lets the
+          (group_id, user_id) unique constraint drop existing members.
+          The group's aggregates are rebuilt and its recommendations
+          dropped in the same transaction.
+        """
+        group = Group.query.get(group_id)
+        if group is None:
+            raise NotFound("Group not found.")
+        reader = csv.DictReader(csv_file)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or ()]
+        if not {'user_id', 'email'} & set(reader.fieldnames):
+            raise BadRequest("The file needs a user_id or email column.")
+
+        insert = _insert_ignoring_duplicates(GroupMember, ('group_id', 'user_id'))
+        member_count = db.session.query(func.count(GroupMember.id)).filter(GroupMember.group_id == group.id)
+        members = member_count.scalar()
+        report = {'rows': 0, 'added': 0, 'skipped': 0, 'unknown': 0}
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return report
+            report['rows'] += len(rows)
+
+            listed = [((row.get('user_id') or '').strip(), (row.get('email') or '').strip()) for row in rows]
+            ids = {int(user_id) for user_id, _ in listed if user_id.isdigit()}
+            emails = {email for _, email in listed if email}
+            found = db.session.query(User.id, User.email).filter(or_(User.id.in_(ids), User.email.in_(emails))).all()
+            by_id = {user_id for user_id, _ in found}
+            by_email = {email: user_id for user_id, email in found if email}
+            user_ids = set()
+            unknown = 0
+            for user_id, email in listed:
+                if user_id.isdigit() and int(user_id) in by_id:
+                    user_ids.add(int(user_id))
+                elif email in by_email:
+                    user_ids.add(by_email[email])
+                else:
+                    unknown += 1
+            report['unknown'] += unknown
+            if not user_ids:
+                continue
+
+            db.session.execute(insert, [{'group_id': group.id, 'user_id': user_id} for user_id in user_ids])
+            # Counting before and after tells how many rows the constraint let through
+            added = member_count.scalar() - members
+            members += added
+            report['added'] += added
+            report['skipped'] += len(rows) - unknown - added
+            if added:
+                aggregates = GroupAggregates.compute([group.id])[group.id]
+                Group.query.filter_by(id=group.id).update(aggregates, synchronize_session=False)
+                RecommendationController.invalidate_group(group.id)
+            db.session.commit()
+
+    # Static method for a user to leave a group
+    @staticmethod
+    def leave_group(group_id, user_id):
+        """
+        Removes a user from a group.
+
+        Parameters:
+        - group_id: The ID of the group.
+        - user_id: The ID of the user leaving.
+
+        Raises:
+        - NotFound: The user is not a member of the group.
+        """
+        member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+        if member is None:
+            raise NotFound("User is not a member of this group.")
+
+        user = member.user
+        db.session.delete(member)
+        # Take the member's location out of the group's centroid and bounding box
+        GroupAggregates.remove_member(group_id, user.latitude, user.longitude)
+        # The group's stored recommendations no longer reflect its members
+        RecommendationController.invalidate_group(group_id)
+        db.session.commit()
+
+    @staticmethod
+    def require_member(group_id, user_id):
+        """
+        Make sure a user belongs to a group before acting on its behalf.
+
+        Parameters:
+        - group_id: The ID of the group.
+        - user_id: The ID of the user.
+
+        Raises:
+        - Forbidden: The user is not a member of the group.
+        """
+        if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+            raise Forbidden("Only group members can do this.")
+
     @staticmethod
     def get_group_members(group_id):
         # Retrieve the group from the database
@@ -161,18 +300,8 @@ class GroupController:
         Raises:
         - NotFound: If the group does not exist.
         """
-        group = Group.query.get(group_id)
-        if not group:
-            raise NotFound("Group not found.")
-
-        member_locations = []
-        for group_member in group.members:
-            user = group_member.user
-            if user.latitude is not None and user.longitude is not None:
-                member_locations.append({
-                    'latitude': user.latitude,
-                    'longitude': user.longitude
-                })
+        # A single set-based query instead of lazily loading every member's user
+        member_locations = GroupSnapshot.load(group_id, with_preferences=False).locations()
 
         if not member_locations:
             raise NotFound("No member locations available for this group.")
@@ -195,30 +324,8 @@ class GroupController:
         Raises:
         - NotFound: If the group does not exist or has no members.
         """
-        group = Group.query.get(group_id)
-        if not group:
-            raise NotFound("Group not found.")
-
-        # Initialize sets to store unique preferences
-        all_ambiances = set()
-        all_cuisines = set()
-        all_dietary_restrictions = set()
-        all_budget_preferences = set()
-
-        for group_member in group.members:
-            user = group_member.user
-            all_ambiances.update(ambiance.name for ambiance in user.ambiances)
-            all_cuisines.update(cuisine.name for cuisine in user.cuisines)
-            all_dietary_restrictions.update(dietary.name for dietary in user.dietary_restrictions)
-            all_budget_preferences.update(budget.name for budget in user.budget_preferences)
-
-        # Convert sets to lists to return them
-        return {
-            'ambiances': list(all_ambiances),
-            'cuisines': list(all_cuisines),
-            'dietary_restrictions': list(all_dietary_restrictions),
-            'budget_preferences': list(all_budget_preferences)
-        }
+        # All four preference sets for every member come back in one UNION ALL query
+        return GroupSnapshot.load(group_id).preference_names()
 
 
     @staticmethod
@@ -0,0 +1,117 @@
+from collections import Counter, namedtuple
+import numpy as np
+from sqlalchemy import literal, union_all
+from werkzeug.exceptions import NotFound
+from app import db
+from app.models import (
+    Group, GroupMember, User, Ambiance, Cuisine, DietaryRestriction, BudgetPreference,
+    user_ambiance, user_cuisine, user_dietary, user_budget
+)
+from .preference_taxonomy import get_taxonomy
+
+# (category, association table, association column, preference model) for each preference set
+PREFERENCE_SOURCES = (
+    ('ambiances', user_ambiance, user_ambiance.c.ambiance_id, Ambiance),
+    ('cuisines', user_cuisine, user_cuisine.c.cuisine_id, Cuisine),
+    ('dietary_restrictions', user_dietary, user_dietary.c.dietary_id, DietaryRestriction),
+    ('budget_preferences', user_budget, user_budget.c.budget_id, BudgetPreference),
+)
+
+
+class GroupSnapshot(namedtuple('GroupSnapshot', 'group_id user_ids located_user_ids coordinates preference_rows')):
+    """
+    Read-only view of a group's members, coordinates and preferences.
+
+    Fields:
+    - group_id: The group ID.
+    - user_ids: Tuple of every member's user ID.
+    - located_user_ids: Tuple of the user IDs that have coordinates, aligned with coordinates.
+    - coordinates: (N, 2) float64 array of (lat, lng) for located members.
+    - preference_rows: Tuple of (category, user_id, name) rows for every member preference.
+    """
+
+    @classmethod
+    def load(cls, group_id, with_preferences=True):
+        """
+        Loads a snapshot with two set-based queries, regardless of group size.
+
+        Parameters:
+        - group_id: The ID of the group.
+        - with_preferences: Set to False to skip the preference query when
+          only coordinates are needed; preference_rows is then empty.
+
+        Raises:
+        - NotFound: If the group does not exist.
+        """
+        # Query 1: the group joined to its members' coordinates; the outer joins
+        # keep one row when the group exists but has no members
+        member_rows = db.session.query(Group.id, User.id, User.latitude, User.longitude) \
+            .outerjoin(GroupMember, GroupMember.group_id == Group.id) \
+            .outerjoin(User, User.id == GroupMember.user_id) \
+            .filter(Group.id == group_id) \
+            .all()
+        if not member_rows:
+            raise NotFound("Group not found.")
+
+        user_ids = []
+        located_user_ids = []
+        coordinates = []
+        for _, user_id, latitude, longitude in member_rows:
+            if user_id is None:
+                continue
+            user_ids.append(user_id)
+            if latitude is not None and longitude is not None:
+                located_user_ids.append(user_id)
+                coordinates.append((latitude, longitude))
+
+        if not with_preferences:
+            preference_rows = ()
+        else:
+            preference_rows = cls._load_preference_rows(group_id)
+
+        return cls(
+            group_id=member_rows[0][0],
+            user_ids=tuple(user_ids),
+            located_user_ids=tuple(located_user_ids),
+            coordinates=np.array(coordinates, dtype=np.float64).reshape(-1, 2),
+            preference_rows=preference_rows,
+        )
+
+    @staticmethod
+    def _load_preference_rows(group_id):
+        # Query 2: every member preference ID across the four categories in one UNION ALL;
+        # names come from the in-memory taxonomy instead of joining the preference tables
+        selects = [
+            db.select(literal(category).label('category'), table.c.user_id, column)
+            .select_from(table)
+            .join(GroupMember, GroupMember.user_id == table.c.user_id)
+            .where(GroupMember.group_id == group_id)
+            for category, table, column, _ in PREFERENCE_SOURCES
+        ]
+        taxonomy = get_taxonomy()
+        rows = []
+        for category, user_id, preference_id in db.session.execute(union_all(*selects)):
+            name = taxonomy.name(category, preference_id)
+            if name is not None:
+                rows.append((category, user_id, name))
+        return tuple(rows)
+
+    def locations(self):
+        """Member locations as 'latitude'/'longitude' dicts."""
+        return [{'latitude': lat, 'longitude': lng} for lat, lng in self.coordinates.tolist()]
+
+    def preference_names(self, user_ids=None):
+        """Distinct preference names per category, sorted, optionally for a subset of members."""
+        members = None if user_ids is None else set(user_ids)
+        names = {category: set() for category, _, _, _ in PREFERENCE_SOURCES}
+        for category, user_id, name in self.preference_rows:
+            if members is None or user_id in members:
+                names[category].add(name)
+        return {category: sorted(values) for category, values in names.items()}
+
+    def preference_counts(self):
+        """Number of members holding each preference, per category."""
+        counts = {category: Counter() for category, _, _, _ in PREFERENCE_SOURCES}
+        for category, _, name in self.preference_rows:
+            counts[category][name] += 1
+        return counts
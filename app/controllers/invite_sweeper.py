@@ -0,0 +1,105 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app as app
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import InviteToken, RevokedInvite
+
+
+def _purge(key, expires_at, now, batch_size, pause):
+    # Deletes expired rows one bounded batch per transaction, so the write lock is held only briefly
+    purged = 0
+    while True:
+        keys = [row[0] for row in db.session.query(key).filter(expires_at < now).limit(batch_size)]
+        if not keys:
+            return purged
+        db.session.execute(db.delete(key.class_).where(key.in_(keys)))
+        db.session.commit()
+        purged += len(keys)
+        if len(keys) < batch_size:
+            return purged
+        # Let requests waiting on the write lock in between batches
+        time.sleep(pause)
+
+
+def purge_expired_invites(batch_size=None, pause=None):
+    """
+    Deletes expired invite tokens and revocations of expired signed tokens.
+
+    Parameters:
+    - batch_size: Rows deleted per transaction; defaults to INVITE_SWEEP_BATCH_SIZE.
+    - pause: Seconds slept between batches; defaults to INVITE_SWEEP_PAUSE.
+
+    Returns:
+    - A dict with the number of 'invite_tokens' and 'revoked_invites' rows
+      purged and the 'seconds' the run took.
+
+    Note:
+    - Both tables are scanned through their expires_at indexes. Expired
+      revocations can go because read_invite rejects the expired tokens
+      they were recorded for anyway.
+    """
+    batch_size = batch_size or app.config.get('INVITE_SWEEP_BATCH_SIZE', 500)
+    pause = app.config.get('INVITE_SWEEP_PAUSE', 0.05) if pause is None else pause
+    started = time.monotonic()
+    now = datetime.utcnow()
+    report = {
+        'invite_tokens': _purge(InviteToken.id, InviteToken.expires_at, now, batch_size, pause),
+        'revoked_invites': _purge(RevokedInvite.nonce, RevokedInvite.expires_at, now, batch_size, pause),
+    }
+    report['seconds'] = time.monotonic() - started
+    return report
+
+
+class InviteSweeper:
+    """
+    Background thread that purges expired invites every INVITE_SWEEP_INTERVAL seconds.
+
+    Every worker that starts one sweeps on its own; the deletes are
+    idempotent, so overlapping sweeps only cost an extra empty query.
+    """
+
+    def __init__(self, flask_app, interval):
+        self.app = flask_app
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='invite-sweeper', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    report = purge_expired_invites()
+                    self.app.logger.info(
+                        "Purged %d expired invite tokens and %d revocations in %.2fs",
+                        report['invite_tokens'], report['revoked_invites'], report['seconds']
+                    )
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    self.app.logger.exception("Invite sweep failed")
+                finally:
+                    db.session.remove()
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+def start_invite_sweeper(flask_app):
+    """Starts this process's sweeper when INVITE_SWEEP_INTERVAL is set; create_app calls this."""
+    global _sweeper
+    interval = flask_app.config.get('INVITE_SWEEP_INTERVAL')
+    if not interval:
+        return None
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = InviteSweeper(flask_app, interval)
+            _sweeper.start()
+        return _sweeper
@@ -1,6 +1,147 @@
-from app.models import InviteToken, GroupMember, db
-from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import BadRequest, NotFound
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app as app
+from config import DEFAULT_SECRET_KEY
+from app.models import Group, InviteToken, RevokedInvite, GroupMember, User, db
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from werkzeug.exceptions import BadRequest, NotFound, ServiceUnavailable
+from .recommendation_controller import RecommendationController
+from .group_aggregates import GroupAggregates
+from .preference_taxonomy import bump_version, read_version
+
+# Signed tokens read "<version>.<payload>.<signature>", each part base64url without padding
+TOKEN_VERSION = 'i1'
+# Payload: group_id, expiry as a unix timestamp and a random nonce
+PAYLOAD_FORMAT = struct.Struct('>QI8s')
+SIGNATURE_SIZE = 16
+# cache_versions row bumped whenever an invite is revoked
+REVOCATIONS_VERSION = 'invite_revocations'
+
+
+class SignedInvite(namedtuple('SignedInvite', 'group_id expires_at nonce')):
+    """
+    The contents of a signed invite token.
+
+    Fields:
+    - group_id: Integer ID of the group the invite is for.
+    - expires_at: Naive UTC datetime after which the invite is invalid.
+    - nonce: Hex string identifying the invite, used to revoke it.
+    """
+
+    def is_valid(self):
+        return datetime.utcnow() < self.expires_at
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _signature(payload):
+    secret = app.config.get('SECRET_KEY')
+    # Anyone could forge invites with the key published in config.py; refuse with a 503 instead
+    if not secret or secret == DEFAULT_SECRET_KEY:
+        raise ServiceUnavailable("Invites are disabled until the SECRET_KEY environment variable is set.")
+    # Derive a key of its own so invite signatures can never be replayed as session cookies
+    key = hmac.new(secret.encode(), b'invite-token', hashlib.sha256).digest()
+    return hmac.new(key, TOKEN_VERSION.encode() + payload, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def sign_invite(group_id, expires_in=None):
+    """
+    Creates a signed invite token; nothing is stored.
+
+    Parameters:
+    - group_id: Integer ID of the group.
+    - expires_in: Hours the token stays valid; defaults to INVITE_TOKEN_EXPIRES_IN.
+
+    Returns:
+    - The token string.
+
+    Raises:
+    - ServiceUnavailable: SECRET_KEY is unset or still the placeholder.
+    """
+    hours = expires_in or app.config.get('INVITE_TOKEN_EXPIRES_IN', 48)
+    expires_at = int(time.time() + hours * 3600)
+    payload = PAYLOAD_FORMAT.pack(group_id, expires_at, os.urandom(8))
+    return f'{TOKEN_VERSION}.{_b64encode(payload)}.{_b64encode(_signature(payload))}'
+
+
+def read_invite(token):
+    """
+    Checks a signed invite token's signature and unpacks it.
+
+    Returns:
+    - A SignedInvite, or None when the token is not a well-formed signed
+      token with a valid signature. Expiry and revocation are not checked.
+
+    Raises:
+    - ServiceUnavailable: The token is in the signed format, but SECRET_KEY
+      is unset or still the placeholder.
+    """
+    parts = token.split('.') if isinstance(token, str) else ()
+    if len(parts) != 3 or parts[0] != TOKEN_VERSION:
+        return None
+    try:
+        payload, signature = _b64decode(parts[1]), _b64decode(parts[2])
+    except (ValueError, TypeError):
+        return None
+    if len(payload) != PAYLOAD_FORMAT.size or not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    group_id, expires_at, nonce = PAYLOAD_FORMAT.unpack(payload)
+    return SignedInvite(group_id, datetime.utcfromtimestamp(expires_at), nonce.hex())
+
+
+_revoked = None
+_revoked_version = None
+_checked_at = 0.0
+_revoked_lock = threading.Lock()
+
+def load_revocations():
+    """Loads the nonces of revoked invites that have not expired yet."""
+    global _revoked, _revoked_version, _checked_at
+    # Read the version first; a revocation racing the load then triggers another reload
+    version = read_version(REVOCATIONS_VERSION)
+    nonces = frozenset(
+        nonce for nonce, in db.session.query(RevokedInvite.nonce)
+        .filter(RevokedInvite.expires_at > datetime.utcnow())
+    )
+    with _revoked_lock:
+        _revoked, _revoked_version, _checked_at = nonces, version, time.monotonic()
+    return nonces
+
+def get_revocations():
+    """
+    Returns the frozenset of revoked invite nonces.
+
+    At most once every INVITE_REVOCATION_CHECK_INTERVAL seconds the stored
+    version is compared with the loaded one (one primary key lookup), so
+    revocations made by other workers take effect within that interval.
+    """
+    global _checked_at
+    with _revoked_lock:
+        revoked, version = _revoked, _revoked_version
+        due = time.monotonic() - _checked_at >= app.config.get('INVITE_REVOCATION_CHECK_INTERVAL', 5.0)
+        if revoked is not None and due:
+            _checked_at = time.monotonic()
+    if revoked is not None and (not due or read_version(REVOCATIONS_VERSION) == version):
+        return revoked
+    return load_revocations()
+
+def invalidate_revocations():
+    """Drops this worker's revocation set so the next check reloads it."""
+    global _revoked
+    with _revoked_lock:
+        _revoked = None
+
 
 class InviteTokenController:
     """
@@ -20,22 +161,71 @@ class InviteTokenController:
         - String representing the generated invite token.
 
         Raises:
-        - BadRequest: An error occurred during token generation, possibly due
-                       to database issues.
+        - BadRequest: The group ID is not an integer.
+        - ServiceUnavailable: SECRET_KEY is unset or still the placeholder.
 
         Note:
-        - This method commits the new invite token to the database and
-          rolls back the session in case of any exceptions.
+        - The token is signed with the app's SECRET_KEY and carries the group
+          ID and its expiry, so nothing is written to the database.
         """
         try:
-            invite_token = InviteToken(group_id=group_id)
-            db.session.add(invite_token)
-            db.session.commit()
-            return invite_token.token
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            # Proper logging of the exception can be implemented here
+            group_id = int(group_id)
+        except (TypeError, ValueError):
             raise BadRequest("Could not generate invite token.")
+        return sign_invite(group_id)
+
+    @staticmethod
+    def generate_invite_tokens(group_id, count):
+        """
+        Generates a batch of invite tokens for a group, one per invitee.
+
+        Parameters:
+        - group_id: Integer ID of the group.
+        - count: Number of tokens, at most INVITE_BULK_MAX.
+
+        Returns:
+        - A list of token strings.
+
+        Raises:
+        - BadRequest: The count is out of range.
+        - NotFound: The group does not exist.
+        - ServiceUnavailable: SECRET_KEY is unset or still the placeholder.
+
+        Note:
+        - Signed tokens are not stored, so the only query is the group check.
+        """
+        limit = app.config.get('INVITE_BULK_MAX', 1000)
+        if not isinstance(count, int) or not 1 <= count <= limit:
+            raise BadRequest(f"Invite count must be between 1 and {limit}.")
+        group = db.session.get(Group, group_id)
+        if group is None:
+            raise NotFound("Group not found.")
+        return [sign_invite(group.id) for _ in range(count)]
+
+    @staticmethod
+    def resolve_invite_token(token):
+        """
+        Finds the group an invite token is for.
+
+        Parameters:
+        - token: String token to check.
+
+        Returns:
+        - The group ID, or None when the token is unknown, expired or revoked.
+
+        Note:
+        - Signed tokens are checked in memory. UUID tokens issued before
+          signed tokens are still looked up in invite_tokens.
+        """
+        invite = read_invite(token)
+        if invite is not None:
+            if invite.is_valid() and invite.nonce not in get_revocations():
+                return invite.group_id
+            return None
+        invite_token = InviteToken.query.filter_by(token=token).first()
+        if invite_token and invite_token.is_valid():
+            return invite_token.group_id
+        return None
 
     @staticmethod
     def validate_invite_token(token):
@@ -51,9 +241,15 @@ class InviteTokenController:
         Note:
         - This method does not alter the database state.
         """
-        invite_token = InviteToken.query.filter_by(token=token).first()
-        return bool(invite_token and invite_token.is_valid())
+        return InviteTokenController.resolve_invite_token(token) is not None
     
+    @staticmethod
+    def _revoke(invite):
+        # Adds a signed invite to the revocation set in the current transaction
+        if db.session.get(RevokedInvite, invite.nonce) is None:
+            db.session.add(RevokedInvite(nonce=invite.nonce, group_id=invite.group_id, expires_at=invite.expires_at))
+            bump_version(name=REVOCATIONS_VERSION)
+
     @staticmethod
     def redeem_invite_token(token, user_id):
         """
@@ -68,23 +264,52 @@ class InviteTokenController:
 
         Raises:
         - BadRequest: The invite token is invalid, expired, or the user is already a member of the group.
+        - ServiceUnavailable: SECRET_KEY is unset or still the placeholder.
 
         Note:
-        - Redeeming a token will remove it from the database.
+        - Redeeming a token uses it up: a signed token is revoked and a UUID
+          token is removed from the database. The revocation insert fails
+          for a signed token that was already used, even when this worker
+          has not yet seen the revocation.
         - This method handles the database transaction, including rollback in case of exceptions.
         """
         try:
-            invite_token = InviteToken.query.filter_by(token=token).first()
-            if not invite_token or not invite_token.is_valid():
+            invite = read_invite(token)
+            invite_token = None
+            if invite is None:
+                invite_token = InviteToken.query.filter_by(token=token).first()
+                group_id = invite_token.group_id if invite_token else None
+            else:
+                group_id = invite.group_id
+            if group_id is None or not InviteTokenController.validate_invite_token(token):
                 raise BadRequest("Invalid or expired invite token.")
 
-            if GroupMember.query.filter_by(group_id=invite_token.group_id, user_id=user_id).first():
+            if GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
                 raise BadRequest("User is already a member of this group.")
 
-            new_member = GroupMember(group_id=invite_token.group_id, user_id=user_id)
+            if invite is not None:
+                # The revocation row, not this worker's cached set, decides whether the token
+                # is still unused: an earlier or concurrent redemption has already inserted it
+                db.session.add(RevokedInvite(nonce=invite.nonce, group_id=group_id, expires_at=invite.expires_at))
+                try:
+                    db.session.flush()
+                except IntegrityError:
+                    db.session.rollback()
+                    raise BadRequest("Invalid or expired invite token.")
+                bump_version(name=REVOCATIONS_VERSION)
+            else:
+                db.session.delete(invite_token)
+
+            new_member = GroupMember(group_id=group_id, user_id=user_id)
             db.session.add(new_member)
-            db.session.delete(invite_token)
+            user = User.query.get(user_id)
+            if user is not None:
+                GroupAggregates.add_member(group_id, user.latitude, user.longitude)
+            # The group's stored recommendations no longer reflect its members
+            RecommendationController.invalidate_group(group_id)
             db.session.commit()
+            if invite is not None:
+                invalidate_revocations()
             return new_member
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -104,9 +329,21 @@ class InviteTokenController:
         - BadRequest: There was an issue with revoking the invite token.
 
         Note:
+        - A signed token's nonce is added to the revocation set until the
+          token expires; other workers pick it up within
+          INVITE_REVOCATION_CHECK_INTERVAL seconds.
         - This method handles the database transaction, including rollback in case of exceptions.
         """
         try:
+            invite = read_invite(token)
+            if invite is not None:
+                # An expired token is unusable already, there is nothing to record
+                if invite.is_valid():
+                    InviteTokenController._revoke(invite)
+                    db.session.commit()
+                    invalidate_revocations()
+                return
+
             invite_token = InviteToken.query.filter_by(token=token).first()
             if not invite_token:
                 raise NotFound("Invite token not found.")
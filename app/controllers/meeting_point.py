@@ -0,0 +1,238 @@
+import math
+import random
+import numpy as np
+from utils.func import to_lat_lng
+from utils.geo import EARTH_RADIUS_M, to_unit_vectors, from_unit_vector, angular_distances
+
+# Supported meeting point objectives
+OBJECTIVES = ('centroid', 'median', 'minimax')
+
+
+def member_coordinates(locations):
+    """
+    Packs member locations into a contiguous (N, 2) float64 array of (lat, lng) degrees.
+
+    Parameters:
+    - locations: An (N, 2) array, or a list of (lat, lng) tuples or
+      'latitude'/'longitude' dicts as returned by get_group_member_locations.
+    """
+    if isinstance(locations, np.ndarray):
+        return np.ascontiguousarray(locations, dtype=np.float64).reshape(-1, 2)
+    return np.array([to_lat_lng(location) for location in locations], dtype=np.float64).reshape(-1, 2)
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 1e-15 else None
+
+
+def _tangent_basis(point):
+    """East and north unit vectors of the tangent plane at a unit vector."""
+    east = np.array([-point[1], point[0], 0.0])
+    east = _normalize(east)
+    if east is None:
+        # At a pole every direction is south/north; pick any orthonormal pair
+        east = np.array([0.0, 1.0, 0.0])
+    north = np.cross(point, east)
+    return east, north
+
+
+def _log_map(vectors, point):
+    """Azimuthal equidistant projection of unit vectors onto the tangent plane at point (radians)."""
+    east, north = _tangent_basis(point)
+    x, y = vectors @ east, vectors @ north
+    planar = np.hypot(x, y)
+    theta = np.arctan2(planar, vectors @ point)
+    scale = np.divide(theta, planar, out=np.ones_like(theta), where=planar > 1e-15)
+    return np.column_stack((x * scale, y * scale)), east, north
+
+
+def _exp_map(step, point, east, north):
+    """Moves along the great circle from point by a tangent step given in radians."""
+    angle = math.hypot(step[0], step[1])
+    if angle < 1e-15:
+        return point
+    direction = (step[0] * east + step[1] * north) / angle
+    return math.cos(angle) * point + math.sin(angle) * direction
+
+
+def spherical_centroid(coords):
+    """
+    Normalized mean of the members' unit vectors.
+
+    Unlike a plain average of degrees this is correct across the antimeridian
+    and accounts for Earth curvature.
+
+    Returns:
+    - A (lat, lng) tuple in degrees.
+    """
+    vectors = to_unit_vectors(coords)
+    mean = _normalize(vectors.mean(axis=0))
+    if mean is None:
+        # Members are spread symmetrically around the globe; any member is as central as another
+        return tuple(float(v) for v in np.asarray(coords)[0])
+    return from_unit_vector(mean)
+
+
+def geometric_median(coords, tol=1e-9, max_iter=100):
+    """
+    Point minimizing the total great-circle distance to all members (Weiszfeld).
+
+    Each iteration projects the members onto the tangent plane at the current
+    estimate, takes a Weiszfeld step there and maps it back onto the sphere.
+    A single far-away member pulls the result much less than it pulls the centroid.
+
+    Parameters:
+    - coords: (N, 2) array of (lat, lng) degrees.
+    - tol: Convergence threshold on the step size, in radians.
+    - max_iter: Maximum number of iterations.
+
+    Returns:
+    - A (lat, lng) tuple in degrees.
+    """
+    vectors = to_unit_vectors(coords)
+    point = _normalize(vectors.mean(axis=0))
+    if point is None:
+        point = vectors[0]
+
+    for _ in range(max_iter):
+        planar, east, north = _log_map(vectors, point)
+        distances = np.hypot(planar[:, 0], planar[:, 1])
+        # Members sitting on the estimate are skipped to avoid division by zero
+        mask = distances > 1e-15
+        if not mask.any():
+            break
+        weights = 1.0 / distances[mask]
+        step = (planar[mask] * weights[:, None]).sum(axis=0) / weights.sum()
+        point = _normalize(_exp_map(step, point, east, north))
+        if math.hypot(step[0], step[1]) < tol:
+            break
+
+    return from_unit_vector(point)
+
+
+def _circle_from(a, b, c=None):
+    if c is None:
+        center = (a + b) / 2
+        return center, np.linalg.norm(a - center)
+    ax, ay = a
+    bx, by = b
+    cx, cy = c
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    if abs(d) < 1e-30:
+        # Collinear points; the widest pair defines the circle
+        pairs = [(a, b), (a, c), (b, c)]
+        return max((_circle_from(p, q) for p, q in pairs), key=lambda circle: circle[1])
+    a2, b2, c2 = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+    ux = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+    uy = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    center = np.array([ux, uy])
+    return center, np.linalg.norm(a - center)
+
+
+def _min_enclosing_circle(points):
+    """Welzl's randomized incremental minimum enclosing circle for a small 2D point set."""
+    points = [np.asarray(p) for p in points]
+    random.Random(0).shuffle(points)
+    eps = 1e-12
+    center, radius = points[0], 0.0
+    for i, p in enumerate(points):
+        if np.linalg.norm(p - center) <= radius + eps:
+            continue
+        center, radius = p, 0.0
+        for j in range(i):
+            q = points[j]
+            if np.linalg.norm(q - center) <= radius + eps:
+                continue
+            center, radius = _circle_from(p, q)
+            for k in range(j):
+                r = points[k]
+                if np.linalg.norm(r - center) > radius + eps:
+                    center, radius = _circle_from(p, q, r)
+    return center, radius
+
+
+def minimax_point(coords, max_rounds=20):
+    """
+    Point minimizing the farthest any member has to travel.
+
+    Only members on the boundary decide the answer, so the solver keeps a
+    small core set: it solves the minimum enclosing circle of the core set
+    exactly in the tangent plane, then checks the whole group in one
+    vectorized pass and adds the farthest member if it is still outside.
+
+    Parameters:
+    - coords: (N, 2) array of (lat, lng) degrees.
+    - max_rounds: Maximum number of core set refinements.
+
+    Returns:
+    - A (lat, lng) tuple in degrees.
+    """
+    vectors = to_unit_vectors(coords)
+    point = _normalize(vectors.mean(axis=0))
+    if point is None:
+        point = vectors[0]
+
+    # Seed the core set with the members farthest from the centroid and from each other
+    distances = angular_distances(vectors, point)
+    first = int(np.argmax(distances))
+    second = int(np.argmax(angular_distances(vectors, vectors[first])))
+    core = {first, second}
+
+    for _ in range(max_rounds):
+        core_vectors = vectors[sorted(core)]
+        planar, east, north = _log_map(core_vectors, point)
+        center, radius = _min_enclosing_circle(planar)
+        point = _normalize(_exp_map(center, point, east, north))
+
+        distances = angular_distances(vectors, point)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] <= radius * (1 + 1e-9) + 1e-12 or farthest in core:
+            break
+        core.add(farthest)
+
+    return from_unit_vector(point)
+
+
+_SOLVERS = {
+    'centroid': spherical_centroid,
+    'median': geometric_median,
+    'minimax': minimax_point,
+}
+
+
+def find_meeting_point(locations, objective='median'):
+    """
+    Computes a meeting point for a group of members.
+
+    Parameters:
+    - locations: Member locations, see member_coordinates.
+    - objective: 'centroid' (spherical mean), 'median' (least total travel)
+      or 'minimax' (least worst-case travel).
+
+    Returns:
+    - A (lat, lng) tuple in degrees.
+
+    Raises:
+    - ValueError: No locations were given or the objective is unknown.
+    """
+    if objective not in _SOLVERS:
+        raise ValueError(f"Unknown meeting point objective: {objective}")
+    coords = member_coordinates(locations)
+    if len(coords) == 0:
+        raise ValueError("At least one member location is required.")
+    if len(coords) == 1:
+        return float(coords[0, 0]), float(coords[0, 1])
+    return _SOLVERS[objective](coords)
+
+
+def travel_distances(locations, point):
+    """
+    Great-circle distances in meters from every member to a point.
+
+    Useful for comparing objectives: sum() is what 'median' minimizes and
+    max() is what 'minimax' minimizes.
+    """
+    vectors = to_unit_vectors(member_coordinates(locations))
+    target = to_unit_vectors(np.array([point], dtype=np.float64))[0]
+    return angular_distances(vectors, target) * EARTH_RADIUS_M
@@ -0,0 +1,117 @@
+import math
+from collections import namedtuple
+import numpy as np
+from utils.geo import EARTH_RADIUS_M, to_unit_vectors, from_unit_vector
+from .meeting_point import member_coordinates
+
+
+class MemberCluster(namedtuple('MemberCluster', 'indices center max_distance')):
+    """
+    A spatial cluster of group members.
+
+    Fields:
+    - indices: Integer array of the members' row indices in the input coordinates.
+    - center: (lat, lng) of the cluster's spherical mean.
+    - max_distance: Great-circle distance in meters from the center to the farthest member.
+    """
+
+
+def _farthest_point_seeds(vectors, min_cos, max_clusters):
+    """
+    Greedy k-center seeding: keeps adding the member farthest from every seed.
+
+    Stops once every member is within the threshold (cosine of at least
+    min_cos to a seed) or max_clusters seeds exist, which picks k and
+    gives k-means well spread starting centers in O(N * k).
+    """
+    mean = vectors.sum(axis=0)
+    # Start from the member farthest from the group's mean direction, so seeding is deterministic
+    first = int(np.argmin(vectors @ mean)) if np.linalg.norm(mean) > 1e-12 else 0
+    seeds = [first]
+    nearest_cos = vectors @ vectors[first]
+    while len(seeds) < max_clusters:
+        farthest = int(np.argmin(nearest_cos))
+        if nearest_cos[farthest] >= min_cos:
+            break
+        seeds.append(farthest)
+        np.maximum(nearest_cos, vectors @ vectors[farthest], out=nearest_cos)
+    return vectors[seeds].copy()
+
+
+def spherical_kmeans(vectors, centers, max_iter=20):
+    """
+    Lloyd iterations on the unit sphere.
+
+    Members are assigned to the center with the largest dot product, which
+    is the nearest one by great-circle distance, and each center moves to
+    the normalized mean of its members.
+
+    Parameters:
+    - vectors: (N, 3) member unit vectors.
+    - centers: (k, 3) starting center unit vectors.
+
+    Returns:
+    - A tuple (centers, labels).
+    """
+    k = len(centers)
+    for _ in range(max_iter):
+        labels = (vectors @ centers.T).argmax(axis=1)
+        sums = np.column_stack([np.bincount(labels, weights=vectors[:, axis], minlength=k) for axis in range(3)])
+        norms = np.linalg.norm(sums, axis=1)
+        # A center that lost every member stays where it was
+        moved = np.where(
+            (norms > 1e-12)[:, None], sums / np.maximum(norms, 1e-12)[:, None], centers
+        )
+        converged = np.allclose(moved, centers, rtol=0.0, atol=1e-12)
+        centers = moved
+        if converged:
+            break
+    return centers, (vectors @ centers.T).argmax(axis=1)
+
+
+def cluster_members(locations, max_distance, max_clusters=8):
+    """
+    Splits members into spatial clusters so nobody travels further than max_distance.
+
+    k is chosen automatically by greedy k-center seeding against the
+    threshold, then refined with spherical k-means. When refinement would
+    push a member past the threshold the k-center assignment is kept.
+
+    Parameters:
+    - locations: Member locations in any form accepted by member_coordinates.
+    - max_distance: Largest acceptable distance in meters from a member to its cluster center.
+    - max_clusters: Upper bound on k; with k capped the threshold may not be met.
+
+    Returns:
+    - A list of MemberCluster, largest first.
+    """
+    coords = member_coordinates(locations)
+    if not len(coords):
+        return []
+    vectors = to_unit_vectors(coords)
+    min_cos = math.cos(min(max_distance / EARTH_RADIUS_M, math.pi))
+
+    seeds = _farthest_point_seeds(vectors, min_cos, max(1, max_clusters))
+    centers, labels = spherical_kmeans(vectors, seeds)
+    member_cos = np.einsum('ij,ij->i', vectors, centers[labels])
+    if member_cos.min() < min_cos:
+        # k-means minimizes overall spread, not the worst trip; fall back to the seeds if it broke the threshold
+        seed_labels = (vectors @ seeds.T).argmax(axis=1)
+        seed_cos = np.einsum('ij,ij->i', vectors, seeds[seed_labels])
+        if seed_cos.min() > member_cos.min():
+            centers, labels, member_cos = seeds, seed_labels, seed_cos
+
+    order = np.argsort(labels, kind='stable')
+    counts = np.bincount(labels, minlength=len(centers))
+    clusters = []
+    for label, indices in enumerate(np.split(order, np.cumsum(counts)[:-1])):
+        if not len(indices):
+            continue
+        worst_cos = float(np.clip(member_cos[indices].min(), -1.0, 1.0))
+        clusters.append(MemberCluster(
+            indices=indices,
+            center=from_unit_vector(centers[label]),
+            max_distance=EARTH_RADIUS_M * math.acos(worst_cos),
+        ))
+    clusters.sort(key=lambda cluster: len(cluster.indices), reverse=True)
+    return clusters
@@ -0,0 +1,113 @@
+from sqlalchemy import or_
+from app import db
+from app.models import User, Group
+from utils.geo import haversine, bounding_box
+from utils.geohash import covering_cells, PREFIX_END
+from .group_aggregates import GroupAggregates
+
+# Upper bounds in meters of the distance buckets shown to users
+DISTANCE_BUCKETS = (1000, 2000, 5000, 10000, 25000)
+
+
+def distance_bucket(distance):
+    """
+    Coarsens a distance for display, so exact positions cannot be worked out from it.
+
+    Returns:
+    - A (bucket index, label) tuple, e.g. (0, '<1 km') or (2, '2-5 km').
+    """
+    lower = 0
+    for index, upper in enumerate(DISTANCE_BUCKETS):
+        if distance < upper:
+            return index, f"<{upper // 1000} km" if lower == 0 else f"{lower // 1000}-{upper // 1000} km"
+        lower = upper
+    return len(DISTANCE_BUCKETS), f">{lower // 1000} km"
+
+
+class NearbyController:
+    """
+    Controller for "who is near me" queries over users and groups.
+
+    For users, a radius search becomes a handful of range scans on the indexed
+    users.geohash column (the geohash cells covering the search's bounding
+    box), narrowed by the bounding box itself and finally by the exact
+    haversine distance, so only users near the search are ever read.
+    Groups are matched the same way on the indexed geohash of their
+    centroid, which GroupAggregates keeps up to date.
+    """
+
+    @staticmethod
+    def _in_cells(column, lat, lng, radius):
+        """Filter selecting rows whose geohash column lies in a cell covering the search box."""
+        cells = covering_cells(*bounding_box(lat, lng, radius))
+        return or_(*[column.between(cell, cell + PREFIX_END) for cell in cells])
+
+    @staticmethod
+    def _within_box(lat, lng, radius):
+        """Filter selecting users whose geohash cell and coordinates fall inside the search box."""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        return db.and_(
+            NearbyController._in_cells(User.geohash, lat, lng, radius),
+            User.latitude.between(min_lat, max_lat),
+            User.longitude.between(min_lng, max_lng),
+        )
+
+    @staticmethod
+    def get_users_near(lat, lng, radius, exclude_user_id=None, limit=None):
+        """
+        Finds users within a radius of a location.
+
+        Parameters:
+        - lat, lng: Center of the search in degrees.
+        - radius: Search radius in meters.
+        - exclude_user_id: A user to leave out, typically the one searching.
+        - limit: Maximum number of users to return.
+
+        Returns:
+        - A list of (user, distance in meters) tuples, nearest first.
+        """
+        query = User.query.filter(NearbyController._within_box(lat, lng, radius))
+        if exclude_user_id is not None:
+            query = query.filter(User.id != exclude_user_id)
+
+        nearby = []
+        for user in query:
+            distance = haversine(lat, lng, user.latitude, user.longitude)
+            if distance <= radius:
+                nearby.append((user, distance))
+        nearby.sort(key=lambda item: item[1])
+        return nearby[:limit]
+
+    @staticmethod
+    def get_groups_near(lat, lng, radius, limit=None):
+        """
+        Finds groups whose members' centroid is within a radius of a location.
+
+        A group matches on where its located members are on average, not
+        on whether any one member is within the radius: a group spread
+        around the search point matches even when nobody lives close to
+        it, and a group with a single nearby member does not. Candidates
+        come from range scans on the indexed centroid geohash, and the
+        exact distance is taken from the stored sums, so no member rows
+        are read.
+
+        Parameters:
+        - lat, lng: Center of the search in degrees.
+        - radius: Search radius in meters.
+        - limit: Maximum number of groups to return.
+
+        Returns:
+        - A list of (group, distance in meters to its centroid) tuples, nearest first.
+        """
+        candidates = Group.query.filter(NearbyController._in_cells(Group.centroid_geohash, lat, lng, radius))
+
+        nearby = []
+        for group in candidates:
+            centroid = GroupAggregates.centroid(group)
+            if centroid is None:
+                continue
+            distance = haversine(lat, lng, centroid[0], centroid[1])
+            if distance <= radius:
+                nearby.append((group, distance))
+        nearby.sort(key=lambda item: item[1])
+        return nearby[:limit]
@@ -0,0 +1,198 @@
+import json
+from concurrent.futures import wait
+from datetime import datetime
+from flask import current_app as app
+from app import db
+from app.models import PlaceDetailsEntry
+from .places_controller import _get_lookup_pool, lookup_flights
+from .storage import cache_write
+
+MINUTES_PER_DAY = 24 * 60
+
+# Details fields copied onto the enriched place
+ENRICHED_FIELDS = ('business_status', 'opening_hours', 'rating', 'user_ratings_total', 'price_level')
+
+
+class PlaceDetailsCache:
+    """
+    Persistent cache of Place details keyed by place_id.
+
+    Opening hours and ratings change rarely, so entries live for
+    PLACE_DETAILS_TTL seconds. Reads and writes take a whole shortlist at
+    once, one query each.
+    """
+
+    @staticmethod
+    def get_many(place_ids, allow_stale=False):
+        """
+        Looks up cached details for several places.
+
+        Parameters:
+        - place_ids: Iterable of place IDs.
+        - allow_stale: Also return expired entries, for use while the upstream is unavailable.
+
+        Returns:
+        - A dict of place_id -> details for every cached place.
+        """
+        place_ids = list(place_ids)
+        if not place_ids:
+            return {}
+        ttl = app.config.get('PLACE_DETAILS_TTL', 7 * 86400)
+        entries = PlaceDetailsEntry.query.filter(PlaceDetailsEntry.place_id.in_(place_ids)).all()
+        return {
+            entry.place_id: json.loads(entry.details)
+            for entry in entries
+            if allow_stale or not entry.is_expired(ttl)
+        }
+
+    @staticmethod
+    def set_many(details_by_id):
+        """
+        Stores details for several places, replacing existing entries.
+
+        Note:
+        - Cache write failures are rolled back and otherwise ignored; the
+          caller already has the fresh details.
+        """
+        if not details_by_id:
+            return
+        now = datetime.utcnow()
+        with cache_write():
+            existing = {
+                entry.place_id: entry
+                for entry in PlaceDetailsEntry.query.filter(PlaceDetailsEntry.place_id.in_(list(details_by_id)))
+            }
+            for place_id, details in details_by_id.items():
+                entry = existing.get(place_id)
+                if entry is None:
+                    entry = PlaceDetailsEntry(place_id=place_id)
+                    db.session.add(entry)
+                entry.details = json.dumps(details)
+                entry.created_at = now
+
+
+def _minute_of_week(point):
+    # Places API days run from 0 (Sunday) to 6 (Saturday)
+    return int(point['day']) * MINUTES_PER_DAY + int(point['time'][:2]) * 60 + int(point['time'][2:])
+
+
+def is_open_at(details, when):
+    """
+    Checks whether a place is open at a given local date and time.
+
+    Parameters:
+    - details: Place details with 'opening_hours' and 'business_status'.
+    - when: A naive datetime in the place's local time.
+
+    Returns:
+    - True or False, or None when the place publishes no opening hours.
+    """
+    if details.get('business_status') in ('CLOSED_PERMANENTLY', 'CLOSED_TEMPORARILY'):
+        return False
+    periods = (details.get('opening_hours') or {}).get('periods')
+    if not periods:
+        return None
+
+    minute = ((when.weekday() + 1) % 7) * MINUTES_PER_DAY + when.hour * 60 + when.minute
+    for period in periods:
+        if 'close' not in period:
+            # A single open period without a close time means open around the clock
+            return True
+        opens = _minute_of_week(period['open'])
+        closes = _minute_of_week(period['close'])
+        if closes <= opens:
+            # The period runs past Saturday midnight into the next week
+            if minute >= opens or minute < closes:
+                return True
+        elif opens <= minute < closes:
+            return True
+    return False
+
+
+def fetch_details(place_ids, provider, deadline=None):
+    """
+    Fetches details for a batch of places, cache first.
+
+    Places missing from the cache are looked up concurrently on the shared
+    lookup pool, coalesced with identical lookups in flight, and the call
+    waits at most `deadline` seconds for them.
+
+    Returns:
+    - A tuple (details_by_id, partial); partial is True when some lookups
+      timed out or failed and those places have no details.
+    """
+    place_ids = list(dict.fromkeys(place_ids))
+    details_by_id = PlaceDetailsCache.get_many(place_ids) if provider.cacheable else {}
+    missing = [place_id for place_id in place_ids if place_id not in details_by_id]
+    if not missing:
+        return details_by_id, False
+
+    if deadline is None:
+        deadline = app.config.get('PLACES_REQUEST_DEADLINE', 3.0)
+    pool = _get_lookup_pool()
+    futures = {}
+    for place_id in missing:
+        flight_key = (provider.name, 'details', place_id)
+        futures[lookup_flights.submit(flight_key, pool, provider.place_details, place_id)] = (place_id, flight_key)
+
+    done, not_done = wait(futures, timeout=deadline)
+    failed = set()
+    for future in not_done:
+        lookup_flights.abandon(futures[future][1], future)
+        failed.add(futures[future][0])
+
+    fetched = {}
+    for future in done:
+        place_id = futures[future][0]
+        try:
+            response = future.result()
+        except Exception:
+            failed.add(place_id)
+            continue
+        # NOT_FOUND and similar answers are final; cache them as empty details so they are not asked again
+        fetched[place_id] = response.get('result') or {}
+
+    if provider.cacheable:
+        PlaceDetailsCache.set_many(fetched)
+        if failed:
+            # An expired entry beats nothing while the upstream is failing
+            stale = PlaceDetailsCache.get_many(failed, allow_stale=True)
+            fetched.update(stale)
+            failed.difference_update(stale)
+    details_by_id.update(fetched)
+    return details_by_id, bool(failed)
+
+
+def enrich_places(places, provider, deadline=None):
+    """
+    Copies opening hours, rating and price level from Place details onto places.
+
+    Parameters:
+    - places: The ranked shortlist; only these places are looked up.
+    - provider: The PlacesProvider the places came from.
+
+    Returns:
+    - A tuple (places, partial). Places whose details could not be fetched
+      are returned unchanged.
+    """
+    details_by_id, partial = fetch_details([place['place_id'] for place in places], provider, deadline)
+    enriched = []
+    for place in places:
+        details = details_by_id.get(place['place_id'])
+        if details:
+            place = dict(place)
+            place.update({field: details[field] for field in ENRICHED_FIELDS if field in details})
+        enriched.append(place)
+    return enriched, partial
+
+
+def filter_open_at(places, when):
+    """
+    Drops places known to be closed at `when`.
+
+    Places without opening hours are kept; closing them out would hide
+    every place the provider has no hours for.
+    """
+    if when is None:
+        return list(places)
+    return [place for place in places if is_open_at(place, when) is not False]
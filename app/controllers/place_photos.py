@@ -0,0 +1,277 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import current_app as app
+from werkzeug.exceptions import TooManyRequests, Unauthorized
+from .places_controller import _get_lookup_pool, lookup_flights
+from .places_guard import TokenBucket
+
+# Photo references are URL-safe tokens; anything else is rejected before touching the disk or upstream
+PHOTO_REFERENCE_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,1024}$')
+
+# (magic bytes, file extension, mimetype) of the image formats Places serves
+IMAGE_TYPES = (
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'\x89PNG', 'png', 'image/png'),
+    (b'GIF8', 'gif', 'image/gif'),
+    (b'RIFF', 'webp', 'image/webp'),
+)
+MIMETYPES = {extension: mimetype for _, extension, mimetype in IMAGE_TYPES}
+
+# Eviction trims the store to this fraction of its size limit, so it does not run on every download
+EVICTION_LOW_WATER = 0.9
+
+# Seconds an unreferenced image is kept, covering the gap between writing an image and its ref file
+ORPHAN_GRACE = 60
+
+# Bytes stored per photo directory as far as this worker knows; None until first scanned
+_usage = {}
+_usage_lock = threading.Lock()
+
+# Users whose download budgets are tracked; the least recently active are dropped past this,
+# long after their buckets refilled
+FETCH_BUDGETS_MAX_USERS = 10000
+
+# Upstream downloads allowed per user, keyed by user id, least recently active first
+_fetch_budgets = OrderedDict()
+_fetch_budgets_lock = threading.Lock()
+
+
+def is_valid_reference(photo_reference):
+    return bool(PHOTO_REFERENCE_PATTERN.match(photo_reference))
+
+
+class PlacePhotoStore:
+    """
+    On-disk store of place photos, one image per (photo reference, width bucket).
+
+    Images are content-addressed: each is written once under the SHA-256
+    of its bytes, which doubles as its ETag. A small ref file per
+    (reference, width) points at the image, so identical images reached
+    through several references or widths are stored once.
+
+    With max_bytes set, the least recently served (reference, width)
+    entries are evicted once the store outgrows it, together with images
+    no remaining entry points at.
+    """
+
+    def __init__(self, root, widths, max_bytes=None):
+        self.root = root
+        self.widths = tuple(sorted(widths))
+        self.max_bytes = max_bytes
+
+    def bucket_width(self, width):
+        """Rounds a requested width up to the nearest bucket, capped at the largest one."""
+        for bucket in self.widths:
+            if width <= bucket:
+                return bucket
+        return self.widths[-1]
+
+    def _ref_path(self, photo_reference, width):
+        digest = hashlib.sha256(photo_reference.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, 'refs', digest[:2], f'{digest}_{width}')
+
+    def _blob_path(self, name):
+        return os.path.join(self.root, 'blobs', name[:2], name)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        # Write to a temporary file and rename so readers never see a partial image
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, photo_reference, width):
+        """
+        Looks up a stored photo.
+
+        Returns:
+        - A tuple (path, etag, mimetype), or None when the photo is not stored.
+        """
+        ref_path = self._ref_path(photo_reference, width)
+        try:
+            with open(ref_path) as ref:
+                name = ref.read().strip()
+        except FileNotFoundError:
+            return None
+        path = self._blob_path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            # The ref file's mtime is its last use for least recently used eviction
+            os.utime(ref_path)
+        except FileNotFoundError:
+            pass  # Evicted by another worker; the open blob path is still served this time
+        digest, extension = name.split('.')
+        return path, digest, MIMETYPES.get(extension, 'application/octet-stream')
+
+    def put(self, photo_reference, width, data):
+        """
+        Stores image bytes for a photo reference and width.
+
+        Returns:
+        - A tuple (path, etag, mimetype) of the stored image.
+        """
+        extension, mimetype = 'bin', 'application/octet-stream'
+        for magic, image_extension, image_mimetype in IMAGE_TYPES:
+            if data.startswith(magic):
+                extension, mimetype = image_extension, image_mimetype
+                break
+        digest = hashlib.sha256(data).hexdigest()
+        name = f'{digest}.{extension}'
+        path = self._blob_path(name)
+        added = len(name)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+            added += len(data)
+        self._write_atomic(self._ref_path(photo_reference, width), name.encode('ascii'))
+        if self.max_bytes is not None:
+            self._record_usage(added)
+        return path, digest, mimetype
+
+    def _record_usage(self, added):
+        with _usage_lock:
+            usage = _usage.get(self.root)
+            if usage is None:
+                usage = self.size()
+            else:
+                usage += added
+            if usage > self.max_bytes:
+                usage = self.evict(int(self.max_bytes * EVICTION_LOW_WATER))
+            _usage[self.root] = usage
+
+    def _files(self, kind):
+        # (path, name, stat) of every stored file under refs/ or blobs/, skipping in-progress writes
+        for directory, _, names in os.walk(os.path.join(self.root, kind)):
+            for name in names:
+                if name.startswith(tempfile.gettempprefix()):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    yield path, name, os.stat(path)
+                except FileNotFoundError:
+                    continue  # Removed by another worker
+
+    def size(self):
+        """Bytes used by stored images and ref files."""
+        return sum(stat.st_size for kind in ('refs', 'blobs') for _, _, stat in self._files(kind))
+
+    def evict(self, max_bytes):
+        """
+        Deletes least recently served entries until the store fits in max_bytes.
+
+        An image is deleted with the last entry that points at it. Images
+        no entry points at, e.g. after a reference started serving a new
+        image, are deleted first.
+
+        Returns:
+        - The bytes still used by the store.
+        """
+        refs = []
+        for path, _, stat in self._files('refs'):
+            try:
+                with open(path) as ref:
+                    refs.append((stat.st_mtime, stat.st_size, path, ref.read().strip()))
+            except FileNotFoundError:
+                continue
+        blobs = {name: (path, stat.st_size, stat.st_mtime) for path, name, stat in self._files('blobs')}
+        total = sum(size for _, size, _, _ in refs) + sum(size for _, size, _ in blobs.values())
+        ref_counts = Counter(name for _, _, _, name in refs)
+
+        orphan_cutoff = time.time() - ORPHAN_GRACE
+        for name, (path, size, mtime) in list(blobs.items()):
+            if not ref_counts[name] and mtime < orphan_cutoff:
+                total -= self._remove(path, size)
+                del blobs[name]
+
+        refs.sort()
+        for _, size, path, name in refs:
+            if total <= max_bytes:
+                break
+            total -= self._remove(path, size)
+            ref_counts[name] -= 1
+            if not ref_counts[name] and name in blobs:
+                blob_path, blob_size, _ = blobs.pop(name)
+                total -= self._remove(blob_path, blob_size)
+        return total
+
+    @staticmethod
+    def _remove(path, size):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # Already removed by another worker
+        return size
+
+    def fetch(self, photo_reference, width, provider):
+        """Downloads a photo from the provider and stores it."""
+        return self.put(photo_reference, width, provider.place_photo(photo_reference, width))
+
+
+def get_photo_store():
+    return PlacePhotoStore(
+        app.config['PLACE_PHOTO_DIR'],
+        app.config.get('PLACE_PHOTO_WIDTHS', (100, 200, 400, 800, 1600)),
+        app.config.get('PLACE_PHOTO_CACHE_MAX_BYTES')
+    )
+
+
+def _fetch_budget(user_id):
+    with _fetch_budgets_lock:
+        budget = _fetch_budgets.get(user_id)
+        if budget is None:
+            budget = _fetch_budgets[user_id] = TokenBucket(app.config.get('PLACE_PHOTO_FETCHES_PER_MINUTE', 60), 60.0)
+            while len(_fetch_budgets) > FETCH_BUDGETS_MAX_USERS:
+                _fetch_budgets.popitem(last=False)
+        else:
+            _fetch_budgets.move_to_end(user_id)
+        return budget
+
+
+def get_photo(photo_reference, width, provider, user_id=None):
+    """
+    Returns a photo thumbnail, downloading it on first use.
+
+    Parameters:
+    - photo_reference: The photo_reference from a places result.
+    - width: Requested width in pixels; rounded up to a PLACE_PHOTO_WIDTHS bucket.
+    - provider: The PlacesProvider the reference came from.
+    - user_id: The user asking, or None for an anonymous visitor. Only
+      logged-in users may trigger downloads, limited to
+      PLACE_PHOTO_FETCHES_PER_MINUTE per user.
+
+    Returns:
+    - A tuple (path, etag, mimetype) of the stored image.
+
+    Raises:
+    - Unauthorized: If the photo is not stored and nobody is logged in.
+    - TooManyRequests: If the photo is not stored and the user has used up
+      their downloads.
+
+    Note:
+    - Concurrent requests for the same photo and bucket share one download.
+    """
+    store = get_photo_store()
+    bucket = store.bucket_width(width)
+    stored = store.get(photo_reference, bucket)
+    if stored is not None:
+        return stored
+    if user_id is None:
+        raise Unauthorized("Log in to load new photos.")
+    if not _fetch_budget(user_id).try_acquire():
+        raise TooManyRequests("Too many photo downloads, try again shortly.")
+    future = lookup_flights.submit(
+        (provider.name, 'photo', photo_reference, bucket), _get_lookup_pool(),
+        store.fetch, photo_reference, bucket, provider
+    )
+    return future.result()
@@ -0,0 +1,123 @@
+import numpy as np
+from utils.geo import distance_matrix
+from .meeting_point import member_coordinates
+
+# Relative weight of each objective; all objectives are scaled to [0, 1] before weighting
+DEFAULT_WEIGHTS = {
+    'total_distance': 1.0,  # Sum of every member's travel distance
+    'max_distance': 1.0,  # Farthest any single member has to travel
+    'variance': 0.5,  # How unevenly travel is spread across members
+    'rating': 0.5,  # Google rating, higher is better
+    'preference': 1.0,  # 'preference_score' from preference_scoring, higher is better
+}
+
+
+def place_coordinates(places):
+    """
+    Extracts an (M, 2) array of (lat, lng) degrees from Places API results.
+
+    Places without a geometry get NaN coordinates.
+    """
+    coords = np.full((len(places), 2), np.nan)
+    for i, place in enumerate(places):
+        location = place.get('geometry', {}).get('location')
+        if location:
+            coords[i] = (location['lat'], location['lng'])
+    return coords
+
+
+def _scale(values):
+    """Scales values to [0, 1]; a column with no spread contributes nothing."""
+    low, high = np.nanmin(values), np.nanmax(values)
+    if not np.isfinite(low) or high - low < 1e-12:
+        return np.zeros_like(values)
+    return (values - low) / (high - low)
+
+
+def rank_places(places, member_locations, weights=None, travel_times=None):
+    """
+    Ranks candidate places by how fair they are to every member of the group.
+
+    The full place x member distance matrix is computed in one pass and each
+    place is scored on the weighted objectives in DEFAULT_WEIGHTS. Lower
+    scores are better.
+
+    Parameters:
+    - places: List of Places API result dicts.
+    - member_locations: Member locations, see meeting_point.member_coordinates.
+    - weights: Optional dict overriding entries of DEFAULT_WEIGHTS.
+    - travel_times: Optional (M, N) array of seconds from each member to each
+      place, see road_routing.member_travel_times. When given, the total,
+      max and variance objectives are scored on travel time instead of
+      distance.
+
+    Returns:
+    - A new list of place dicts sorted best first, each with a 'scores' dict
+      holding 'score', 'total_distance', 'max_distance', 'mean_distance' and
+      'variance' (distances in meters), plus 'total_travel_time' and
+      'max_travel_time' (seconds) when travel times were given. Places
+      without coordinates are placed last with None scores.
+    """
+    if not places:
+        return []
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+
+    members = member_coordinates(member_locations)
+    coords = place_coordinates(places)
+    located = ~np.isnan(coords).any(axis=1)
+
+    total = np.full(len(places), np.nan)
+    maximum = np.full(len(places), np.nan)
+    mean = np.full(len(places), np.nan)
+    variance = np.full(len(places), np.nan)
+    if located.any() and len(members):
+        distances = distance_matrix(coords[located], members)
+        total[located] = distances.sum(axis=1)
+        maximum[located] = distances.max(axis=1)
+        mean[located] = total[located] / distances.shape[1]
+        variance[located] = distances.var(axis=1)
+
+    # Trip costs drive the travel objectives: road travel times when available, distances otherwise
+    cost_total, cost_max, cost_variance = total, maximum, variance
+    if travel_times is not None and len(members):
+        travel_times = np.asarray(travel_times, dtype=np.float64)
+        cost_total = travel_times.sum(axis=1)
+        cost_max = travel_times.max(axis=1)
+        cost_variance = travel_times.var(axis=1)
+
+    ratings = np.array([place.get('rating') or np.nan for place in places], dtype=np.float64)
+    # Unrated places are treated as average rather than worst
+    ratings = np.where(np.isnan(ratings), np.nanmean(ratings) if np.isfinite(ratings).any() else 0.0, ratings)
+
+    preference = np.array([place.get('preference_score', 0.0) for place in places], dtype=np.float64)
+
+    score = (
+        weights['total_distance'] * _scale(cost_total)
+        + weights['max_distance'] * _scale(cost_max)
+        + weights['variance'] * _scale(cost_variance)
+        + weights['rating'] * (1.0 - _scale(ratings))
+        + weights['preference'] * (1.0 - _scale(preference))
+    )
+    weight_sum = sum(weights.values())
+    if weight_sum:
+        score = score / weight_sum
+    score[~located] = np.inf
+
+    order = np.argsort(score, kind='stable')
+    ranked = []
+    for i in order:
+        if not located[i]:
+            scores = dict.fromkeys(('score', 'total_distance', 'max_distance', 'mean_distance', 'variance'))
+        else:
+            scores = {
+                'score': float(score[i]),
+                'total_distance': float(total[i]),
+                'max_distance': float(maximum[i]),
+                'mean_distance': float(mean[i]),
+                'variance': float(variance[i]),
+            }
+        if travel_times is not None:
+            scores['total_travel_time'] = float(cost_total[i]) if located[i] else None
+            scores['max_travel_time'] = float(cost_max[i]) if located[i] else None
+        ranked.append(dict(places[i], scores=scores))
+    return ranked
@@ -0,0 +1,187 @@
+import json
+import math
+import threading
+from datetime import datetime, timedelta
+from flask import current_app as app
+from sqlalchemy import bindparam, update
+from app import db
+from app.models import PlaceCacheEntry
+from .storage import cache_write
+from utils.func import to_lat_lng
+
+
+class PlacesCache:
+    """
+    Persistent cache for Places nearby results, stored in the application database.
+
+    Entries are keyed by the snapped location cell, the search radius and the
+    place type, expire after PLACES_CACHE_TTL seconds and are evicted least
+    recently used first once PLACES_CACHE_MAX_ENTRIES is exceeded. Expired
+    entries can still stand in for an unavailable upstream until they are
+    PLACES_CACHE_MAX_STALE seconds old, after which they are purged.
+
+    Hits do not write to the database: access times older than
+    PLACES_CACHE_TOUCH_INTERVAL seconds are queued in memory and saved with
+    the next set, just before eviction needs them.
+    """
+
+    hits = 0
+    misses = 0
+    _lock = threading.Lock()
+    _touched = {}  # Entry id -> access time not yet saved
+
+    @staticmethod
+    def snap_location(location):
+        """
+        Snaps a location onto the cache grid.
+
+        Parameters:
+        - location: A (lat, lng) tuple or a dict with 'latitude'/'longitude' keys.
+
+        Returns:
+        - A tuple of ((lat_cell, lng_cell), (center_lat, center_lng)). Lookups
+          should be made against the cell center so that a cached result is
+          valid for every location inside the cell.
+        """
+        cell_size = app.config.get('PLACES_CACHE_CELL_SIZE', 0.005)
+        lat, lng = to_lat_lng(location)
+        lat_cell = math.floor(lat / cell_size)
+        lng_cell = math.floor(lng / cell_size)
+        center = (round((lat_cell + 0.5) * cell_size, 6), round((lng_cell + 0.5) * cell_size, 6))
+        return (lat_cell, lng_cell), center
+
+    @staticmethod
+    def make_key(cell, radius, place_type):
+        """Builds the cache key for a snapped cell, radius and place type."""
+        return f'{cell[0]}:{cell[1]}:{radius}:{place_type}'
+
+    @classmethod
+    def _count(cls, hit):
+        with cls._lock:
+            if hit:
+                cls.hits += 1
+            else:
+                cls.misses += 1
+
+    @classmethod
+    def get(cls, key, allow_stale=False):
+        """
+        Looks up cached results.
+
+        Parameters:
+        - key: Cache key built with make_key.
+        - allow_stale: Also return expired entries up to PLACES_CACHE_MAX_STALE
+          seconds old, for use while the upstream is unavailable.
+
+        Returns:
+        - The cached list of place results, or None on a miss or expired entry.
+        """
+        entry = PlaceCacheEntry.query.filter_by(cache_key=key).first()
+        if allow_stale:
+            max_age = app.config.get('PLACES_CACHE_MAX_STALE', 60 * 60 * 24 * 3)
+        else:
+            max_age = app.config.get('PLACES_CACHE_TTL', 86400)
+        if entry is None or entry.is_expired(max_age):
+            cls._count(hit=False)
+            return None
+
+        cls._count(hit=True)
+        now = datetime.utcnow()
+        touch_interval = timedelta(seconds=app.config.get('PLACES_CACHE_TOUCH_INTERVAL', 600))
+        if entry.last_accessed_at is None or now - entry.last_accessed_at > touch_interval:
+            with cls._lock:
+                cls._touched[entry.id] = now
+        return json.loads(entry.results)
+
+    @classmethod
+    def _save_touches(cls):
+        """Writes the queued access times in one batch, without committing."""
+        with cls._lock:
+            touched, cls._touched = cls._touched, {}
+        if touched:
+            # Core executemany: entries evicted meanwhile simply match no row
+            table = PlaceCacheEntry.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('entry_id')).values(last_accessed_at=bindparam('accessed_at')),
+                [{'entry_id': entry_id, 'accessed_at': accessed_at} for entry_id, accessed_at in touched.items()]
+            )
+
+    @classmethod
+    def set(cls, key, place_type, results):
+        """
+        Stores results for a key, replacing any existing entry, then enforces the size cap.
+
+        Parameters:
+        - key: Cache key built with make_key.
+        - place_type: The Places type the results were fetched for.
+        - results: List of place result dicts.
+
+        Note:
+        - Cache write failures are rolled back and otherwise ignored; the
+          caller already has the fresh results.
+        """
+        now = datetime.utcnow()
+        with cache_write():
+            entry = PlaceCacheEntry.query.filter_by(cache_key=key).first()
+            if entry is None:
+                entry = PlaceCacheEntry(cache_key=key, place_type=place_type)
+                db.session.add(entry)
+            entry.results = json.dumps(results)
+            entry.created_at = now
+            entry.last_accessed_at = now
+            db.session.flush()
+            cls._save_touches()
+            cls._evict()
+
+    @staticmethod
+    def _evict():
+        """
+        Purges entries too old to serve even as stale results, then trims the
+        table to PLACES_CACHE_MAX_ENTRIES, least recently used first.
+
+        Expired entries younger than PLACES_CACHE_MAX_STALE are left in place
+        so they can still be served with allow_stale while the upstream is
+        unavailable.
+        """
+        max_entries = app.config.get('PLACES_CACHE_MAX_ENTRIES', 5000)
+        cutoff = datetime.utcnow() - timedelta(seconds=app.config.get('PLACES_CACHE_MAX_STALE', 60 * 60 * 24 * 3))
+        PlaceCacheEntry.query.filter(PlaceCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+
+        overflow = PlaceCacheEntry.query.count() - max_entries
+        if overflow > 0:
+            stale_ids = db.session.query(PlaceCacheEntry.id) \
+                .order_by(PlaceCacheEntry.last_accessed_at.asc()) \
+                .limit(overflow)
+            PlaceCacheEntry.query.filter(PlaceCacheEntry.id.in_(stale_ids.scalar_subquery())) \
+                .delete(synchronize_session=False)
+
+    @staticmethod
+    def invalidate(key=None):
+        """
+        Deletes cached entries.
+
+        Parameters:
+        - key: Cache key to delete. When omitted the whole cache is cleared.
+
+        Returns:
+        - Number of entries deleted.
+        """
+        query = PlaceCacheEntry.query
+        if key is not None:
+            query = query.filter_by(cache_key=key)
+        deleted = query.delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    @classmethod
+    def stats(cls):
+        """Returns hit/miss counters for this process and the current entry count."""
+        with cls._lock:
+            hits, misses = cls.hits, cls.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'entries': PlaceCacheEntry.query.count(),
+        }
@@ -1,3 +1,11 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from itertools import islice
+from flask import current_app as app
+from .places_cache import PlacesCache
+from .single_flight import SingleFlight
+
 activity_type_mapping = {
     'social': ['restaurant', 'cafe', 'bar'],
     'out_adv': ['park', 'campground', 'zoo'],
@@ -6,41 +14,267 @@ activity_type_mapping = {
     'cor_pro': ['conference_center', 'coworking_space'],
 }
 
+# Shared pool for per-type lookups; bounded so bursts of page loads cannot spawn unbounded threads
+_lookup_pool = None
+_lookup_pool_lock = threading.Lock()
+
+def _get_lookup_pool():
+    global _lookup_pool
+    with _lookup_pool_lock:
+        if _lookup_pool is None:
+            _lookup_pool = ThreadPoolExecutor(
+                max_workers=app.config.get('PLACES_MAX_WORKERS', 8),
+                thread_name_prefix='places-lookup'
+            )
+        return _lookup_pool
+
+# Identical lookups in flight at the same time (e.g. a whole group opening the page) share one upstream call
+lookup_flights = SingleFlight()
+
+class NearbyPlacesStream:
+    """
+    Lazily streams unique nearby places for a list of place types.
+
+    The first page of every type is requested concurrently up front and
+    places are yielded as soon as any page arrives, cached pages first.
+    Further pages are only fetched through next_page_token once the
+    consumer has used up everything already downloaded, so pages nobody
+    looks at are never requested.
+
+    Attributes:
+    - partial: True once a first page timed out or a lookup failed.
+    - degraded: True once results came from an expired cache entry or the
+      fallback provider instead of the upstream; such results must not be
+      stored as if they were fresh.
+    """
+
+    # Places API pages hold at most 20 results; a full cached page may have more behind it
+    PAGE_SIZE = 20
+
+    def __init__(self, central_location, place_types, provider, radius=5000, refresh=False, deadline=None, max_pages=3):
+        self.provider = provider
+        self.radius = radius
+        self.refresh = refresh
+        self.deadline = app.config.get('PLACES_REQUEST_DEADLINE', 3.0) if deadline is None else deadline
+        self.max_pages = max_pages
+        self.page_token_delay = app.config.get('PLACES_PAGE_TOKEN_DELAY', 2.0)
+        self.place_types = list(place_types)
+        self.partial = False
+        self.degraded = False
+
+        # Snap the search location so nearby requests share cached results
+        self._cell, self._search_location = PlacesCache.snap_location(central_location)
+        self._seen = set()
+        self._pages = {}  # place type -> pages consumed
+        self._tokens = {}  # place type -> (next_page_token, time it was issued) from the last live page
+        self._cached_full = []  # types whose first page came from a full cached page
+        self._cached = None  # (place type, results) of first pages served from the cache
+        self._pending = None  # first-page future -> (place type, cache key, flight key)
+        self._iterator = self._generate()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        """Stops the stream, releasing first-page lookups nobody will read."""
+        self._iterator.close()
+        self._abandon_pending()
+
+    def prefetch(self):
+        """
+        Starts the first-page lookups without waiting for them.
+
+        Iterating does this implicitly; calling it early lets several
+        streams download concurrently before any of them is consumed.
+        """
+        if self._pending is not None:
+            return
+        provider = self.provider
+        self._cached = []
+        self._pending = {}
+        for place_type in self.place_types:
+            cache_key = PlacesCache.make_key(self._cell, self.radius, place_type)
+            results = None if self.refresh or not provider.cacheable else PlacesCache.get(cache_key)
+            if results is not None:
+                self._cached.append((place_type, results))
+                continue
+            # API call for each place type not served from the cache, run in parallel
+            flight_key = (provider.name, cache_key)
+            future = lookup_flights.submit(
+                flight_key, _get_lookup_pool(),
+                provider.places_nearby, location=self._search_location, radius=self.radius, type=place_type
+            )
+            self._pending[future] = (place_type, cache_key, flight_key)
+
+    def _abandon_pending(self):
+        for future, (_, _, flight_key) in (self._pending or {}).items():
+            lookup_flights.abandon(flight_key, future)
+        if self._pending:
+            self._pending.clear()
+
+    def has_more(self):
+        """Whether further pages could still be fetched."""
+        return any(
+            self._pages.get(place_type, 0) < self.max_pages
+            and (self._tokens.get(place_type) or place_type in self._cached_full)
+            for place_type in self.place_types
+        )
+
+    def _unique(self, places):
+        # Remove duplicate places by place_id across types and pages
+        for place in places:
+            if place['place_id'] not in self._seen:
+                self._seen.add(place['place_id'])
+                yield place
+
+    def _generate(self):
+        yield from self._first_pages()
+        yield from self._next_pages()
+
+    def _first_pages(self):
+        provider = self.provider
+        self.prefetch()
+        cached, pending = self._cached, self._pending
+
+        errors = []
+        try:
+            for place_type, results in cached:
+                self._pages[place_type] = 1
+                if len(results) >= self.PAGE_SIZE:
+                    self._cached_full.append(place_type)
+                yield from self._unique(results)
+
+            try:
+                for future in as_completed(pending, timeout=self.deadline):
+                    place_type, cache_key, _ = pending.pop(future)
+                    try:
+                        places_result = future.result()
+                    except Exception as e:
+                        # Upstream failed, rate limited or circuit open: an expired cache entry beats nothing
+                        stale = PlacesCache.get(cache_key, allow_stale=True) if provider.cacheable else None
+                        if stale is None:
+                            errors.append(e)
+                            self.partial = True
+                        else:
+                            self.degraded = True
+                            self._pages[place_type] = 1
+                            yield from self._unique(stale)
+                        continue
+                    results = places_result.get('results', [])
+                    if places_result.get('fallback'):
+                        self.degraded = True
+                    # Cache writes happen here, on the request thread that owns the session
+                    elif provider.cacheable:
+                        PlacesCache.set(cache_key, place_type, results)
+                    self._pages[place_type] = 1
+                    self._remember_token(place_type, places_result)
+                    yield from self._unique(results)
+            except FuturesTimeout:
+                # Deadline passed; return whatever finished and flag the rest as missing
+                self.partial = True
+        finally:
+            self._abandon_pending()
+
+        if errors and not self._pages:
+            raise errors[0]
+
+    def _remember_token(self, place_type, places_result):
+        token = places_result.get('next_page_token')
+        self._tokens[place_type] = (token, time.monotonic()) if token else None
+
+    def _fetch_page(self, place_type, page_token, issued_at=None):
+        if issued_at is not None:
+            # Wait out the token's warm-up instead of burning a request (and a breaker failure) on it
+            remaining = issued_at + self.page_token_delay - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        attempts = 3 if page_token else 1
+        for attempt in range(attempts):
+            try:
+                return self.provider.places_nearby(
+                    location=self._search_location, radius=self.radius, type=place_type, page_token=page_token
+                )
+            except Exception:
+                # A fresh next_page_token is rejected until Google has prepared the page
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(self.page_token_delay)
+
+    def _next_pages(self):
+        while True:
+            progressed = False
+            # Round-robin over types so every type contributes its next page in turn
+            for place_type in self.place_types:
+                if self._pages.get(place_type, 0) >= self.max_pages:
+                    continue
+                token = self._tokens.pop(place_type, None)
+                if token is None and place_type in self._cached_full:
+                    # The cached first page has no usable token any more; fetch it live for one
+                    self._cached_full.remove(place_type)
+                    page_token, issued_at = None, None
+                elif token is not None:
+                    page_token, issued_at = token
+                    self._pages[place_type] += 1
+                else:
+                    continue
+
+                try:
+                    places_result = self._fetch_page(place_type, page_token, issued_at)
+                except Exception:
+                    self.partial = True
+                    continue
+                progressed = True
+                if places_result.get('fallback'):
+                    self.degraded = True
+                self._remember_token(place_type, places_result)
+                yield from self._unique(places_result.get('results', []))
+            if not progressed:
+                return
+
+
 # Get the nearby places for a given activity type
-def get_nearby_places(central_location, activity_type_mapping, activity_type, gmaps):
+def stream_nearby_places(central_location, activity_type_mapping, activity_type, provider, radius=5000, refresh=False, deadline=None, max_pages=3):
+    """
+    Returns a NearbyPlacesStream over every place type mapped to an activity.
+    """
     activity_types = activity_type_mapping.get(activity_type.lower(), ['restaurant'])  # Default to 'restaurant'
-    all_places = []
-    for place_type in activity_types:
-        # API call for each place type
-        places_result = gmaps.places_nearby(location=central_location, radius=5000, type=place_type)
-        all_places.extend(places_result.get('results', []))
-        # Check and handle pagination if necessary (not shown here)
-    
-    # Remove duplicate places by place_id
-    unique_places = {place['place_id']: place for place in all_places}.values()
-    return list(unique_places)[:10] # Return only the first 10 places
-
-def filter_places(all_places, preferences):
-    # Mappings for preferences to Google Places types
-    preference_mapping = {
-        'quiet': 'library',
-        'lively': 'night_club',
-        'cozy': 'cafe',
-    }
+    return NearbyPlacesStream(
+        central_location, activity_types, provider,
+        radius=radius, refresh=refresh, deadline=deadline, max_pages=max_pages
+    )
+
 
-    # Flatten the list of all preference-related types
-    preferred_types = set()
-    for category, prefs in preferences.items():
-        for pref in prefs:
-            google_type = preference_mapping.get(pref.lower())
-            if google_type:
-                preferred_types.add(google_type)
-
-    # Filter places that match the preferred types
-    filtered_places_list = [
-        place for place in all_places
-        if any(ptype in place.get('types', []) for ptype in preferred_types)
-    ]
-
-    # Return the filtered list of places
-    return filtered_places_list
+def get_nearby_places(central_location, activity_type_mapping, activity_type, provider, radius=5000, refresh=False, deadline=None, limit=10):
+    """
+    Looks up the first page of nearby places for every place type mapped to an activity.
+
+    Parameters:
+    - provider: The PlacesProvider to query (see places_provider).
+    - limit: Maximum number of places to return, or None for all of them.
+
+    Cached types are served from PlacesCache when the provider is cacheable;
+    the remaining types are fetched concurrently and the call waits at most
+    `deadline` seconds for them.
+
+    Returns:
+    - A dict with 'results' (up to `limit` unique places), 'partial', which is
+      True when some place types timed out or failed and were left out, and
+      'degraded', which is True when expired cache entries or the fallback
+      provider stood in for the upstream.
+    """
+    stream = stream_nearby_places(
+        central_location, activity_type_mapping, activity_type, provider,
+        radius=radius, refresh=refresh, deadline=deadline, max_pages=1
+    )
+    try:
+        results = list(islice(stream, limit))
+    finally:
+        stream.close()
+    return {
+        'results': results,
+        'partial': stream.partial,
+        'degraded': stream.degraded
+    }
@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+from .places_provider import PlacesProvider
+
+
+class PlacesUnavailable(Exception):
+    """Raised when a guarded call is rejected by the rate limiter or the open circuit."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Holds up to `capacity` tokens and refills continuously so that
+    `capacity` tokens become available every `period` seconds.
+    """
+
+    def __init__(self, capacity, period, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream errors.
+
+    The circuit opens after `failure_threshold` consecutive failures. Once
+    `reset_timeout` seconds have passed, a single trial call is let through
+    (half-open); it closes the circuit on success and reopens it on failure.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_at = None  # When the next half-open trial call is allowed
+        self.open_seconds = 0.0  # Total time spent open, excluding the current open period
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() >= self.probe_at:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                self.open_seconds += self.clock() - self.opened_at
+                self.opened_at = None
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            now = self.clock()
+            if self.state == self.HALF_OPEN:
+                # The trial failed; open time keeps counting from the original opening
+                self.state = self.OPEN
+                self.probe_at = now + self.reset_timeout
+            elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = now
+                self.probe_at = now + self.reset_timeout
+
+    def release(self):
+        """Gives back a half-open trial slot that was granted but not used."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def total_open_seconds(self):
+        with self._lock:
+            current = self.clock() - self.opened_at if self.opened_at is not None else 0.0
+            return self.open_seconds + current
+
+
+class GuardedPlacesProvider(PlacesProvider):
+    """
+    Wraps a places provider with quota budgets, a circuit breaker and metrics.
+
+    Every call must get a token from both the per-minute and the per-day
+    bucket and be allowed by the circuit breaker. Rejected calls go to the
+    fallback provider when one is set, otherwise they raise PlacesUnavailable.
+    """
+
+    def __init__(self, provider, per_minute, per_day, failure_threshold=5, reset_timeout=30.0,
+                 fallback=None, latency_window=1000, clock=time.monotonic):
+        self.provider = provider
+        self.name = provider.name
+        self.cacheable = provider.cacheable
+        self.fallback = fallback
+        self.clock = clock
+        self.minute_bucket = TokenBucket(per_minute, 60.0, clock)
+        self.day_bucket = TokenBucket(per_day, 86400.0, clock)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock)
+        self._latencies = deque(maxlen=latency_window)
+        self._counters = {'calls': 0, 'successes': 0, 'failures': 0, 'rate_limited': 0,
+                          'circuit_rejected': 0, 'fallbacks': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _reject(self, reason, fallback_call):
+        self._count(reason)
+        if fallback_call is not None:
+            self._count('fallbacks')
+            result = dict(fallback_call())
+            # Flag fallback results so they are not cached as if they came from this provider
+            result['fallback'] = True
+            return result
+        raise PlacesUnavailable(f"{self.name} places provider unavailable: {reason}")
+
+    def _guarded(self, call, fallback_call=None):
+        self._count('calls')
+        if not self.breaker.allow():
+            return self._reject('circuit_rejected', fallback_call)
+        if not self.minute_bucket.try_acquire():
+            self.breaker.release()
+            return self._reject('rate_limited', fallback_call)
+        if not self.day_bucket.try_acquire():
+            self.minute_bucket.refund()
+            self.breaker.release()
+            return self._reject('rate_limited', fallback_call)
+
+        started = self.clock()
+        try:
+            result = call()
+        except Exception:
+            self.breaker.record_failure()
+            self._count('failures')
+            with self._lock:
+                self._latencies.append(self.clock() - started)
+            raise
+        self.breaker.record_success()
+        self._count('successes')
+        with self._lock:
+            self._latencies.append(self.clock() - started)
+        return result
+
+    def places_nearby(self, location, radius, type, page_token=None):
+        fallback_call = None
+        # Page tokens belong to this provider, the fallback cannot continue its pages
+        if self.fallback is not None and not page_token:
+            fallback_call = lambda: self.fallback.places_nearby(location=location, radius=radius, type=type)
+        return self._guarded(
+            lambda: self.provider.places_nearby(location=location, radius=radius, type=type, page_token=page_token),
+            fallback_call
+        )
+
+    def place_details(self, place_id):
+        # Place IDs are provider specific, so details never go to the fallback
+        return self._guarded(lambda: self.provider.place_details(place_id))
+
+    def place_photo(self, photo_reference, max_width):
+        return self._guarded(lambda: self.provider.place_photo(photo_reference, max_width))
+
+    def stats(self):
+        """Counters, latency percentiles (seconds), remaining budgets and circuit state."""
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        counters.update({
+            'latency_p50': percentile(50),
+            'latency_p95': percentile(95),
+            'latency_p99': percentile(99),
+            'minute_budget_remaining': int(self.minute_bucket.available()),
+            'day_budget_remaining': int(self.day_bucket.available()),
+            'circuit_state': self.breaker.state,
+            'circuit_open_seconds': self.breaker.total_open_seconds(),
+        })
+        return counters
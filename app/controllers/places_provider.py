@@ -0,0 +1,289 @@
+import csv
+import json
+import threading
+import googlemaps
+from flask import current_app as app
+from utils.geo import haversine, bounding_box
+from .storage import SQLiteFileStore
+
+# Place details fields used to enrich shortlisted places
+DETAIL_FIELDS = ('place_id', 'business_status', 'opening_hours', 'rating', 'user_ratings_total', 'price_level')
+
+
+class PlacesProvider:
+    """
+    Interface for sources of nearby places.
+
+    Implementations answer places_nearby with the same shape as the Google
+    Places API: a dict with a 'results' list of place dicts carrying at least
+    'place_id', 'name', 'vicinity', 'types' and 'geometry'. When more results
+    exist the dict also carries a 'next_page_token', which is passed back as
+    page_token to fetch the following page.
+    """
+
+    name = 'base'
+    # Whether results should go through PlacesCache
+    cacheable = False
+
+    def places_nearby(self, location, radius, type, page_token=None):
+        raise NotImplementedError
+
+    def place_details(self, place_id):
+        """Returns {'result': {...}, 'status': ...} with DETAIL_FIELDS for one place, like the Places API."""
+        raise NotImplementedError
+
+    def place_photo(self, photo_reference, max_width):
+        """Returns the image bytes for a photo reference from a places result, at most max_width wide."""
+        raise NotImplementedError
+
+
+class GooglePlacesProvider(PlacesProvider):
+    """Places provider backed by the Google Places nearby search."""
+
+    name = 'google'
+    cacheable = True
+
+    def __init__(self, api_key, timeout=None):
+        self.client = googlemaps.Client(key=api_key, timeout=timeout)
+
+    def places_nearby(self, location, radius, type, page_token=None):
+        if page_token:
+            return self.client.places_nearby(page_token=page_token)
+        return self.client.places_nearby(location=location, radius=radius, type=type)
+
+    def place_details(self, place_id):
+        # Restricting fields keeps the request in the cheaper Basic/Contact/Atmosphere SKUs
+        return self.client.place(place_id, fields=list(DETAIL_FIELDS))
+
+    def place_photo(self, photo_reference, max_width):
+        # Google scales the photo down to max_width before sending it
+        return b''.join(self.client.places_photo(photo_reference, max_width=max_width))
+
+
+class LocalPlacesProvider(SQLiteFileStore, PlacesProvider):
+    """
+    Offline places provider backed by an imported POI dataset.
+
+    POIs live in a SQLite file with an R*Tree index over their coordinates,
+    so a nearby query is a bounding-box index probe plus an exact distance
+    check on the handful of rows inside the box.
+    """
+
+    name = 'local'
+    PAGE_SIZE = 20
+    MAX_PAGES = 3
+
+    def create_schema(self):
+        conn = self._connection()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS poi (
+                id INTEGER PRIMARY KEY,
+                place_id TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL,
+                vicinity TEXT,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                rating REAL,
+                user_ratings_total INTEGER,
+                price_level INTEGER,
+                types TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS poi_type (
+                type TEXT NOT NULL,
+                poi_id INTEGER NOT NULL REFERENCES poi(id),
+                PRIMARY KEY (type, poi_id)
+            ) WITHOUT ROWID;
+            CREATE VIRTUAL TABLE IF NOT EXISTS poi_rtree USING rtree(
+                id, min_lat, max_lat, min_lng, max_lng
+            );
+        ''')
+        conn.commit()
+
+    def import_places(self, places):
+        """
+        Imports POIs, replacing any existing POI with the same place_id.
+
+        Parameters:
+        - places: Iterable of dicts with 'place_id', 'name', 'lat', 'lng',
+          'types' (list of Places types) and optional 'vicinity', 'rating',
+          'user_ratings_total' and 'price_level'.
+
+        Returns:
+        - Number of POIs imported.
+        """
+        conn = self._connection()
+        count = 0
+        with conn:
+            for place in places:
+                existing = conn.execute('SELECT id FROM poi WHERE place_id = ?', (place['place_id'],)).fetchone()
+                if existing:
+                    conn.execute('DELETE FROM poi_rtree WHERE id = ?', existing)
+                    conn.execute('DELETE FROM poi_type WHERE poi_id = ?', existing)
+                    conn.execute('DELETE FROM poi WHERE id = ?', existing)
+                cursor = conn.execute(
+                    'INSERT INTO poi (place_id, name, vicinity, lat, lng, rating, user_ratings_total, price_level, types) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (place['place_id'], place['name'], place.get('vicinity'), place['lat'], place['lng'],
+                     place.get('rating'), place.get('user_ratings_total'), place.get('price_level'),
+                     json.dumps(place['types']))
+                )
+                poi_id = cursor.lastrowid
+                conn.execute('INSERT INTO poi_rtree VALUES (?, ?, ?, ?, ?)',
+                             (poi_id, place['lat'], place['lat'], place['lng'], place['lng']))
+                conn.executemany('INSERT OR IGNORE INTO poi_type (type, poi_id) VALUES (?, ?)',
+                                 [(place_type, poi_id) for place_type in place['types']])
+                count += 1
+        return count
+
+    def import_file(self, path):
+        """
+        Imports POIs from a CSV or GeoJSON file.
+
+        CSV files need place_id, name, lat, lng and types columns, with types
+        separated by '|'. GeoJSON files must hold Point features whose
+        properties carry the same fields (types may be a list).
+
+        Returns:
+        - Number of POIs imported.
+        """
+        if path.lower().endswith(('.geojson', '.json')):
+            return self.import_places(self._read_geojson(path))
+        return self.import_places(self._read_csv(path))
+
+    @staticmethod
+    def _read_csv(path):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield {
+                    'place_id': row['place_id'],
+                    'name': row['name'],
+                    'vicinity': row.get('vicinity') or None,
+                    'lat': float(row['lat']),
+                    'lng': float(row['lng']),
+                    'rating': float(row['rating']) if row.get('rating') else None,
+                    'user_ratings_total': int(row['user_ratings_total']) if row.get('user_ratings_total') else None,
+                    'price_level': int(row['price_level']) if row.get('price_level') else None,
+                    'types': [t for t in row['types'].split('|') if t],
+                }
+
+    @staticmethod
+    def _read_geojson(path):
+        with open(path, encoding='utf-8') as f:
+            collection = json.load(f)
+        for feature in collection.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') != 'Point':
+                continue
+            lng, lat = geometry['coordinates'][:2]
+            props = feature.get('properties', {})
+            types = props.get('types', [])
+            if isinstance(types, str):
+                types = [t for t in types.split('|') if t]
+            yield {
+                'place_id': str(props.get('place_id') or feature.get('id')),
+                'name': props['name'],
+                'vicinity': props.get('vicinity'),
+                'lat': float(lat),
+                'lng': float(lng),
+                'rating': props.get('rating'),
+                'user_ratings_total': props.get('user_ratings_total'),
+                'price_level': props.get('price_level'),
+                'types': types,
+            }
+
+    def places_nearby(self, location, radius, type, page_token=None):
+        lat, lng = location
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius)
+        rows = self._connection().execute(
+            'SELECT p.place_id, p.name, p.vicinity, p.lat, p.lng, p.rating, p.user_ratings_total, p.price_level, p.types '
+            # CROSS JOIN pins the join order so the R*Tree probe runs first
+            'FROM poi_rtree r '
+            'CROSS JOIN poi_type t ON t.type = ? AND t.poi_id = r.id '
+            'CROSS JOIN poi p ON p.id = r.id '
+            'WHERE r.min_lat >= ? AND r.max_lat <= ? AND r.min_lng >= ? AND r.max_lng <= ?',
+            (type, min_lat, max_lat, min_lng, max_lng)
+        ).fetchall()
+
+        results = []
+        for place_id, name, vicinity, p_lat, p_lng, rating, ratings_total, price_level, types in rows:
+            distance = haversine(lat, lng, p_lat, p_lng)
+            if distance > radius:
+                continue
+            place = {
+                'place_id': place_id,
+                'name': name,
+                'vicinity': vicinity,
+                'geometry': {'location': {'lat': p_lat, 'lng': p_lng}},
+                'types': json.loads(types),
+                'rating': rating,
+                'user_ratings_total': ratings_total,
+            }
+            if price_level is not None:
+                place['price_level'] = price_level
+            results.append((distance, place))
+
+        # Closest first, paged like the Places API: 20 per page, at most 3 pages
+        results.sort(key=lambda item: item[0])
+        offset = int(page_token) if page_token else 0
+        page = [place for _, place in results[offset:offset + self.PAGE_SIZE]]
+        response = {'results': page, 'status': 'OK' if page else 'ZERO_RESULTS'}
+        next_offset = offset + self.PAGE_SIZE
+        if next_offset < min(len(results), self.PAGE_SIZE * self.MAX_PAGES):
+            response['next_page_token'] = str(next_offset)
+        return response
+
+    def place_details(self, place_id):
+        # The POI dataset carries no opening hours; details are whatever was imported
+        row = self._connection().execute(
+            'SELECT rating, user_ratings_total, price_level FROM poi WHERE place_id = ?', (place_id,)
+        ).fetchone()
+        if row is None:
+            return {'status': 'NOT_FOUND'}
+        rating, ratings_total, price_level = row
+        result = {'place_id': place_id, 'rating': rating, 'user_ratings_total': ratings_total}
+        if price_level is not None:
+            result['price_level'] = price_level
+        return {'result': result, 'status': 'OK'}
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_places_provider(name=None):
+    """
+    Returns the configured places provider, creating it on first use.
+
+    Parameters:
+    - name: 'google' or 'local'. Defaults to the PLACES_PROVIDER setting.
+
+    Note:
+    - The Google provider is wrapped in a GuardedPlacesProvider, which
+      falls back to PLACES_FALLBACK_PROVIDER when one is configured.
+
+    Raises:
+    - ValueError: The provider name is unknown.
+    """
+    name = name or app.config.get('PLACES_PROVIDER', 'google')
+    fallback_name = app.config.get('PLACES_FALLBACK_PROVIDER')
+    # Resolved before taking the lock, which is not reentrant
+    fallback = get_places_provider(fallback_name) if name == 'google' and fallback_name else None
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            if name == 'google':
+                from .places_guard import GuardedPlacesProvider
+                # Quota budgets and a circuit breaker protect the paid upstream
+                provider = GuardedPlacesProvider(
+                    GooglePlacesProvider(app.config['API_KEY'], timeout=app.config.get('PLACES_API_TIMEOUT')),
+                    per_minute=app.config.get('PLACES_RATE_PER_MINUTE', 600),
+                    per_day=app.config.get('PLACES_RATE_PER_DAY', 50000),
+                    failure_threshold=app.config.get('PLACES_CIRCUIT_FAILURES', 5),
+                    reset_timeout=app.config.get('PLACES_CIRCUIT_RESET', 30.0),
+                    fallback=fallback,
+                )
+            elif name == 'local':
+                provider = LocalPlacesProvider(app.config['LOCAL_POI_DATABASE'])
+            else:
+                raise ValueError(f"Unknown places provider: {name}")
+            _providers[name] = provider
+        return provider
@@ -3,95 +3,99 @@
 from app import db
 from flask import current_app as app
 from app.models import User, Ambiance, Cuisine, DietaryRestriction, BudgetPreference
+from sqlalchemy import literal, union_all
 from sqlalchemy.orm.exc import NoResultFound
-from collections import Counter
-from sqlalchemy.sql import func
+from werkzeug.exceptions import NotFound
+from .recommendation_controller import RecommendationController
+from .preference_vectors import PreferenceVectors, CATEGORY_KEYS
+from .group_snapshot import PREFERENCE_SOURCES
+from .preference_taxonomy import get_taxonomy
+from .suggestion_controller import SuggestionController
 
 class PreferencesController:
     
     @staticmethod
     def update_user_preferences(user_id, ambiance_ids, cuisine_ids, dietary_ids, budget_ids):
-        # Find the user
-        user = User.query.get(user_id)
-        
-        # Clear the current preferences
-        user.ambiances.clear()
-        user.cuisines.clear()
-        user.dietary_restrictions.clear()
-        user.budget_preferences.clear()  # Corrected from budgets to budget_preferences
-        
-        # Update preferences
-        if ambiance_ids:
-            user.ambiances = Ambiance.query.filter(Ambiance.id.in_(ambiance_ids)).all()
-        if cuisine_ids:
-            user.cuisines = Cuisine.query.filter(Cuisine.id.in_(cuisine_ids)).all()
-        if dietary_ids:
-            user.dietary_restrictions = DietaryRestriction.query.filter(DietaryRestriction.id.in_(dietary_ids)).all()
-        if budget_ids:
-            user.budget_preferences = BudgetPreference.query.filter(BudgetPreference.id.in_(budget_ids)).all()  # Corrected from budgets to budget_preferences
-        
-        # Commit the changes
-        db.session.commit()
-
-    @staticmethod
-    def aggregate_preferences(user_ids):
         """
-        Aggregate preferences for a list of users and find the most common ones.
+        Replaces a user's preferences, writing only the association rows that change.
 
-        :param user_ids: List of user IDs
-        :return: A dictionary with the most common preferences in each category
+        Submitted values are resolved against the in-memory preference
+        taxonomy. The current rows of all four association tables are read
+        in one UNION ALL query and diffed against them; each category then
+        gets at most one bulk DELETE and one bulk INSERT. The preference
+        tables are never queried, and a save that changes nothing writes
+        nothing.
+
+        :param user_id: The ID of the user
+        :param ambiance_ids, cuisine_ids, dietary_ids, budget_ids: Selected preferences, as IDs
+               or names; unknown values are ignored
+        :raises NotFound: The user does not exist
+        :return: A dict of category -> (added IDs, removed IDs), for categories that changed
         """
+        if db.session.query(User.id).filter_by(id=user_id).scalar() is None:
+            raise NotFound("User not found.")
+
+        taxonomy = get_taxonomy()
+        selected = (ambiance_ids, cuisine_ids, dietary_ids, budget_ids)
+        submitted = {
+            category: taxonomy.resolve(category, values)
+            for (category, _, _, _), values in zip(PREFERENCE_SOURCES, selected)
+        }
 
-        # Query for most common ambiance preferences
-        ambiance_counts = Counter(
-            name for name, in db.session.query(Ambiance.name)
-            .join(User.ambiances)
-            .filter(User.id.in_(user_ids))
-            .group_by(Ambiance.name)
-            .order_by(func.count(Ambiance.id).desc())
-            .all()
-        )
+        # The user's current association rows across every category, in one query
+        current = {category: set() for category in submitted}
+        selects = [
+            db.select(literal(category).label('category'), column.label('preference_id'))
+            .where(table.c.user_id == user_id)
+            for category, table, column, _ in PREFERENCE_SOURCES
+        ]
+        for category, preference_id in db.session.execute(union_all(*selects)):
+            current[category].add(preference_id)
 
-        # Query for most common cuisine preferences
-        cuisine_counts = Counter(
-            name for name, in db.session.query(Cuisine.name)
-            .join(User.cuisines)
-            .filter(User.id.in_(user_ids))
-            .group_by(Cuisine.name)
-            .order_by(func.count(Cuisine.id).desc())
-            .all()
-        )
+        changes = {}
+        for category, table, column, _ in PREFERENCE_SOURCES:
+            added = submitted[category] - current[category]
+            removed = current[category] - submitted[category]
+            if removed:
+                db.session.execute(table.delete().where(table.c.user_id == user_id, column.in_(removed)))
+            if added:
+                db.session.execute(table.insert(), [
+                    {'user_id': user_id, column.name: preference_id} for preference_id in sorted(added)
+                ])
+            if added or removed:
+                changes[category] = (sorted(added), sorted(removed))
 
-        # Query for most common dietary restrictions
-        dietary_counts = Counter(
-            name for name, in db.session.query(DietaryRestriction.name)
-            .join(User.dietary_restrictions)
-            .filter(User.id.in_(user_ids))
-            .group_by(DietaryRestriction.name)
-            .order_by(func.count(DietaryRestriction.id).desc())
-            .all()
-        )
+        if changes:
+            # Preference scores of the user's groups change with the user's preferences
+            RecommendationController.invalidate_user_groups(user_id)
+            # Keep the user's similarity signature in step, in the same transaction
+            SuggestionController.update_user(user_id)
+            db.session.commit()
+        return changes
 
-        # Query for most common budget preferences
-        budget_counts = Counter(
-            name for name, in db.session.query(BudgetPreference.name)
-            .join(User.budget_preferences)
-            .filter(User.id.in_(user_ids))
-            .group_by(BudgetPreference.name)
-            .order_by(func.count(BudgetPreference.id).desc())
-            .all()
-        )
+    @staticmethod
+    def aggregate_preferences(user_ids, top_k=3):
+        """
+        Aggregate preferences for a list of users and find the most common ones.
 
-        # Determine the most common preference in each category
-        common_ambiance = ambiance_counts.most_common(1)[0] if ambiance_counts else (None,)
-        common_cuisine = cuisine_counts.most_common(1)[0] if cuisine_counts else (None,)
-        common_dietary = dietary_counts.most_common(1)[0] if dietary_counts else (None,)
-        common_budget = budget_counts.most_common(1)[0] if budget_counts else (None,)
+        Preferences are loaded as per-user boolean vectors in one query (see
+        preference_vectors.PreferenceVectors) and counted in one pass over
+        each category, so the cost is a single round trip for any group size.
 
-        # Return the most common preferences
-        return {
-            'ambiance': common_ambiance[0],
-            'cuisine': common_cuisine[0],
-            'dietary': common_dietary[0],
-            'budget': common_budget[0]
-        }
+        :param user_ids: List of user IDs
+        :param top_k: Number of preferences listed per category in 'top'
+        :return: A dictionary with the most common preference in each category
+                 ('ambiance', 'cuisine', 'dietary', 'budget'; None when nobody
+                 has one), 'top' with up to top_k (name, member count) pairs
+                 per category, 'dietary_restrictions' with every restriction
+                 any member has, and 'members', the number of users counted
+        """
+        vectors = PreferenceVectors.load(user_ids)
+
+        top = {key: vectors.top(category, top_k) for category, key in CATEGORY_KEYS.items()}
+        consensus = {key: ranked[0][0] if ranked else None for key, ranked in top.items()}
+        consensus['top'] = top
+        # Every restriction has to be respected, not just the most common one
+        consensus['dietary_restrictions'] = vectors.union('dietary_restrictions')
+        consensus['members'] = len(vectors.user_ids)
+        return consensus
@@ -0,0 +1,193 @@
+import re
+
+from app.models import Ambiance, Cuisine, DietaryRestriction, BudgetPreference
+
+# Preference categories, matching the keys returned by get_group_member_preferences
+CATEGORY_MODELS = {
+    'ambiances': Ambiance,
+    'cuisines': Cuisine,
+    'dietary_restrictions': DietaryRestriction,
+    'budget_preferences': BudgetPreference,
+}
+
+# Legacy Places (places_nearby) types that satisfy each preference name (matched case-insensitively).
+# places_nearby has no cuisine or dietary types, those are matched on PREFERENCE_NAME_KEYWORDS instead.
+PREFERENCE_TYPE_MAPPING = {
+    'ambiances': {
+        'quiet': ['library', 'museum', 'art_gallery', 'park', 'book_store'],
+        'lively': ['bar', 'night_club', 'amusement_park', 'bowling_alley'],
+        'cozy': ['cafe', 'bakery', 'book_store'],
+        'vibrant': ['night_club', 'bar', 'amusement_park', 'shopping_mall'],
+        'relaxed': ['park', 'cafe', 'spa', 'campground'],
+    },
+}
+
+# Words in a place's name that satisfy each preference name
+PREFERENCE_NAME_KEYWORDS = {
+    'cuisines': {
+        'italian': ['italian', 'pizza', 'pizzeria', 'pasta', 'trattoria', 'osteria'],
+        'mexican': ['mexican', 'taco', 'taqueria', 'burrito', 'cantina'],
+        'asian': ['asian', 'chinese', 'japanese', 'thai', 'indian', 'korean', 'vietnamese', 'sushi',
+                  'ramen', 'noodle', 'wok', 'curry'],
+        'african': ['african', 'ethiopian', 'nigerian', 'ghanaian', 'jollof', 'suya', 'chop bar'],
+        'vegan': ['vegan', 'plant-based', 'plant based'],
+    },
+    'dietary_restrictions': {
+        'vegetarian': ['vegetarian', 'vegan', 'veggie', 'plant-based', 'plant based'],
+        'gluten-free': ['gluten-free', 'gluten free'],
+        'dairy-free': ['dairy-free', 'dairy free', 'vegan'],
+        'diary-free': ['dairy-free', 'dairy free', 'vegan'],
+    },
+}
+
+# Google price_level values that satisfy each budget preference
+BUDGET_PRICE_LEVELS = {
+    'budget-friendly': [0, 1],
+    'moderate': [2],
+    'high-end': [3, 4],
+}
+
+# Dietary answers that impose no restriction
+NO_RESTRICTION_NAMES = {'none'}
+
+# Dietary restrictions only apply to places that serve food
+FOOD_TYPES = {'restaurant', 'cafe', 'bar', 'bakery', 'meal_takeaway', 'meal_delivery', 'food'}
+
+# Relative weight of each soft preference category
+CATEGORY_WEIGHTS = {
+    'ambiances': 1.0,
+    'cuisines': 1.0,
+    'budget_preferences': 1.0,
+}
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+class PreferenceVocabulary:
+    """
+    Preference names compiled into bit positions.
+
+    Every name in the four preference tables gets its own bit. Each Places
+    type, price level and name keyword is pre-mapped to the mask of
+    preferences it satisfies, so encoding a place is a handful of dict
+    lookups, one regex scan of its name and ORs.
+    """
+
+    def __init__(self, names_by_category):
+        self.bits = {}  # (category, lowercased name) -> bit
+        self.category_masks = {category: 0 for category in CATEGORY_MODELS}
+        self.checkable_mask = 0  # Preferences that some type, price level or keyword can satisfy
+        self.type_masks = {}
+        self.price_masks = {}
+        self.keyword_masks = {}
+        self.food_types = frozenset(FOOD_TYPES)
+
+        position = 0
+        for category in CATEGORY_MODELS:
+            for name in names_by_category.get(category, []):
+                key = name.lower()
+                if (category, key) in self.bits:
+                    continue
+                if category == 'dietary_restrictions' and key in NO_RESTRICTION_NAMES:
+                    continue
+                bit = 1 << position
+                position += 1
+                self.bits[(category, key)] = bit
+                self.category_masks[category] |= bit
+
+                for place_type in PREFERENCE_TYPE_MAPPING.get(category, {}).get(key, []):
+                    self.type_masks[place_type] = self.type_masks.get(place_type, 0) | bit
+                    self.checkable_mask |= bit
+                for keyword in PREFERENCE_NAME_KEYWORDS.get(category, {}).get(key, []):
+                    self.keyword_masks[keyword] = self.keyword_masks.get(keyword, 0) | bit
+                    self.checkable_mask |= bit
+                if category == 'budget_preferences':
+                    for level in BUDGET_PRICE_LEVELS.get(key, []):
+                        self.price_masks[level] = self.price_masks.get(level, 0) | bit
+                        self.checkable_mask |= bit
+
+        # Longest keywords first so 'plant-based' wins over any shorter overlapping keyword
+        keywords = sorted(self.keyword_masks, key=len, reverse=True)
+        self.keyword_pattern = (
+            re.compile(r'\b(?:%s)' % '|'.join(re.escape(keyword) for keyword in keywords))
+            if keywords else None
+        )
+
+    def encode_names(self, category, names):
+        """Mask of the given preference names; unknown names are ignored."""
+        mask = 0
+        for name in names:
+            mask |= self.bits.get((category, name.lower()), 0)
+        return mask
+
+    def encode_place(self, place):
+        """Mask of every preference a place satisfies through its types, price level and name."""
+        mask = 0
+        for place_type in place.get('types', []):
+            mask |= self.type_masks.get(place_type, 0)
+        name = place.get('name')
+        if name and self.keyword_pattern is not None:
+            for keyword in self.keyword_pattern.findall(name.lower()):
+                mask |= self.keyword_masks[keyword]
+        price_level = place.get('price_level')
+        if price_level is not None:
+            mask |= self.price_masks.get(price_level, 0)
+        return mask
+
+    def serves_food(self, place):
+        return not self.food_types.isdisjoint(place.get('types', []))
+
+
+def score_places(places, preferences, vocabulary):
+    """
+    Scores places against a group's preferences.
+
+    Dietary restrictions are hard constraints: a food-serving place must
+    satisfy every restriction in the group that at least one food-serving
+    candidate is known to satisfy. A restriction no candidate's types or name
+    can show is not enforced, since dropping every food place for it would
+    only say the data is missing. Ambiance, cuisine and budget are soft: each
+    category contributes the fraction of the group's wanted preferences the
+    place satisfies, weighted by CATEGORY_WEIGHTS.
+
+    Parameters:
+    - places: List of Places API result dicts.
+    - preferences: Dict of preference name lists as returned by
+      GroupController.get_group_member_preferences.
+    - vocabulary: The PreferenceVocabulary to match with, usually
+      preference_taxonomy.get_taxonomy().vocabulary.
+
+    Returns:
+    - A new list of the places that pass the hard constraints, in their
+      original order, each with a 'preference_score' in [0, 1].
+    """
+    wanted = {
+        category: vocabulary.encode_names(category, preferences.get(category, []))
+        for category in CATEGORY_MODELS
+    }
+    required_dietary = wanted['dietary_restrictions'] & vocabulary.checkable_mask
+    soft = [
+        (wanted[category], _popcount(wanted[category]), weight)
+        for category, weight in CATEGORY_WEIGHTS.items()
+        if wanted[category]
+    ]
+    weight_sum = sum(weight for _, _, weight in soft)
+
+    encoded = [(place, vocabulary.encode_place(place), vocabulary.serves_food(place)) for place in places]
+    enforced = 0
+    if required_dietary:
+        for _, mask, serves_food in encoded:
+            if serves_food:
+                enforced |= mask & required_dietary
+
+    scored = []
+    for place, mask, serves_food in encoded:
+        if enforced and serves_food and mask & enforced != enforced:
+            continue
+        score = 0.0
+        for category_mask, category_size, weight in soft:
+            score += weight * _popcount(mask & category_mask) / category_size
+        scored.append(dict(place, preference_score=score / weight_sum if weight_sum else 0.0))
+    return scored
@@ -0,0 +1,184 @@
+import threading
+import time
+from functools import cached_property
+from types import MappingProxyType
+from flask import current_app as app
+from sqlalchemy import event, literal, union_all
+from sqlalchemy.orm import Session
+from app import db
+from app.models import CacheVersion
+from .preference_scoring import CATEGORY_MODELS, PreferenceVocabulary
+
+# cache_versions row bumped whenever a preference table changes
+TAXONOMY_VERSION = 'preference_taxonomy'
+
+
+class PreferenceTaxonomy:
+    """
+    Immutable snapshot of the four preference tables.
+
+    Holds, per category, the preference IDs in ID order, their names and
+    their bit positions (the index of the ID in that order), so
+    controllers resolve IDs and names without querying the tables. A
+    snapshot never changes; an edit to the tables produces a new one.
+    """
+
+    def __init__(self, version, rows_by_category):
+        """
+        Parameters:
+        - version: The cache_versions value the snapshot was loaded at.
+        - rows_by_category: Dict of category -> iterable of (id, name) rows.
+        """
+        self.version = version
+        self._ids = {}
+        self._names = {}
+        self._ids_by_name = {}
+        self._positions = {}
+        for category in CATEGORY_MODELS:
+            rows = sorted(rows_by_category.get(category, ()))
+            self._ids[category] = tuple(preference_id for preference_id, _ in rows)
+            self._names[category] = MappingProxyType(dict(rows))
+            self._ids_by_name[category] = MappingProxyType({name.lower(): preference_id for preference_id, name in rows})
+            self._positions[category] = MappingProxyType(
+                {preference_id: position for position, (preference_id, _) in enumerate(rows)}
+            )
+
+    @classmethod
+    def load(cls):
+        """Loads a snapshot with one UNION ALL query over the preference tables."""
+        # Read the version first; an edit racing the load then triggers another reload
+        version = read_version()
+        selects = [
+            db.select(literal(category).label('category'), model.id, model.name)
+            for category, model in CATEGORY_MODELS.items()
+        ]
+        rows_by_category = {}
+        for category, preference_id, name in db.session.execute(union_all(*selects)):
+            rows_by_category.setdefault(category, []).append((preference_id, name))
+        return cls(version, rows_by_category)
+
+    def ids(self, category):
+        """Every preference ID in a category, in ID order (bit position order)."""
+        return self._ids[category]
+
+    def name(self, category, preference_id):
+        """The name of a preference, or None when the ID is unknown."""
+        return self._names[category].get(preference_id)
+
+    def names(self, category, preference_ids=None):
+        """Names of the given preference IDs (all by default) in ID order; unknown IDs are skipped."""
+        names = self._names[category]
+        if preference_ids is None:
+            return [names[preference_id] for preference_id in self._ids[category]]
+        return [names[preference_id] for preference_id in sorted(set(preference_ids)) if preference_id in names]
+
+    def position(self, category, preference_id):
+        """Bit position of a preference within its category, or None when the ID is unknown."""
+        return self._positions[category].get(preference_id)
+
+    def resolve(self, category, values):
+        """
+        Resolves submitted preferences to IDs.
+
+        Parameters:
+        - values: Iterable of IDs (ints or digit strings) or names (case-insensitive).
+
+        Returns:
+        - A set of known preference IDs; unknown values are ignored.
+        """
+        names = self._names[category]
+        ids_by_name = self._ids_by_name[category]
+        resolved = set()
+        for value in values or ():
+            if isinstance(value, int) or (isinstance(value, str) and value.strip().isdigit()):
+                if int(value) in names:
+                    resolved.add(int(value))
+            elif isinstance(value, str) and value.strip().lower() in ids_by_name:
+                resolved.add(ids_by_name[value.strip().lower()])
+        return resolved
+
+    @cached_property
+    def vocabulary(self):
+        """The PreferenceVocabulary compiled from this snapshot's names."""
+        return PreferenceVocabulary({category: self.names(category) for category in CATEGORY_MODELS})
+
+
+def read_version(name=TAXONOMY_VERSION):
+    """The current version of a cache_versions row (the taxonomy by default); 0 before the first edit."""
+    version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_version(session=None, name=TAXONOMY_VERSION):
+    """
+    Marks the taxonomy (or another cache_versions row) as changed so every worker reloads it.
+
+    Note:
+    - Runs in the given session's transaction (db.session by default).
+      ORM edits to the preference tables call this automatically; call it
+      after editing them with bulk or raw SQL.
+    """
+    session = session or db.session
+    updated = session.execute(
+        db.update(CacheVersion).where(CacheVersion.name == name)
+        .values(version=CacheVersion.version + 1)
+    ).rowcount
+    if not updated:
+        session.execute(db.insert(CacheVersion).values(name=name, version=1))
+
+
+_taxonomy = None
+_checked_at = 0.0
+_taxonomy_lock = threading.Lock()
+
+def load_taxonomy():
+    """Loads and installs a fresh snapshot; create_app calls this once per worker."""
+    global _taxonomy, _checked_at
+    taxonomy = PreferenceTaxonomy.load()
+    with _taxonomy_lock:
+        _taxonomy, _checked_at = taxonomy, time.monotonic()
+    return taxonomy
+
+def get_taxonomy():
+    """
+    Returns the current taxonomy snapshot.
+
+    At most once every TAXONOMY_CHECK_INTERVAL seconds the stored version
+    is compared with the snapshot's (one primary key lookup) and the
+    snapshot is reloaded when another worker has changed the tables.
+    """
+    global _taxonomy, _checked_at
+    with _taxonomy_lock:
+        taxonomy = _taxonomy
+        due = time.monotonic() - _checked_at >= app.config.get('TAXONOMY_CHECK_INTERVAL', 5.0)
+        if taxonomy is not None and due:
+            _checked_at = time.monotonic()
+    if taxonomy is not None and (not due or read_version() == taxonomy.version):
+        return taxonomy
+    return load_taxonomy()
+
+def invalidate_taxonomy():
+    """Drops this worker's snapshot so the next get_taxonomy reloads it."""
+    global _taxonomy
+    with _taxonomy_lock:
+        _taxonomy = None
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_taxonomy_edit(session, flush_context):
+    models = tuple(CATEGORY_MODELS.values())
+    if any(isinstance(instance, models) for instance in (*session.new, *session.dirty, *session.deleted)):
+        bump_version(session)
+        session.info['taxonomy_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _reload_after_taxonomy_edit(session):
+    # This worker sees its own edit immediately; others on their next version check
+    if session.info.pop('taxonomy_changed', False):
+        invalidate_taxonomy()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_taxonomy_edit(session, previous_transaction):
+    session.info.pop('taxonomy_changed', None)
@@ -0,0 +1,109 @@
+from collections import namedtuple
+import numpy as np
+from sqlalchemy import literal, union_all
+from app import db
+from .group_snapshot import PREFERENCE_SOURCES
+from .preference_taxonomy import get_taxonomy
+
+# Keys aggregate_preferences has always returned, per preference category
+CATEGORY_KEYS = {
+    'ambiances': 'ambiance',
+    'cuisines': 'cuisine',
+    'dietary_restrictions': 'dietary',
+    'budget_preferences': 'budget',
+}
+
+
+class CategoryVectors(namedtuple('CategoryVectors', 'names matrix')):
+    """
+    One preference category for a set of users.
+
+    Fields:
+    - names: Tuple of the preference names held by any of the users, sorted.
+    - matrix: (users, names) boolean array; matrix[i, j] is True when user i holds names[j].
+    """
+
+
+class PreferenceVectors(namedtuple('PreferenceVectors', 'user_ids categories')):
+    """
+    Users' preferences as one boolean vector per user and category.
+
+    Fields:
+    - user_ids: Tuple of user IDs, aligned with the matrix rows.
+    - categories: Dict of category (see group_snapshot.PREFERENCE_SOURCES) -> CategoryVectors.
+    """
+
+    @classmethod
+    def load(cls, user_ids):
+        """
+        Loads the preference vectors of a set of users with a single UNION ALL query.
+
+        Parameters:
+        - user_ids: Iterable of user IDs; unknown IDs get empty vectors.
+        """
+        user_ids = tuple(sorted(set(user_ids)))
+        rows = []
+        if user_ids:
+            selects = [
+                db.select(literal(category).label('category'), table.c.user_id, column)
+                .where(table.c.user_id.in_(user_ids))
+                for category, table, column, _ in PREFERENCE_SOURCES
+            ]
+            # Names come from the in-memory taxonomy, so the preference tables are never joined
+            taxonomy = get_taxonomy()
+            for category, user_id, preference_id in db.session.execute(union_all(*selects)):
+                name = taxonomy.name(category, preference_id)
+                if name is not None:
+                    rows.append((category, user_id, name))
+        return cls.from_rows(user_ids, rows)
+
+    @classmethod
+    def from_rows(cls, user_ids, rows):
+        """
+        Builds vectors from (category, user_id, name) rows, such as GroupSnapshot.preference_rows.
+
+        Parameters:
+        - user_ids: Sorted tuple of user IDs to build rows for; rows of other users are ignored.
+        """
+        user_index = np.asarray(user_ids, dtype=np.int64)
+        by_category = {category: ([], []) for category, _, _, _ in PREFERENCE_SOURCES}
+        for category, user_id, name in rows:
+            users, names = by_category[category]
+            users.append(user_id)
+            names.append(name)
+
+        categories = {}
+        for category, (users, names) in by_category.items():
+            users = np.asarray(users, dtype=np.int64)
+            rows_at = np.searchsorted(user_index, users)
+            known = rows_at < len(user_index)
+            known[known] = user_index[rows_at[known]] == users[known]
+            vocabulary, columns = np.unique(np.asarray(names, dtype=object)[known], return_inverse=True)
+            matrix = np.zeros((len(user_index), len(vocabulary)), dtype=bool)
+            # Duplicate rows set the same cell, so every member counts once per preference
+            matrix[rows_at[known], columns] = True
+            categories[category] = CategoryVectors(tuple(vocabulary.tolist()), matrix)
+        return cls(tuple(user_ids), categories)
+
+    def counts(self, category):
+        """Number of users holding each preference in a category, as an array aligned with its names."""
+        return self.categories[category].matrix.sum(axis=0)
+
+    def top(self, category, k=None):
+        """
+        The most held preferences in a category.
+
+        Returns:
+        - A list of (name, count) tuples, most common first and ties by name;
+          preferences nobody holds are left out.
+        """
+        names = self.categories[category].names
+        counts = self.counts(category)
+        # names are sorted, so a stable sort on the negated counts breaks ties alphabetically
+        order = np.argsort(-counts, kind='stable')[:k]
+        return [(names[j], int(counts[j])) for j in order if counts[j]]
+
+    def union(self, category):
+        """Every preference in a category held by at least one user, sorted."""
+        names = self.categories[category].names
+        return [names[j] for j in np.flatnonzero(self.categories[category].matrix.any(axis=0))]
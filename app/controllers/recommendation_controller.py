@@ -0,0 +1,253 @@
+import json
+from datetime import datetime
+from flask import current_app as app
+from werkzeug.exceptions import NotFound
+from app import db
+from app.models import GroupRecommendation, GroupMember
+from . import places_controller, places_provider, meeting_point, place_ranking, preference_scoring, place_details, member_clustering, road_routing
+from .group_snapshot import GroupSnapshot
+from .preference_taxonomy import get_taxonomy
+from .storage import cache_write
+
+
+class RecommendationController:
+    """
+    Controller for per-group place recommendations.
+
+    Recommendations are materialized per (group, activity type) so repeat
+    visits to the places page are a single indexed lookup. Stored results
+    are invalidated when anything they were computed from changes: group
+    membership, a member's coordinates or a member's preferences.
+    """
+
+    @staticmethod
+    def get_group_recommendations(group_id, activity_type, objective=None, refresh=False, pages=1, event_at=None):
+        """
+        Returns ranked places for a group, from the materialized table when possible.
+
+        Parameters:
+        - group_id: The ID of the group.
+        - activity_type: Activity key from places_controller.activity_type_mapping.
+        - objective: Meeting point objective; defaults to MEETING_POINT_OBJECTIVE.
+          Only results for the default objective are materialized.
+        - refresh: Recompute, bypassing both the stored results and the Places cache.
+        - pages: Result pages to fetch per place type. Only the first page is materialized.
+        - event_at: Local datetime of the event; places known to be closed then are left out.
+
+        Returns:
+        - A dict with 'results' (up to 10 ranked places per page), 'partial',
+          'degraded' (stale or fallback places were used) and 'has_more',
+          which is True when another page could be loaded.
+
+        Raises:
+        - NotFound: The group does not exist or no member has a location.
+        """
+        default_objective = app.config.get('MEETING_POINT_OBJECTIVE', 'median')
+        objective = objective or default_objective
+        materialize = objective == default_objective and pages == 1
+
+        recommendations = None
+        if materialize and not refresh:
+            stored = GroupRecommendation.query.filter_by(group_id=group_id, activity_type=activity_type).first()
+            if stored is not None and not stored.is_expired(app.config.get('RECOMMENDATION_TTL', 86400)):
+                results = json.loads(stored.results)
+                # A full first page may have more behind it; fetching it is left to the next request
+                recommendations = {'results': results, 'partial': False, 'degraded': False, 'has_more': len(results) >= 10}
+
+        if recommendations is None:
+            recommendations = RecommendationController.compute_recommendations(
+                group_id, activity_type, objective, refresh, pages
+            )
+            # Partial results are missing place types and degraded ones may be days old or from the
+            # fallback index; keep both out of the table so the next visit retries the upstream
+            if materialize and not recommendations['partial'] and not recommendations['degraded']:
+                RecommendationController.store(group_id, activity_type, recommendations['results'])
+
+        # The enriched shortlist is stored independently of any event; opening hours are applied per request
+        open_places = place_details.filter_open_at(recommendations['results'], event_at)
+        recommendations['results'] = open_places[:10 * pages]
+        return recommendations
+
+    @staticmethod
+    def compute_recommendations(group_id, activity_type, objective, refresh=False, pages=1):
+        """
+        Computes ranked places for a group from scratch.
+
+        Returns:
+        - A dict with 'results' (the ranked shortlist, enriched with Place
+          details), 'partial', 'degraded' and 'has_more'.
+        """
+        # Load member coordinates and preferences for the whole group in two queries
+        snapshot = GroupSnapshot.load(group_id)
+        if not len(snapshot.coordinates):
+            raise NotFound("No member locations available for this group.")
+
+        provider = places_provider.get_places_provider()
+        stream = RecommendationController._start_search(
+            snapshot.coordinates, activity_type, objective, provider, refresh, pages
+        )
+        return RecommendationController._rank(
+            stream, snapshot.coordinates, snapshot.preference_names(), provider, pages
+        )
+
+    @staticmethod
+    def get_cluster_recommendations(group_id, activity_type, objective=None, refresh=False, event_at=None):
+        """
+        Splits a spread-out group into sub-meetups and recommends places for each.
+
+        Members are clustered so that nobody is further than
+        MEETUP_MAX_TRAVEL_DISTANCE from their cluster's center (with at most
+        MEETUP_MAX_CLUSTERS clusters); every cluster then gets its own
+        meeting point, places search and ranking. Results are not materialized.
+
+        Returns:
+        - A list of dicts, largest cluster first, with 'user_ids', 'center',
+          'max_distance', 'results' (up to 10 ranked places), 'partial' and 'degraded'.
+
+        Raises:
+        - NotFound: The group does not exist or no member has a location.
+        """
+        objective = objective or app.config.get('MEETING_POINT_OBJECTIVE', 'median')
+        snapshot = GroupSnapshot.load(group_id)
+        if not len(snapshot.coordinates):
+            raise NotFound("No member locations available for this group.")
+
+        clusters = member_clustering.cluster_members(
+            snapshot.coordinates,
+            app.config.get('MEETUP_MAX_TRAVEL_DISTANCE', 15000),
+            app.config.get('MEETUP_MAX_CLUSTERS', 8),
+        )
+
+        # Start every cluster's lookups before ranking any, so the searches overlap
+        provider = places_provider.get_places_provider()
+        searches = []
+        for cluster in clusters:
+            coordinates = snapshot.coordinates[cluster.indices]
+            user_ids = [snapshot.located_user_ids[index] for index in cluster.indices]
+            stream = RecommendationController._start_search(coordinates, activity_type, objective, provider, refresh)
+            searches.append((cluster, coordinates, user_ids, stream))
+
+        sub_meetups = []
+        for cluster, coordinates, user_ids, stream in searches:
+            ranked = RecommendationController._rank(
+                stream, coordinates, snapshot.preference_names(user_ids), provider
+            )
+            sub_meetups.append({
+                'user_ids': user_ids,
+                'center': cluster.center,
+                'max_distance': cluster.max_distance,
+                'results': place_details.filter_open_at(ranked['results'], event_at)[:10],
+                'partial': ranked['partial'],
+                'degraded': ranked['degraded'],
+            })
+        return sub_meetups
+
+    @staticmethod
+    def _start_search(coordinates, activity_type, objective, provider, refresh=False, pages=1):
+        """Finds the meeting point for members and starts streaming nearby places around it."""
+        central_location = meeting_point.find_meeting_point(coordinates, objective)
+
+        # Stream nearby places for the activity type; later pages are only fetched up to `pages`
+        stream = places_controller.stream_nearby_places(
+            central_location, places_controller.activity_type_mapping, activity_type,
+            provider, refresh=refresh, max_pages=pages
+        )
+        stream.prefetch()
+        return stream
+
+    @staticmethod
+    def _travel_costs(candidates, coordinates):
+        """
+        Ranking weights and, when a road graph is configured, member travel times to candidates.
+
+        Returns:
+        - A tuple (weights, travel_times); travel_times is None without a road graph.
+        """
+        weights = dict(app.config.get('PLACE_RANKING_WEIGHTS') or {})
+        graph = road_routing.get_road_graph()
+        if graph is None or not len(coordinates):
+            return weights, None
+
+        # Rank on worst-case or total travel time alone when configured, otherwise on the weighted mix
+        objective = app.config.get('ROAD_ROUTING_OBJECTIVE')
+        if objective == 'max':
+            weights['total_distance'] = 0.0
+        elif objective == 'total':
+            weights['max_distance'] = 0.0
+        travel_times = road_routing.member_travel_times(
+            graph, place_ranking.place_coordinates(candidates), coordinates,
+            app.config.get('ROAD_SNAP_DISTANCE', 1000)
+        )
+        return weights, travel_times
+
+    @staticmethod
+    def _rank(stream, coordinates, preferences, provider, pages=1):
+        """
+        Scores and ranks streamed places for members, then enriches the shortlist.
+
+        Returns:
+        - A dict with 'results' (the ranked shortlist, enriched with Place
+          details), 'partial', 'degraded' and 'has_more'.
+        """
+        nearby = list(stream)
+
+        # Score candidates against group preferences; dietary restrictions filter places out
+        candidates = preference_scoring.score_places(nearby, preferences, get_taxonomy().vocabulary)
+        if not candidates:
+            # Nothing satisfies every restriction, show the unfiltered places rather than none
+            candidates = nearby
+
+        # Rank every candidate by travel fairness and preference fit
+        weights, travel_times = RecommendationController._travel_costs(candidates, coordinates)
+        ranked = place_ranking.rank_places(candidates, coordinates, weights, travel_times)
+
+        # Fetch details for the shortlist only, with spares for places that turn out closed
+        shortlist = ranked[:10 * pages * app.config.get('PLACE_DETAILS_SHORTLIST', 2)]
+        enriched, details_partial = place_details.enrich_places(shortlist, provider)
+        return {
+            'results': enriched,
+            'partial': stream.partial or details_partial,
+            'degraded': stream.degraded,
+            'has_more': len(candidates) > 10 * pages or stream.has_more(),
+        }
+
+    @staticmethod
+    def store(group_id, activity_type, results):
+        """
+        Materializes results for a group and activity type, replacing any previous entry.
+
+        Note:
+        - Write failures are rolled back and otherwise ignored; the caller
+          already has the computed results.
+        """
+        with cache_write():
+            stored = GroupRecommendation.query.filter_by(group_id=group_id, activity_type=activity_type).first()
+            if stored is None:
+                stored = GroupRecommendation(group_id=group_id, activity_type=activity_type)
+                db.session.add(stored)
+            stored.results = json.dumps(results)
+            stored.created_at = datetime.utcnow()
+
+    @staticmethod
+    def invalidate_group(group_id):
+        """
+        Drops every stored recommendation for a group.
+
+        Note:
+        - The delete joins the caller's transaction; it is committed with
+          the change that caused it.
+        """
+        GroupRecommendation.query.filter_by(group_id=group_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def invalidate_user_groups(user_id):
+        """
+        Drops stored recommendations for every group the user belongs to.
+
+        Note:
+        - The delete joins the caller's transaction; it is committed with
+          the change that caused it.
+        """
+        group_ids = db.session.query(GroupMember.group_id).filter(GroupMember.user_id == user_id)
+        GroupRecommendation.query.filter(GroupRecommendation.group_id.in_(group_ids.scalar_subquery())) \
+            .delete(synchronize_session=False)
@@ -0,0 +1,345 @@
+import heapq
+import math
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+from flask import current_app as app
+from utils.geo import EARTH_RADIUS_M, haversine, haversine_matrix
+from .meeting_point import member_coordinates
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:  # SciPy is optional; the pure Python search below is used without it
+    csr_matrix = None
+    csgraph_dijkstra = None
+
+# Default speeds in km/h for OSM highway types that are routed over; ways of other types are ignored
+HIGHWAY_SPEEDS = {
+    'motorway': 100, 'motorway_link': 60,
+    'trunk': 80, 'trunk_link': 50,
+    'primary': 60, 'primary_link': 40,
+    'secondary': 50, 'secondary_link': 35,
+    'tertiary': 40, 'tertiary_link': 30,
+    'unclassified': 30, 'residential': 25, 'living_street': 10,
+    'service': 15, 'road': 30,
+}
+
+# Snapping index cells are keyed as lat_cell * SNAP_KEY_STRIDE + lng_cell, both offset to be positive
+SNAP_KEY_OFFSET = 1 << 20
+SNAP_KEY_STRIDE = 1 << 22
+
+# Speed in m/s for the stretch between a location and the road node it snaps to, and for locations off the graph
+ACCESS_SPEED = 1.4
+
+
+def _parse_maxspeed(value):
+    """Parses an OSM maxspeed tag ('50', '30 mph') into km/h, or None."""
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*(mph)?', value or '')
+    if not match:
+        return None
+    speed = float(match.group(1))
+    return speed * 1.609344 if match.group(2) else speed
+
+
+class RoadGraph:
+    """
+    Directed road network in compressed sparse row (CSR) form.
+
+    Edges leaving node i are indices[indptr[i]:indptr[i + 1]], with travel
+    times in seconds in the same slice of weights. Nodes are snapped to
+    through a precomputed grid index: node ids sorted by grid cell, so the
+    nodes of any cell are one binary search away.
+    """
+
+    def __init__(self, lat, lng, indptr, indices, weights, cell_size=0.005, snap_order=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.cell_size = cell_size
+        keys = self._cell_keys(self.lat, self.lng)
+        if snap_order is None:
+            snap_order = np.argsort(keys, kind='stable')
+        self.snap_order = np.asarray(snap_order, dtype=np.int32)
+        self.snap_keys = keys[self.snap_order]
+        self._adjacency = None
+
+    @property
+    def node_count(self):
+        return len(self.lat)
+
+    def _cell_keys(self, lat, lng):
+        lat_cell = np.floor(np.asarray(lat) / self.cell_size).astype(np.int64) + SNAP_KEY_OFFSET
+        lng_cell = np.floor(np.asarray(lng) / self.cell_size).astype(np.int64) + SNAP_KEY_OFFSET
+        return lat_cell * SNAP_KEY_STRIDE + lng_cell
+
+    @classmethod
+    def from_edges(cls, lat, lng, sources, targets, weights, cell_size=0.005):
+        """Builds a graph from parallel edge arrays, keeping the largest connected part of the network."""
+        lat, lng = np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+
+        # Union-find over the undirected edges; isolated fragments would only produce unreachable snaps
+        parent = list(range(len(lat)))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for source, target in zip(sources.tolist(), targets.tolist()):
+            root_s, root_t = find(source), find(target)
+            if root_s != root_t:
+                parent[root_s] = root_t
+        roots = np.array([find(node) for node in range(len(lat))], dtype=np.int64)
+        used = np.zeros(len(lat), dtype=bool)
+        used[sources] = True
+        used[targets] = True
+        largest = np.bincount(roots[used]).argmax() if used.any() else 0
+        keep = used & (roots == largest)
+
+        # Renumber the kept nodes densely and sort edges by source to form the CSR arrays
+        new_ids = np.full(len(lat), -1, dtype=np.int64)
+        new_ids[keep] = np.arange(keep.sum())
+        edge_keep = keep[sources] & keep[targets]
+        sources, targets, weights = new_ids[sources[edge_keep]], new_ids[targets[edge_keep]], weights[edge_keep]
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=int(keep.sum())), out=indptr[1:])
+        return cls(lat[keep], lng[keep], indptr, targets[order], weights[order], cell_size)
+
+    @classmethod
+    def from_osm(cls, path, cell_size=0.005):
+        """
+        Builds a graph from an OSM XML extract.
+
+        Ways tagged with a HIGHWAY_SPEEDS highway type become edges between
+        consecutive nodes, weighted by length over their maxspeed (or the
+        type's default speed). oneway tags are honoured.
+        """
+        node_coords = {}
+        ways = []
+        for _, element in ElementTree.iterparse(path, events=('end',)):
+            if element.tag == 'node':
+                node_coords[element.get('id')] = (float(element.get('lat')), float(element.get('lon')))
+            elif element.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                highway = tags.get('highway')
+                if highway in HIGHWAY_SPEEDS:
+                    speed = _parse_maxspeed(tags.get('maxspeed')) or HIGHWAY_SPEEDS[highway]
+                    refs = [nd.get('ref') for nd in element.iter('nd')]
+                    ways.append((refs, speed, tags.get('oneway')))
+                element.clear()
+            elif element.tag == 'relation':
+                element.clear()
+
+        node_ids = {}
+        lat, lng, sources, targets, weights = [], [], [], [], []
+
+        def node_index(ref):
+            index = node_ids.get(ref)
+            if index is None:
+                index = node_ids[ref] = len(lat)
+                lat.append(node_coords[ref][0])
+                lng.append(node_coords[ref][1])
+            return index
+
+        for refs, speed, oneway in ways:
+            refs = [ref for ref in refs if ref in node_coords]
+            if oneway == '-1':
+                refs.reverse()
+            for a, b in zip(refs, refs[1:]):
+                u, v = node_index(a), node_index(b)
+                seconds = haversine(lat[u], lng[u], lat[v], lng[v]) / (speed / 3.6)
+                sources.append(u)
+                targets.append(v)
+                weights.append(seconds)
+                if oneway not in ('yes', 'true', '1', '-1'):
+                    sources.append(v)
+                    targets.append(u)
+                    weights.append(seconds)
+        return cls.from_edges(lat, lng, sources, targets, weights, cell_size)
+
+    def save(self, path):
+        """Writes the graph to a compressed .npz file."""
+        np.savez_compressed(
+            path, lat=self.lat, lng=self.lng, indptr=self.indptr, indices=self.indices,
+            weights=self.weights, cell_size=np.array(self.cell_size), snap_order=self.snap_order
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['lat'], data['lng'], data['indptr'], data['indices'], data['weights'],
+                   float(data['cell_size']), data['snap_order'])
+
+    def snap(self, coords, max_distance=1000):
+        """
+        Finds the nearest road node to each location.
+
+        Parameters:
+        - coords: (N, 2) array of (lat, lng) degrees.
+        - max_distance: Locations farther than this (meters) from every node are not snapped.
+
+        Returns:
+        - A tuple (nodes, distances): node ids (-1 when not snapped) and distances in meters.
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        nodes = np.full(len(coords), -1, dtype=np.int64)
+        distances = np.full(len(coords), np.inf)
+        cell_m = math.radians(self.cell_size) * EARTH_RADIUS_M
+
+        for i, (lat, lng) in enumerate(coords):
+            lat_cell = math.floor(lat / self.cell_size) + SNAP_KEY_OFFSET
+            lng_cell = math.floor(lng / self.cell_size) + SNAP_KEY_OFFSET
+            # Longitude cells narrow towards the poles; search proportionally more of them
+            lng_ratio = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+            ring = 1
+            while True:
+                candidates = []
+                for lat_offset in range(-ring, ring + 1):
+                    row = (lat_cell + lat_offset) * SNAP_KEY_STRIDE
+                    start = np.searchsorted(self.snap_keys, row + lng_cell - ring * lng_ratio, 'left')
+                    stop = np.searchsorted(self.snap_keys, row + lng_cell + ring * lng_ratio, 'right')
+                    if stop > start:
+                        candidates.append(self.snap_order[start:stop])
+                searched = ring * cell_m >= max_distance
+                if candidates:
+                    candidates = np.concatenate(candidates)
+                    candidate_coords = np.column_stack((self.lat[candidates], self.lng[candidates]))
+                    candidate_distances = haversine_matrix(np.array([[lat, lng]]), candidate_coords)[0]
+                    best = int(np.argmin(candidate_distances))
+                    # Every node within ring cells has been seen, so a nearer best is final
+                    if candidate_distances[best] <= ring * cell_m or searched:
+                        if candidate_distances[best] <= max_distance:
+                            nodes[i] = candidates[best]
+                            distances[i] = candidate_distances[best]
+                        break
+                if searched:
+                    break
+                ring += 1
+        return nodes, distances
+
+    def _adjacency_lists(self):
+        # Per-node lists of (neighbour, seconds) are much faster than NumPy scalars inside the search loop
+        if self._adjacency is None:
+            indptr, indices, weights = self.indptr.tolist(), self.indices.tolist(), self.weights.tolist()
+            self._adjacency = [
+                list(zip(indices[indptr[node]:indptr[node + 1]], weights[indptr[node]:indptr[node + 1]]))
+                for node in range(self.node_count)
+            ]
+        return self._adjacency
+
+    def _search(self, source, targets):
+        """Dijkstra from one node, stopping once every target node is settled."""
+        adjacency = self._adjacency_lists()
+        best = [math.inf] * self.node_count
+        best[source] = 0.0
+        remaining = len(set(targets))
+        is_target = set(targets)
+        heap = [(0.0, source)]
+        while heap:
+            time, node = heapq.heappop(heap)
+            if time > best[node]:
+                continue
+            if node in is_target:
+                is_target.discard(node)
+                remaining -= 1
+                if not remaining:
+                    break
+            for neighbour, seconds in adjacency[node]:
+                candidate = time + seconds
+                if candidate < best[neighbour]:
+                    best[neighbour] = candidate
+                    heapq.heappush(heap, (candidate, neighbour))
+        return [best[target] for target in targets]
+
+    def travel_times(self, sources, targets):
+        """
+        Shortest travel times between road nodes.
+
+        Parameters:
+        - sources, targets: Sequences of node ids.
+
+        Returns:
+        - A (len(sources), len(targets)) array of seconds; unreachable pairs are inf.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        unique_sources, source_rows = np.unique(sources, return_inverse=True)
+
+        if csgraph_dijkstra is not None:
+            matrix = csr_matrix((self.weights, self.indices, self.indptr), shape=(self.node_count, self.node_count))
+            times = csgraph_dijkstra(matrix, directed=True, indices=unique_sources)[:, targets]
+        else:
+            unique_targets = np.unique(targets).tolist()
+            columns = np.searchsorted(unique_targets, targets)
+            times = np.array([
+                self._search(source, unique_targets) for source in unique_sources.tolist()
+            ], dtype=np.float64).reshape(len(unique_sources), -1)[:, columns]
+        return times[source_rows]
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_road_graph():
+    """
+    Returns the road graph from ROAD_GRAPH_FILE, loading it on first use.
+
+    Returns:
+    - The RoadGraph, or None when routing is not configured.
+    """
+    global _graph
+    path = app.config.get('ROAD_GRAPH_FILE')
+    if not path:
+        return None
+    with _graph_lock:
+        if _graph is None:
+            _graph = RoadGraph.load(path)
+        return _graph
+
+
+def member_travel_times(graph, place_coords, member_coords, max_snap_distance=1000):
+    """
+    Door-to-door travel times from every member to every place.
+
+    Members and places are snapped to the road graph; the stretch between
+    a location and its node, and any pair the graph cannot connect, are
+    costed at ACCESS_SPEED over the great-circle distance.
+
+    Parameters:
+    - place_coords: (M, 2) array of place (lat, lng); rows with NaN are left as NaN.
+    - member_coords: Member locations in any form accepted by member_coordinates.
+
+    Returns:
+    - An (M, N) array of seconds.
+    """
+    place_coords = np.asarray(place_coords, dtype=np.float64).reshape(-1, 2)
+    member_coords = member_coordinates(member_coords)
+    times = np.full((len(place_coords), len(member_coords)), np.nan)
+    located = ~np.isnan(place_coords).any(axis=1)
+    if not located.any() or not len(member_coords):
+        return times
+
+    fallback = haversine_matrix(place_coords[located], member_coords) / ACCESS_SPEED
+    place_nodes, place_access = graph.snap(place_coords[located], max_snap_distance)
+    member_nodes, member_access = graph.snap(member_coords, max_snap_distance)
+
+    routed = fallback.copy()
+    places_on_graph = place_nodes >= 0
+    members_on_graph = member_nodes >= 0
+    if places_on_graph.any() and members_on_graph.any():
+        # One search per member, from the member's node out to every place
+        road = graph.travel_times(member_nodes[members_on_graph], place_nodes[places_on_graph]).T
+        road = road + (place_access[places_on_graph] / ACCESS_SPEED)[:, None] \
+            + (member_access[members_on_graph] / ACCESS_SPEED)[None, :]
+        block = routed[np.ix_(places_on_graph, members_on_graph)]
+        routed[np.ix_(places_on_graph, members_on_graph)] = np.fmin(road, block)
+    times[located] = routed
+    return times
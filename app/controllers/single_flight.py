@@ -0,0 +1,68 @@
+import threading
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls onto a single future.
+
+    The first caller for a key submits the call to an executor; callers
+    arriving with the same key while it is still running get the same
+    future instead of issuing their own upstream request.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> [future, number of callers waiting on it]
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def submit(self, key, executor, fn, *args, **kwargs):
+        """
+        Returns a future for fn(*args, **kwargs), shared with any identical call in flight.
+
+        Parameters:
+        - key: Hashable key identifying identical calls.
+        - executor: Executor the call runs on when no identical call is in flight.
+        """
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None:
+                entry[1] += 1
+                self.coalesced += 1
+                return entry[0]
+            future = executor.submit(fn, *args, **kwargs)
+            self._inflight[key] = [future, 1]
+            self.executed += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is future:
+                del self._inflight[key]
+
+    def abandon(self, key, future):
+        """
+        Stops waiting on a shared future.
+
+        The call is only cancelled once every caller sharing it has given
+        up, so one request hitting its deadline never cancels another's.
+        """
+        with self._lock:
+            entry = self._inflight.get(key)
+            if entry is None or entry[0] is not future:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._inflight[key]
+        future.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._inflight),
+            }
@@ -0,0 +1,50 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+
+
+class SQLiteFileStore:
+    """
+    Base for datasets kept in their own SQLite file rather than the application database.
+
+    sqlite3 connections cannot be shared across threads, so one is opened
+    per thread on first use. Subclasses create their tables in
+    create_schema, which runs on construction.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.create_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def create_schema(self):
+        raise NotImplementedError
+
+
+@contextmanager
+def cache_write(commit=True):
+    """
+    Commits the writes made in the block, rolling back on database errors.
+
+    For cache writes whose caller already has the fresh data: a failed
+    write is discarded instead of failing the request. With commit=False
+    the writes are only flushed and join the caller's transaction, so
+    batch jobs can commit them together with their own changes.
+    """
+    try:
+        yield
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+    except SQLAlchemyError:
+        db.session.rollback()
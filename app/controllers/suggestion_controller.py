@@ -0,0 +1,344 @@
+from functools import lru_cache
+from itertools import chain
+import numpy as np
+from flask import current_app as app
+from sqlalchemy import and_, or_, literal, union_all
+from app import db
+from app.models import User, Group, GroupMember, UserSignature, UserSignatureBand
+from .group_snapshot import PREFERENCE_SOURCES
+
+# Largest prime below 2**32; every MinHash value fits a uint32
+HASH_PRIME = 4294967291
+# Fixed seed so signatures stay comparable across processes and restarts
+HASH_SEED = 20261018
+
+
+@lru_cache(maxsize=None)
+def _hash_parameters(num_perm, rows):
+    rng = np.random.default_rng(HASH_SEED)
+    a = rng.integers(1, HASH_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, HASH_PRIME, size=num_perm, dtype=np.uint64)
+    band_multipliers = rng.integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    return a, b, band_multipliers
+
+
+def preference_tokens(categories, preference_ids):
+    """Packs (category index, preference ID) pairs into one integer token per preference."""
+    return (np.asarray(categories, dtype=np.int64) << 32) | np.asarray(preference_ids, dtype=np.int64)
+
+
+def _fold_tokens(tokens):
+    """
+    Mixes 64-bit tokens down to 32 bits, so a * x + b cannot overflow uint64.
+
+    The splitmix64 finalizer is a bijection that spreads every input bit,
+    the category in the high word included, over the whole word; its high
+    half is kept. Truncating the raw token would drop the category and
+    make ambiance #1 and cuisine #1 the same token.
+    """
+    with np.errstate(over='ignore'):
+        z = tokens.astype(np.uint64)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z ^= z >> np.uint64(31)
+    return z >> np.uint64(32)
+
+
+def minhash_signatures(owners, tokens, num_perm):
+    """
+    MinHash signatures of many token sets at once.
+
+    Each of num_perm universal hash functions h(x) = (a * x + b) mod
+    HASH_PRIME is applied to every token, and each owner keeps the minimum
+    per function. The fraction of equal positions in two signatures
+    estimates the Jaccard similarity of the two sets.
+
+    Parameters:
+    - owners: Integer array naming the set each token belongs to.
+    - tokens: Integer array of tokens, aligned with owners.
+
+    Returns:
+    - A tuple (owner_ids, signatures): sorted distinct owners and an
+      (owners, num_perm) uint32 array.
+    """
+    owners = np.asarray(owners, dtype=np.int64)
+    order = np.argsort(owners, kind='stable')
+    owner_ids, starts = np.unique(owners[order], return_index=True)
+    x = _fold_tokens(np.asarray(tokens, dtype=np.int64)[order])
+    a, b, _ = _hash_parameters(num_perm, 1)
+    signatures = np.empty((len(owner_ids), num_perm), dtype=np.uint32)
+    for k in range(num_perm):
+        # One hash function at a time keeps memory at O(tokens)
+        hashed = (a[k] * x + b[k]) % np.uint64(HASH_PRIME)
+        signatures[:, k] = np.minimum.reduceat(hashed, starts) if len(x) else []
+    return owner_ids, signatures
+
+
+def band_buckets(signatures, bands, rows):
+    """
+    Locality-sensitive hash buckets of signatures.
+
+    The signature is cut into bands of `rows` values, each hashed to one
+    bucket. Two sets with Jaccard similarity s share at least one bucket
+    with probability 1 - (1 - s**rows)**bands.
+
+    Returns:
+    - An (N, bands) int64 array of bucket hashes.
+    """
+    signatures = np.atleast_2d(signatures)
+    _, _, multipliers = _hash_parameters(signatures.shape[1], rows)
+    banded = signatures[:, :bands * rows].astype(np.uint64).reshape(len(signatures), bands, rows)
+    # Wrapping multiply-add; keep 63 bits so buckets fit a signed BIGINT
+    buckets = (banded * multipliers).sum(axis=2) & np.uint64((1 << 63) - 1)
+    return buckets.astype(np.int64)
+
+
+class SuggestionController:
+    """
+    Suggests similar users and groups from members' preference sets.
+
+    Each user's ambiance, cuisine, dietary and budget preferences form one
+    set, summarized as a MinHash signature in user_signatures. Signatures
+    are split into LSH bands stored in user_signature_bands with a
+    (band, bucket) index, so similar users are found by a handful of index
+    probes instead of comparing against everyone. Signatures are updated
+    whenever a user's preferences change; `flask suggestions rebuild`
+    recomputes them all.
+    """
+
+    @staticmethod
+    def _shape():
+        bands = app.config.get('SUGGESTION_LSH_BANDS', 16)
+        rows = app.config.get('SUGGESTION_LSH_ROWS', 4)
+        return bands, rows
+
+    @staticmethod
+    def _token_rows(user_filter):
+        # Every preference of the selected users across the four categories in one UNION ALL
+        selects = [
+            db.select(literal(index).label('category'), table.c.user_id, column.label('preference_id'))
+            .where(user_filter(table.c.user_id))
+            for index, (_, table, column, _) in enumerate(PREFERENCE_SOURCES)
+        ]
+        rows = db.session.execute(union_all(*selects)).all()
+        # Flattening first avoids NumPy probing every Row for array interfaces
+        values = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows))
+        categories, owners, preference_ids = values.reshape(-1, 3).T
+        return owners, preference_tokens(categories, preference_ids)
+
+    @staticmethod
+    def _signatures(user_filter):
+        bands, rows = SuggestionController._shape()
+        owners, tokens = SuggestionController._token_rows(user_filter)
+        user_ids, signatures = minhash_signatures(owners, tokens, bands * rows)
+        return user_ids, signatures, band_buckets(signatures, bands, rows)
+
+    @staticmethod
+    def update_user(user_id):
+        """
+        Recomputes a user's signature and LSH buckets from their current preferences.
+
+        Note:
+        - Joins the caller's transaction. Like rebuild, it writes with Core
+          statements: the signature is updated in place (inserted when
+          missing) and the bands whose bucket changed are replaced with one
+          bulk DELETE and one executemany INSERT. Users without preferences
+          are dropped from the index.
+        """
+        signatures_table = UserSignature.__table__
+        bands_table = UserSignatureBand.__table__
+        user_ids, signatures, buckets = SuggestionController._signatures(lambda column: column == user_id)
+        stored = dict(db.session.execute(
+            db.select(bands_table.c.band, bands_table.c.bucket).where(bands_table.c.user_id == user_id)
+        ).all())
+
+        if not len(user_ids):
+            if stored:
+                db.session.execute(signatures_table.delete().where(signatures_table.c.user_id == user_id))
+                db.session.execute(bands_table.delete().where(bands_table.c.user_id == user_id))
+            return
+
+        signature = signatures[0].astype('<u4').tobytes()
+        updated = db.session.execute(
+            signatures_table.update().where(signatures_table.c.user_id == user_id).values(signature=signature)
+        ).rowcount
+        if not updated:
+            db.session.execute(signatures_table.insert().values(user_id=user_id, signature=signature))
+
+        wanted = dict(enumerate(buckets[0].tolist()))
+        # Bands beyond the configured count are left over from an older configuration
+        stale = [band for band, bucket in stored.items() if wanted.get(band) != bucket]
+        if stale:
+            db.session.execute(bands_table.delete().where(
+                bands_table.c.user_id == user_id, bands_table.c.band.in_(stale)
+            ))
+        added = [
+            {'user_id': user_id, 'band': band, 'bucket': bucket}
+            for band, bucket in wanted.items() if stored.get(band) != bucket
+        ]
+        if added:
+            db.session.execute(bands_table.insert(), added)
+
+    @staticmethod
+    def rebuild(batch_size=5000):
+        """
+        Recomputes every user's signature and buckets.
+
+        Needed once after the tables are created and after changing
+        SUGGESTION_LSH_BANDS or SUGGESTION_LSH_ROWS. Users are processed in
+        ID ranges, each written with bulk inserts and committed.
+
+        Returns:
+        - Number of users indexed.
+        """
+        db.session.execute(UserSignatureBand.__table__.delete())
+        db.session.execute(UserSignature.__table__.delete())
+        indexed = 0
+        last_id = 0
+        max_id = db.session.query(db.func.max(User.id)).scalar() or 0
+        while last_id < max_id:
+            low, high = last_id, last_id + batch_size
+            user_ids, signatures, buckets = SuggestionController._signatures(
+                lambda column: and_(column > low, column <= high)
+            )
+            if len(user_ids):
+                db.session.execute(UserSignature.__table__.insert(), [
+                    {'user_id': user_id, 'signature': signature.astype('<u4').tobytes()}
+                    for user_id, signature in zip(user_ids.tolist(), signatures)
+                ])
+                db.session.execute(UserSignatureBand.__table__.insert(), [
+                    {'user_id': user_id, 'band': band, 'bucket': bucket}
+                    for user_id, user_buckets in zip(user_ids.tolist(), buckets.tolist())
+                    for band, bucket in enumerate(user_buckets)
+                ])
+            db.session.commit()
+            indexed += len(user_ids)
+            last_id = high
+        db.session.commit()
+        return indexed
+
+    @staticmethod
+    def _candidates(user_id):
+        """
+        The user's signature and every other user sharing an LSH bucket with it.
+
+        Returns:
+        - A tuple (signature, candidate_ids, candidate_signatures), or None
+          when the user has no signature.
+        """
+        stored = db.session.get(UserSignature, user_id)
+        if stored is None:
+            return None
+        bands, rows = SuggestionController._shape()
+        signature = np.frombuffer(stored.signature, dtype='<u4')
+        buckets = band_buckets(signature, bands, rows)[0].tolist()
+
+        sharing = db.session.query(UserSignatureBand.user_id) \
+            .filter(or_(*[
+                and_(UserSignatureBand.band == band, UserSignatureBand.bucket == bucket)
+                for band, bucket in enumerate(buckets)
+            ])) \
+            .filter(UserSignatureBand.user_id != user_id) \
+            .distinct()
+        rows = db.session.query(UserSignature.user_id, UserSignature.signature) \
+            .filter(UserSignature.user_id.in_(sharing.scalar_subquery())) \
+            .all()
+        candidate_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        candidate_signatures = np.array(
+            [np.frombuffer(row[1], dtype='<u4') for row in rows], dtype=np.uint32
+        ).reshape(len(rows), len(signature))
+        return signature, candidate_ids, candidate_signatures
+
+    @staticmethod
+    def _exact_similarities(user_id, candidate_ids):
+        """Exact Jaccard similarity of the user's preference set with each candidate's."""
+        ids = set(candidate_ids) | {user_id}
+        owners, tokens = SuggestionController._token_rows(lambda column: column.in_(ids))
+        sets = {}
+        for owner, token in zip(owners.tolist(), tokens.tolist()):
+            sets.setdefault(owner, set()).add(token)
+        mine = sets.get(user_id, set())
+        return {
+            candidate: len(mine & sets.get(candidate, set())) / len(mine | sets.get(candidate, set()))
+            if mine or sets.get(candidate) else 0.0
+            for candidate in candidate_ids
+        }
+
+    @staticmethod
+    def similar_users(user_id, limit=10):
+        """
+        Finds the users whose preferences are most like a user's.
+
+        Candidates come from the LSH buckets and are ordered by their
+        estimated similarity; the best few are then re-scored exactly.
+
+        Parameters:
+        - user_id: The ID of the user.
+        - limit: Maximum number of users to return.
+
+        Returns:
+        - A list of (user, Jaccard similarity) tuples, most similar first.
+          Users with nothing in common with the user's likely matches are
+          not found; an empty list is returned for users without preferences.
+        """
+        found = SuggestionController._candidates(user_id)
+        if found is None or not len(found[1]):
+            return []
+        signature, candidate_ids, candidate_signatures = found
+
+        estimates = (candidate_signatures == signature).mean(axis=1)
+        # Over-fetch so estimation error does not push true matches out of the result
+        shortlist = candidate_ids[np.argsort(-estimates, kind='stable')[:limit * 3]].tolist()
+        similarities = SuggestionController._exact_similarities(user_id, shortlist)
+        ranked = sorted(shortlist, key=lambda candidate: (-similarities[candidate], candidate))[:limit]
+
+        users = {user.id: user for user in User.query.filter(User.id.in_(ranked))}
+        return [(users[candidate], similarities[candidate]) for candidate in ranked if candidate in users]
+
+    @staticmethod
+    def similar_groups(user_id, limit=10, neighbours=50):
+        """
+        Suggests groups whose members share a user's tastes.
+
+        Groups of the user's nearest neighbours (see similar_users) are
+        scored against the user by the estimated Jaccard similarity with
+        the union of their members' preferences, whose MinHash is the
+        element-wise minimum of the members' signatures.
+
+        Parameters:
+        - user_id: The ID of the user.
+        - limit: Maximum number of groups to return.
+        - neighbours: Similar users whose groups are considered.
+
+        Returns:
+        - A list of (group, estimated similarity) tuples, most similar first,
+          leaving out groups the user already belongs to.
+        """
+        found = SuggestionController._candidates(user_id)
+        if found is None or not len(found[1]):
+            return []
+        signature, candidate_ids, candidate_signatures = found
+        estimates = (candidate_signatures == signature).mean(axis=1)
+        nearest = candidate_ids[np.argsort(-estimates, kind='stable')[:neighbours]].tolist()
+
+        joined = db.session.query(GroupMember.group_id).filter(GroupMember.user_id == user_id)
+        group_ids = db.session.query(GroupMember.group_id) \
+            .filter(GroupMember.user_id.in_(nearest), GroupMember.group_id.notin_(joined.scalar_subquery())) \
+            .distinct()
+        rows = db.session.query(GroupMember.group_id, UserSignature.signature) \
+            .join(UserSignature, UserSignature.user_id == GroupMember.user_id) \
+            .filter(GroupMember.group_id.in_(group_ids.scalar_subquery())) \
+            .order_by(GroupMember.group_id) \
+            .all()
+        if not rows:
+            return []
+
+        owners = np.array([row[0] for row in rows], dtype=np.int64)
+        member_signatures = np.array([np.frombuffer(row[1], dtype='<u4') for row in rows], dtype=np.uint32)
+        ids, starts = np.unique(owners, return_index=True)
+        group_signatures = np.minimum.reduceat(member_signatures, starts, axis=0)
+        scores = (group_signatures == signature).mean(axis=1)
+        order = np.argsort(-scores, kind='stable')[:limit]
+
+        groups = {group.id: group for group in Group.query.filter(Group.id.in_(ids[order].tolist()))}
+        return [(groups[group_id], float(scores[i])) for i, group_id in zip(order.tolist(), ids[order].tolist())]
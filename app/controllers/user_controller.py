@@ -3,10 +3,13 @@ from flask import current_app as app
 import os
 from app.models import User, db
 from werkzeug.utils import secure_filename
-from utils.func import parse_lat_long
+from utils import geohash
 from werkzeug.security import generate_password_hash
 from flask import session
 from werkzeug.exceptions import BadRequest, NotFound
+from .recommendation_controller import RecommendationController
+from .group_aggregates import GroupAggregates
+from . import geocoding
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 class UserController:
@@ -28,24 +31,34 @@ class UserController:
         - user_id: The ID of the user to update.
         - email: New email address to update (optional).
         - phone: New phone number to update (optional).
-        - location_name: New location name to resolve and update (optional).
+        - address: New location, as "lat, long" or a street address to geocode (optional).
 
         Returns:
         - The updated user object.
 
         Raises:
         - NotFound: The user does not exist.
-        - BadRequest: The email or phone number provided is already in use.
+        - BadRequest: The email or phone number provided is already in use,
+          or the address could not be resolved.
 
         Note:
-        - The location_name, if provided, is resolved to latitude and longitude 
-          using an external service and the coordinates are stored.
+        - The address, if provided, is resolved to latitude and longitude
+          through the configured geocoder and its cache, and the coordinates
+          are stored.
         - The method commits the changes to the database.
         """
         user = User.query.get(user_id)
         if user is None:
             raise NotFound("User not found.")
 
+        # Resolved before any other change; the geocode cache commits its own writes
+        location = None
+        if address:
+            try:
+                location = geocoding.resolve_location(address)
+            except ValueError as e:
+                raise BadRequest(str(e))
+
         if email:
             if User.query.filter_by(email=email).first():
                 raise BadRequest("Email already in use.")
@@ -56,10 +69,9 @@ class UserController:
                 raise BadRequest("Phone number already in use.")
             user.phone_number =phone_number
 
-        if address:
-            latitude, longitude = parse_lat_long(address)
-            user.latitude = latitude
-            user.longitude = longitude
+        if location:
+            user.address = address.strip()
+            UserController.set_location(user, *location)
         
         if profile_picture and UserController.allowed_file(profile_picture.filename):
             filename = secure_filename(profile_picture.filename)
@@ -75,6 +87,66 @@ class UserController:
         db.session.commit()
         return user
 
+    @staticmethod
+    def set_location(user, latitude, longitude):
+        """
+        Moves a user to new coordinates, keeping everything derived from them in step.
+
+        Note:
+        - Updates the geohash, the aggregates of the user's groups and
+          invalidates their recommendations; the caller commits.
+        """
+        old_location = (user.latitude, user.longitude)
+        user.latitude = latitude
+        user.longitude = longitude
+        user.geohash = geohash.encode(latitude, longitude, app.config.get('GEOHASH_PRECISION', 9))
+        if (latitude, longitude) != old_location:
+            # Meeting points of the user's groups move with the user
+            GroupAggregates.move_member(user.id, old_location, (latitude, longitude))
+            RecommendationController.invalidate_user_groups(user.id)
+
+    @staticmethod
+    def geocode_missing_locations(batch_size=200, max_workers=None, per_second=None):
+        """
+        Geocodes the stored address of every user without coordinates.
+
+        Users are processed in batches by ID; each batch's distinct
+        addresses are geocoded together through geocoding.geocode_many,
+        and the new cache entries are committed with the batch's users.
+
+        Parameters:
+        - batch_size: Users loaded and committed per batch.
+        - max_workers, per_second: Lookup concurrency and rate, see geocode_many.
+
+        Returns:
+        - A dict with 'checked', 'located', 'not_found' and 'failed' user counts.
+        """
+        report = {'checked': 0, 'located': 0, 'not_found': 0, 'failed': 0}
+        last_id = 0
+        while True:
+            users = User.query.filter(
+                User.id > last_id, User.address.isnot(None), User.address != '',
+                db.or_(User.latitude.is_(None), User.longitude.is_(None))
+            ).order_by(User.id).limit(batch_size).all()
+            if not users:
+                break
+            last_id = users[-1].id
+            locations, failed = geocoding.geocode_many(
+                [user.address for user in users], max_workers=max_workers, per_second=per_second, commit=False
+            )
+            for user in users:
+                report['checked'] += 1
+                address = geocoding.normalize_address(user.address)
+                if address in failed:
+                    report['failed'] += 1
+                elif locations.get(address) is None:
+                    report['not_found'] += 1
+                else:
+                    UserController.set_location(user, *locations[address])
+                    report['located'] += 1
+            db.session.commit()
+        return report
+
     @staticmethod
     def create_user(username, password):
         """
@@ -176,6 +248,9 @@ class UserController:
         if user is None:
             raise NotFound("User not found.")
 
+        # Memberships go with the user; take the user's location out of those groups first
+        GroupAggregates.remove_user(user.id, user.latitude, user.longitude)
+        RecommendationController.invalidate_user_groups(user.id)
         db.session.delete(user)
         db.session.commit()
 
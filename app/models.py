@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import UniqueConstraint, Table, Column, Integer, String, DateTime, Float, Text, ForeignKey
+from sqlalchemy import UniqueConstraint, Index, Table, Column, Integer, BigInteger, String, DateTime, Float, Text, LargeBinary, ForeignKey
 from sqlalchemy.orm import relationship
 from flask_sqlalchemy import SQLAlchemy
 import uuid
@@ -9,22 +9,22 @@ from .import db
 
 # Association tables for many-to-many relationships
 user_ambiance = Table('user_ambiance', db.Model.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), index=True),
     Column('ambiance_id', Integer, ForeignKey('ambiances.id'))
 )
 
 user_cuisine = Table('user_cuisine', db.Model.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), index=True),
     Column('cuisine_id', Integer, ForeignKey('cuisines.id'))
 )
 
 user_dietary = Table('user_dietary', db.Model.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), index=True),
     Column('dietary_id', Integer, ForeignKey('dietary_restrictions.id'))
 )
 
 user_budget = Table('user_budget', db.Model.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), index=True),
     Column('budget_id', Integer, ForeignKey('budget_preferences.id'))
 )
 
@@ -39,12 +39,15 @@ class User(db.Model):
     address = Column(String(255), nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True, index=True)  # Kept in sync with latitude/longitude for nearby queries
     profile_picture = db.Column(db.String(255), nullable=True)
     group_memberships = relationship('GroupMember', back_populates='user', cascade="all, delete-orphan")
     ambiances = relationship('Ambiance', secondary=user_ambiance, back_populates='users')
     cuisines = relationship('Cuisine', secondary=user_cuisine, back_populates='users')
     dietary_restrictions = relationship('DietaryRestriction', secondary=user_dietary, back_populates='users')
     budget_preferences = relationship('BudgetPreference', secondary=user_budget, back_populates='users')
+    preference_signature = relationship('UserSignature', uselist=False, cascade="all, delete-orphan")
+    preference_signature_bands = relationship('UserSignatureBand', cascade="all, delete-orphan")
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -81,8 +84,19 @@ class Group(db.Model):
     image_path = Column(String(256), nullable=True)  # Path to the image file
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, onupdate=datetime.utcnow)
+    # Running aggregates over members with coordinates, maintained by GroupAggregates
+    located_count = Column(Integer, nullable=False, default=0, server_default='0')
+    sum_x = Column(Float, nullable=False, default=0.0, server_default='0')  # Sums of member unit vectors
+    sum_y = Column(Float, nullable=False, default=0.0, server_default='0')
+    sum_z = Column(Float, nullable=False, default=0.0, server_default='0')
+    min_lat = Column(Float, nullable=True)  # Bounding box of member coordinates
+    max_lat = Column(Float, nullable=True)
+    min_lng = Column(Float, nullable=True)
+    max_lng = Column(Float, nullable=True)
+    centroid_geohash = Column(String(12), nullable=True, index=True)  # Geohash of the centroid, for nearby searches
     members = relationship('GroupMember', back_populates='group', cascade="all, delete-orphan")
     invite_tokens = relationship('InviteToken', back_populates='group', cascade="all, delete-orphan")
+    recommendations = relationship('GroupRecommendation', back_populates='group', cascade="all, delete-orphan")
 
     def __repr__(self):
         return f'<Group {self.id} {self.name}>'
@@ -94,7 +108,7 @@ class InviteToken(db.Model):
     token = Column(String(256), nullable=False, unique=True)
     group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
     group = relationship('Group', back_populates='invite_tokens')
 
     def __init__(self, group_id, expires_in=48):
@@ -109,6 +123,16 @@ class InviteToken(db.Model):
         return f'<InviteToken {self.token} for Group {self.group_id}>'
 
 
+class RevokedInvite(db.Model):
+    __tablename__ = 'revoked_invites'
+    nonce = Column(String(16), primary_key=True)  # Hex nonce of a revoked signed invite token
+    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # The token's own expiry; the row is useless after it
+
+    def __repr__(self):
+        return f'<RevokedInvite {self.nonce} for Group {self.group_id}>'
+
+
 # Ambiance model
 class Ambiance(db.Model):
     __tablename__ = 'ambiances'
@@ -161,4 +185,103 @@ class Event(db.Model):
     group = db.relationship('Group', backref=db.backref('events', lazy='dynamic'))  # Back-reference to allow group.events access
 
     def __repr__(self):
-        return f'<Event {self.id} {self.activity_type}>'
\ No newline at end of file
+        return f'<Event {self.id} {self.activity_type}>'
+
+class PlaceCacheEntry(db.Model):
+    __tablename__ = 'place_cache'
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(128), nullable=False, unique=True)  # "<lat cell>:<lng cell>:<radius>:<type>"
+    place_type = Column(String(64), nullable=False)
+    results = Column(Text, nullable=False)  # JSON encoded list of Places API results
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def is_expired(self, ttl):
+        return datetime.utcnow() - self.created_at > timedelta(seconds=ttl)
+
+    def __repr__(self):
+        return f'<PlaceCacheEntry {self.cache_key}>'
+
+
+class PlaceDetailsEntry(db.Model):
+    __tablename__ = 'place_details'
+    id = Column(Integer, primary_key=True)
+    place_id = Column(String(255), nullable=False, unique=True)
+    details = Column(Text, nullable=False)  # JSON encoded Place details result
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def is_expired(self, ttl):
+        return datetime.utcnow() - self.created_at > timedelta(seconds=ttl)
+
+    def __repr__(self):
+        return f'<PlaceDetailsEntry {self.place_id}>'
+
+
+class GeocodeEntry(db.Model):
+    __tablename__ = 'geocode_cache'
+    id = Column(Integer, primary_key=True)
+    address = Column(String(255), nullable=False, unique=True)  # Normalized with geocoding.normalize_address
+    latitude = Column(Float, nullable=True)  # Both None when the address could not be found
+    longitude = Column(Float, nullable=True)
+    provider = Column(String(20), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def found(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def is_expired(self, ttl):
+        return datetime.utcnow() - self.created_at > timedelta(seconds=ttl)
+
+    def __repr__(self):
+        return f'<GeocodeEntry {self.address}>'
+
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+    name = Column(String(64), primary_key=True)  # e.g. 'preference_taxonomy'
+    version = Column(Integer, nullable=False, default=0)  # Bumped whenever the cached data changes
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name} {self.version}>'
+
+
+class UserSignature(db.Model):
+    __tablename__ = 'user_signatures'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)  # MinHash of the user's preference set, little-endian uint32s
+
+    def __repr__(self):
+        return f'<UserSignature {self.user_id}>'
+
+
+class UserSignatureBand(db.Model):
+    __tablename__ = 'user_signature_bands'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)  # Hash of the signature rows in this band
+
+    # Users sharing a (band, bucket) are candidate similar users
+    __table_args__ = (Index('ix_user_signature_bands_band_bucket', 'band', 'bucket'),)
+
+    def __repr__(self):
+        return f'<UserSignatureBand {self.user_id} {self.band}:{self.bucket}>'
+
+
+class GroupRecommendation(db.Model):
+    __tablename__ = 'group_recommendations'
+    id = Column(Integer, primary_key=True)
+    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
+    activity_type = Column(String(128), nullable=False)
+    results = Column(Text, nullable=False)  # JSON encoded list of ranked places
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    group = relationship('Group', back_populates='recommendations')
+
+    __table_args__ = (UniqueConstraint('group_id', 'activity_type', name='_group_activity_uc'),)
+
+    def is_expired(self, ttl):
+        return datetime.utcnow() - self.created_at > timedelta(seconds=ttl)
+
+    def __repr__(self):
+        return f'<GroupRecommendation {self.activity_type} for Group {self.group_id}>'
@@ -1,12 +1,22 @@
+from datetime import datetime
+from functools import wraps
 from flask import render_template, request, redirect, url_for, flash, session
-from .controllers import user_controller,preference_controller,group_controller, invitetoken_controller, event_controller, places_controller
-from werkzeug.exceptions import BadRequest, NotFound
-from flask import Blueprint, jsonify
+from .controllers import user_controller,preference_controller,group_controller, invitetoken_controller, event_controller, places_controller, places_cache, places_provider, meeting_point, recommendation_controller, place_photos, nearby_controller, suggestion_controller
+from werkzeug.exceptions import BadRequest, NotFound, TooManyRequests, Unauthorized
+from flask import Blueprint, jsonify, send_file
 from config import Config
-import googlemaps
 from flask import current_app as app
 app= Blueprint('main', __name__)
-gmaps = googlemaps.Client(key=Config.API_KEY)
+
+
+def login_required(view):
+    # JSON endpoints answer 401 instead of redirecting to the login page
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not session.get('user_id'):
+            raise Unauthorized("Log in first.")
+        return view(*args, **kwargs)
+    return wrapped
 
 '''
 ================================================
@@ -174,6 +184,20 @@ def group_profile(group_id):
         flash('Group not found.', 'error')
         return redirect(url_for('main.create_group', group_id=group_id))
 
+'''
+================================================
+Route to Leave a Group
+================================================
+'''
+@app.route('/<group_id>/leave', methods=['POST'])
+def leave_group(group_id):
+    try:
+        group_controller.GroupController.leave_group(group_id, session.get('user_id'))
+        flash('You have left the group.', 'success')
+    except NotFound as e:
+        flash(str(e.description), 'error')
+    return redirect(url_for('main.create_group'))
+
 
 '''
 ================================================
@@ -191,7 +215,7 @@ def meetup(group_id):
 
         try:
             # Create Activity
-            event_controller.EventController.create_event(
+            event = event_controller.EventController.create_event(
                 activity_type,  group_id,duration,date,time
             )
 
@@ -203,7 +227,7 @@ def meetup(group_id):
             }
             
             # Redirect to the places page
-            return redirect(url_for('main.places', group_id=group_id, activity_details=activity_details))
+            return redirect(url_for('main.places', group_id=group_id, event_id=event.id, activity_details=activity_details))
         
         except NotFound as e:
             flash('Group not found.', 'error')
@@ -225,40 +249,183 @@ def places(group_id):
             each member's preferences and generate a list 
             of places
         '''
-        # Get group member locations
-        grp_member_locations = group_controller.GroupController.get_group_member_locations(
-            group_id
-            )
-        # Get group preferences
-        grp_preferences = group_controller.GroupController.get_group_member_preferences(
-            group_id
-        )
-        
-        # If there's only one member, use their location as the central point
-        if len(grp_member_locations) == 1:
-            central_location = grp_member_locations[0]
-        else:
-            # Calculate centroid for multiple members
-            avg_lat = sum(location[0] for location in grp_member_locations) / len(grp_member_locations)
-            avg_lng = sum(location[1] for location in grp_member_locations) / len(grp_member_locations)
-            central_location = (avg_lat, avg_lng)
-        
         # Retrieve activity type from query parameters or default to 'social'
         activity_type = request.args.get('at', 'social')
-        
-        
-        # Get nearby places based on the activity type
-        nearby_places = places_controller.get_nearby_places(central_location, places_controller.activity_type_mapping, activity_type, gmaps)
-        
-        #TODO: Future implementation
-        # Filter nearby places based on group preferences
-        # filtered_places = places_controller.filter_places(nearby_places, grp_preferences)
+
+        # ?objective= can pick centroid, median or minimax for the meeting point
+        objective = request.args.get('objective', Config.MEETING_POINT_OBJECTIVE)
+        if objective not in meeting_point.OBJECTIVES:
+            objective = Config.MEETING_POINT_OBJECTIVE
+
+        # Bypass stored and cached results when a refresh is requested
+        refresh = request.args.get('refresh') == '1'
+
+        # ?pages= loads further result pages, 10 more places each
+        pages = min(max(request.args.get('pages', 1, type=int), 1), Config.PLACES_MAX_PAGES)
+
+        # Leave out places that are closed when the group's event starts
+        event_id = request.args.get('event_id', type=int)
+        event_at = None
+        if event_id is not None:
+            try:
+                event = event_controller.EventController.get_event(event_id)
+                if str(event.group_id) == str(group_id):
+                    event_at = datetime.combine(event.date, event.time)
+            except NotFound:
+                pass
 
         activity_details = request.args.get('activity_details')
+
+        # ?split=1 splits a spread-out group into sub-meetups, each with its own places
+        if request.args.get('split') == '1':
+            sub_meetups = recommendation_controller.RecommendationController.get_cluster_recommendations(
+                group_id, activity_type, objective=objective, refresh=refresh, event_at=event_at
+            )
+            return render_template('places.html', sub_meetups=sub_meetups, places=[],
+                                   partial=any(sub_meetup['partial'] for sub_meetup in sub_meetups),
+                                   degraded=any(sub_meetup['degraded'] for sub_meetup in sub_meetups),
+                                   activity_details=activity_details, group_id=group_id)
+
+        # Ranked places, served from the materialized recommendations when nothing changed
+        nearby = recommendation_controller.RecommendationController.get_group_recommendations(
+            group_id, activity_type, objective=objective, refresh=refresh, pages=pages, event_at=event_at
+        )
+        nearby_places = nearby['results']
+
+        more_url = None
+        if nearby['has_more'] and pages < Config.PLACES_MAX_PAGES:
+            more_url = url_for('main.places', group_id=group_id, at=activity_type, objective=objective,
+                               pages=pages + 1, event_id=event_id, activity_details=activity_details)
         # Render the places in the template
-        return render_template('places.html', places=nearby_places, api_key=Config.API_KEY, activity_details=activity_details, group_id=group_id)
+        return render_template('places.html', places=nearby_places, partial=nearby['partial'], degraded=nearby['degraded'], more_url=more_url, activity_details=activity_details, group_id=group_id)
+
+
+
+'''
+================================================
+Places Cache Statistics
+================================================
+'''
+@app.route('/places-cache/stats')
+@login_required
+def places_cache_stats():
+    return jsonify(places_cache.PlacesCache.stats())
 
+'''
+================================================
+Places Provider Statistics
+================================================
+'''
+@app.route('/places-provider/stats')
+@login_required
+def places_provider_stats():
+    provider = places_provider.get_places_provider()
+    stats = provider.stats() if hasattr(provider, 'stats') else {}
+    return jsonify({
+        'provider': provider.name,
+        'stats': stats,
+        'single_flight': places_controller.lookup_flights.stats()
+    })
 
+'''
+================================================
+Nearby Users and Groups
+================================================
+'''
+def _nearby_search_args():
+    # Searches are always around the logged-in user's own stored location, so nobody can
+    # probe from arbitrary points and triangulate where another user lives
+    user_id = session.get('user_id')
+    user = user_controller.UserController.get_user_by_id(user_id)
+    if user is None or user.latitude is None or user.longitude is None:
+        raise BadRequest("Set your location on your profile first.")
+    radius = min(request.args.get('radius', 5000, type=float), Config.NEARBY_MAX_RADIUS)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), Config.NEARBY_MAX_RESULTS)
+    return user.latitude, user.longitude, radius, limit, user_id
+
+@app.route('/nearby/users')
+@login_required
+def nearby_users():
+    lat, lng, radius, limit, user_id = _nearby_search_args()
+    users = nearby_controller.NearbyController.get_users_near(
+        lat, lng, radius, exclude_user_id=user_id, limit=limit
+    )
+    # Coarse distances, ordered by bucket then name, do not reveal exact positions
+    users = sorted(((user, nearby_controller.distance_bucket(distance)) for user, distance in users),
+                   key=lambda item: (item[1][0], item[0].username))
+    return jsonify([
+        {'id': user.id, 'username': user.username, 'distance': label}
+        for user, (_, label) in users
+    ])
+
+@app.route('/nearby/groups')
+@login_required
+def nearby_groups():
+    lat, lng, radius, limit, _ = _nearby_search_args()
+    groups = nearby_controller.NearbyController.get_groups_near(lat, lng, radius, limit=limit)
+    return jsonify([
+        {'id': group.id, 'name': group.name, 'members': group.located_count,
+         'distance': nearby_controller.distance_bucket(distance)[1]}
+        for group, distance in groups
+    ])
+
+'''
+================================================
+Similar Users and Groups
+================================================
+'''
+@app.route('/suggestions/users')
+@login_required
+def suggested_users():
+    users = suggestion_controller.SuggestionController.similar_users(
+        session['user_id'], limit=min(request.args.get('limit', 10, type=int), 50)
+    )
+    return jsonify([
+        {'id': user.id, 'username': user.username, 'similarity': round(similarity, 3)}
+        for user, similarity in users
+    ])
+
+@app.route('/suggestions/groups')
+@login_required
+def suggested_groups():
+    groups = suggestion_controller.SuggestionController.similar_groups(
+        session['user_id'], limit=min(request.args.get('limit', 10, type=int), 50)
+    )
+    return jsonify([
+        {'id': group.id, 'name': group.name, 'similarity': round(similarity, 3)}
+        for group, similarity in groups
+    ])
+
+'''
+================================================
+Place Photo Proxy
+================================================
+'''
+@app.route('/place-photo/<photo_reference>')
+def place_photo(photo_reference):
+    # Photos are fetched once per width bucket and served from disk, keeping the API key out of pages.
+    # Anyone may view stored photos, but only logged-in users may trigger downloads, and only so many
+    # per minute, since each one spends our quota
+    if not place_photos.is_valid_reference(photo_reference):
+        raise NotFound("Unknown photo reference.")
+    width = request.args.get('w', 400, type=int)
+
+    try:
+        path, etag, mimetype = place_photos.get_photo(
+            photo_reference, width, places_provider.get_places_provider(), user_id=session.get('user_id')
+        )
+    except TooManyRequests:
+        raise
+    except Exception:
+        # Upstream unavailable, the provider has no photos or an anonymous visitor asked for a photo
+        # not stored yet; show the default image instead
+        return redirect(url_for('static', filename='images/map.png'))
+
+    # The image behind a URL never changes, so browsers may keep it for good and revalidate by ETag
+    response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=Config.PLACE_PHOTO_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 '''
 ================================================
@@ -273,6 +440,15 @@ def generate_invite(group_id):
     # return invite link
     return jsonify({'inviteLink': invite_link})
 
+@app.route('/generate-invites/<int:group_id>', methods=['POST'])
+@login_required
+def generate_invites(group_id):
+    # generate one invite link per invitee for onboarding a cohort; members only
+    group_controller.GroupController.require_member(group_id, session['user_id'])
+    count = request.values.get('count', 1, type=int)
+    invite_tokens = invitetoken_controller.InviteTokenController.generate_invite_tokens(group_id, count)
+    return jsonify({'inviteLinks': [Config.BASE_URL + '/join-group/' + token for token in invite_tokens]})
+
 
 '''
 ================================================
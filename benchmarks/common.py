@@ -0,0 +1,34 @@
+import time
+
+import config
+from app import create_app
+
+
+def best_of(function, repeat=5):
+    """Runs function repeat times and returns (fastest wall time in seconds, last result)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def report(title, rows):
+    """
+    Prints a before/after table.
+
+    Parameters:
+    - rows: (label, before seconds, after seconds) tuples.
+    """
+    print(title)
+    print(f"  {'case':<36}{'before':>12}{'after':>12}{'speedup':>10}")
+    for label, before, after in rows:
+        print(f"  {label:<36}{before * 1000:>10.1f}ms{after * 1000:>10.1f}ms{before / after:>9.1f}x")
+
+
+def bench_app():
+    """An app on an in-memory database, for benchmarks that need an app context."""
+    config.Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    config.Config.SECRET_KEY = 'benchmark'
+    return create_app()
@@ -0,0 +1,54 @@
+"""
+Meeting point solvers against the plain lat/lng average they replaced: run time and trip lengths.
+
+Run from the repository root:
+
+    python -m benchmarks.meeting_point
+"""
+import numpy as np
+
+from app.controllers.meeting_point import find_meeting_point, travel_distances
+from .common import best_of, report
+
+
+def naive_average(locations):
+    # The old places route: arithmetic mean of latitudes and longitudes over a Python list
+    avg_lat = sum(location[0] for location in locations) / len(locations)
+    avg_lng = sum(location[1] for location in locations) / len(locations)
+    return avg_lat, avg_lng
+
+
+def members(size, seed=4):
+    """A city-sized group with a few members far away, as (lat, lng) tuples."""
+    rng = np.random.default_rng(seed)
+    coords = np.column_stack((5.6 + rng.normal(0, 0.05, size), -0.2 + rng.normal(0, 0.05, size)))
+    coords[:max(1, size // 100)] += (2.0, 1.5)
+    return [tuple(row) for row in coords]
+
+
+def main():
+    groups = {
+        '10k members': members(10000),
+        # Centered on the antimeridian, where averaging longitudes lands on the far side of the Earth
+        '10k members, antimeridian': [(lat, (lng + 360.2) % 360 - 180) for lat, lng in members(10000)],
+    }
+    rows, trips = [], []
+    for name, locations in groups.items():
+        array = np.array(locations)
+        before, naive = best_of(lambda: naive_average(locations))
+        naive_km = travel_distances(array, naive) / 1000
+        for objective in ('centroid', 'median', 'minimax'):
+            after, point = best_of(lambda: find_meeting_point(array, objective))
+            rows.append((f'{name}, {objective}', before, after))
+            km = travel_distances(array, point) / 1000
+            trips.append((f'{name}, {objective}', naive_km, km))
+    report('Meeting point run time (list average vs solver on an array)', rows)
+
+    print('\nTrip lengths in km (list average -> solver)')
+    print(f"  {'case':<36}{'total':>26}{'worst':>22}")
+    for label, naive_km, km in trips:
+        print(f"  {label:<36}{naive_km.sum():>14.0f} -> {km.sum():<10.0f}{naive_km.max():>10.1f} -> {km.max():<8.1f}")
+
+
+if __name__ == '__main__':
+    main()
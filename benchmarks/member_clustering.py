@@ -0,0 +1,61 @@
+"""
+Sub-meetup clustering: a pure-Python haversine k-means (before) against cluster_members.
+
+Also prints the worst trip with one meeting point for the whole group, which is what the
+places flow did before clustering.
+
+Run from the repository root:
+
+    python -m benchmarks.member_clustering
+"""
+import numpy as np
+
+from app.controllers.meeting_point import find_meeting_point, travel_distances
+from app.controllers.member_clustering import cluster_members
+from utils.geo import haversine
+from .common import best_of, report
+
+MAX_DISTANCE = 30000  # Meters from a member to their sub-meetup
+
+
+def loop_kmeans(locations, centers, iterations=20):
+    # Lloyd's algorithm one member and one center at a time, averaging lat/lng
+    centers = list(centers)
+    for _ in range(iterations):
+        groups = [[] for _ in centers]
+        for lat, lng in locations:
+            nearest = min(range(len(centers)), key=lambda c: haversine(lat, lng, *centers[c]))
+            groups[nearest].append((lat, lng))
+        centers = [
+            (sum(lat for lat, _ in group) / len(group), sum(lng for _, lng in group) / len(group)) if group else center
+            for group, center in zip(groups, centers)
+        ]
+    return centers
+
+
+def members(size, rng):
+    """Members spread over six towns roughly 100km apart."""
+    towns = np.array([(5.6, -0.2), (6.7, -1.6), (5.1, -1.3), (6.1, 0.1), (9.4, -0.8), (4.9, -2.0)])
+    picks = rng.integers(0, len(towns), size)
+    return towns[picks] + rng.normal(0, 0.05, (size, 2))
+
+
+def main():
+    rng = np.random.default_rng(14)
+    rows = []
+    for size in (5000, 20000):
+        coords = members(size, rng)
+        location_list = [tuple(row) for row in coords]
+        after, clusters = best_of(lambda: cluster_members(coords, MAX_DISTANCE))
+        seeds = [cluster.center for cluster in clusters]
+        before, _ = best_of(lambda: loop_kmeans(location_list, seeds), 1)
+        rows.append((f'{size} members, k={len(clusters)}', before, after))
+
+        single = travel_distances(coords, find_meeting_point(coords)).max() / 1000
+        worst = max(cluster.max_distance for cluster in clusters) / 1000
+        print(f'{size} members: worst trip {single:.0f}km to one meeting point, {worst:.1f}km to {len(clusters)} sub-meetups')
+    report('Member clustering', rows)
+
+
+if __name__ == '__main__':
+    main()
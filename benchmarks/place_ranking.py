@@ -0,0 +1,51 @@
+"""
+Fairness ranking: a per-pair haversine loop (before) against rank_places' single distance matrix pass.
+
+Run from the repository root:
+
+    python -m benchmarks.place_ranking
+"""
+import numpy as np
+
+from app.controllers.place_ranking import rank_places
+from utils.geo import haversine
+from .common import best_of, report
+
+
+def loop_rank(places, members):
+    # Scores the same travel objectives one place and one member at a time
+    scored = []
+    for place in places:
+        location = place['geometry']['location']
+        distances = [haversine(location['lat'], location['lng'], lat, lng) for lat, lng in members]
+        total = sum(distances)
+        mean = total / len(distances)
+        variance = sum((distance - mean) ** 2 for distance in distances) / len(distances)
+        scored.append((total + max(distances) + variance, place))
+    scored.sort(key=lambda pair: pair[0])
+    return [place for _, place in scored]
+
+
+def candidates(size, rng):
+    return [
+        {'place_id': str(i), 'rating': float(rng.uniform(3, 5)),
+         'geometry': {'location': {'lat': float(lat), 'lng': float(lng)}}}
+        for i, (lat, lng) in enumerate(zip(rng.normal(5.6, 0.05, size), rng.normal(-0.2, 0.05, size)))
+    ]
+
+
+def main():
+    rng = np.random.default_rng(5)
+    rows = []
+    for place_count, member_count in ((200, 1000), (1000, 5000)):
+        places = candidates(place_count, rng)
+        members = np.column_stack((rng.normal(5.6, 0.1, member_count), rng.normal(-0.2, 0.1, member_count)))
+        member_list = [tuple(row) for row in members]
+        before, _ = best_of(lambda: loop_rank(places, member_list), 1)
+        after, _ = best_of(lambda: rank_places(places, members))
+        rows.append((f'{place_count} places x {member_count} members', before, after))
+    report('Place ranking', rows)
+
+
+if __name__ == '__main__':
+    main()
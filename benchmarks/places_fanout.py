@@ -0,0 +1,58 @@
+"""
+Per-type Places lookups: one after another (before) against the concurrent fan-out in get_nearby_places.
+
+Run from the repository root:
+
+    python -m benchmarks.places_fanout
+"""
+import time
+
+from app.controllers.places_controller import activity_type_mapping, get_nearby_places
+from app.controllers.places_provider import PlacesProvider
+from .common import bench_app, best_of, report
+
+
+class LatencyProvider(PlacesProvider):
+    """Answers every place type after a fixed delay, like a remote Places API."""
+
+    cacheable = False
+
+    def __init__(self, latency):
+        self.name = f'latency-{latency}'
+        self.latency = latency
+
+    def places_nearby(self, location, radius, type, page_token=None):
+        time.sleep(self.latency)
+        lat, lng = location
+        return {'results': [
+            {'place_id': f'{type}-{i}', 'name': f'{type} {i}', 'types': [type],
+             'geometry': {'location': {'lat': lat + i * 0.001, 'lng': lng}}}
+            for i in range(20)
+        ]}
+
+
+def serial_nearby_places(location, activity_type, provider):
+    # The lookup loop get_nearby_places replaced: one round trip per place type, back to back
+    results, seen = [], set()
+    for place_type in activity_type_mapping[activity_type]:
+        for place in provider.places_nearby(location, 5000, place_type)['results']:
+            if place['place_id'] not in seen:
+                seen.add(place['place_id'])
+                results.append(place)
+    return results[:10]
+
+
+def main():
+    rows = []
+    with bench_app().app_context():
+        for latency in (0.05, 0.2):
+            provider = LatencyProvider(latency)
+            for activity_type in ('social', 'cor_pro'):
+                before, _ = best_of(lambda: serial_nearby_places((5.6, -0.2), activity_type, provider), 3)
+                after, _ = best_of(lambda: get_nearby_places((5.6, -0.2), activity_type_mapping, activity_type, provider), 3)
+                rows.append((f'{activity_type}, {latency * 1000:.0f}ms per lookup', before, after))
+    report('Nearby places lookup', rows)
+
+
+if __name__ == '__main__':
+    main()
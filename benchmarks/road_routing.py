@@ -0,0 +1,79 @@
+"""
+Member to place travel times: brute-force snapping and full single-source searches over
+per-edge dicts (before) against member_travel_times on the CSR graph and snapping index.
+
+Run from the repository root:
+
+    python -m benchmarks.road_routing
+"""
+import heapq
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from app.controllers.road_routing import ACCESS_SPEED, RoadGraph, member_travel_times
+from utils.geo import haversine_matrix
+from .common import best_of, report
+
+
+def street_grid(size, rng):
+    """A size x size grid of streets ~110m apart with random segment times, as parallel edge arrays."""
+    lat = np.repeat(5.55 + np.arange(size) * 0.001, size)
+    lng = np.tile(-0.25 + np.arange(size) * 0.001, size)
+    nodes = np.arange(size * size).reshape(size, size)
+    sources = np.concatenate((nodes[:, :-1].ravel(), nodes[:-1, :].ravel()))
+    targets = np.concatenate((nodes[:, 1:].ravel(), nodes[1:, :].ravel()))
+    weights = rng.uniform(8, 30, len(sources))
+    return lat, lng, np.concatenate((sources, targets)), np.concatenate((targets, sources)), np.tile(weights, 2)
+
+
+def naive_travel_times(lat, lng, sources, targets, weights, place_coords, member_coords):
+    # Snap by scanning every node, then one unbounded Dijkstra per member over a dict of edge lists
+    nodes = np.column_stack((lat, lng))
+    place_snap = haversine_matrix(place_coords, nodes)
+    member_snap = haversine_matrix(member_coords, nodes)
+    place_nodes, member_nodes = place_snap.argmin(axis=1), member_snap.argmin(axis=1)
+    adjacency = defaultdict(list)
+    for source, target, seconds in zip(sources.tolist(), targets.tolist(), weights.tolist()):
+        adjacency[source].append((target, seconds))
+
+    times = np.empty((len(place_coords), len(member_coords)))
+    for column, start in enumerate(member_nodes.tolist()):
+        best = {start: 0.0}
+        heap = [(0.0, start)]
+        while heap:
+            time, node = heapq.heappop(heap)
+            if time > best.get(node, math.inf):
+                continue
+            for neighbour, seconds in adjacency[node]:
+                if time + seconds < best.get(neighbour, math.inf):
+                    best[neighbour] = time + seconds
+                    heapq.heappush(heap, (time + seconds, neighbour))
+        times[:, column] = [best.get(node, math.inf) for node in place_nodes.tolist()]
+    access = place_snap.min(axis=1)[:, None] + member_snap.min(axis=1)[None, :]
+    # Walking straight there wins for members right next to a place
+    return np.fmin(times + access / ACCESS_SPEED, haversine_matrix(place_coords, member_coords) / ACCESS_SPEED)
+
+
+def main():
+    rng = np.random.default_rng(17)
+    rows = []
+    for size in (100, 200):
+        lat, lng, sources, targets, weights = street_grid(size, rng)
+        graph = RoadGraph.from_edges(lat, lng, sources, targets, weights)
+        span = (size - 1) * 0.001
+        places = np.column_stack((5.55 + rng.uniform(0, span, 200), -0.25 + rng.uniform(0, span, 200)))
+        members = np.column_stack((5.55 + rng.uniform(0, span, 50), -0.25 + rng.uniform(0, span, 50)))
+
+        before, expected = best_of(lambda: naive_travel_times(lat, lng, sources, targets, weights, places, members), 1)
+        # The adjacency lists are built once per loaded graph, not per request
+        graph.travel_times([0], [1])
+        after, times = best_of(lambda: member_travel_times(graph, places, members), 3)
+        assert np.allclose(times, expected, rtol=1e-4)
+        rows.append((f'{size * size} nodes, 50 x 200', before, after))
+    report('Member travel times', rows)
+
+
+if __name__ == '__main__':
+    main()
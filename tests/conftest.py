@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+# The app and config modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from app import create_app, db as _db
+from app.controllers.preference_taxonomy import invalidate_taxonomy
+from app.models import User, Group, GroupMember
+from utils import geohash
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app on a fresh SQLite database in a temporary directory, with an app context pushed."""
+    monkeypatch.setattr(config.Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setattr(config.Config, 'SECRET_KEY', 'test-secret')
+    monkeypatch.setattr(config.Config, 'PLACE_PHOTO_DIR', str(tmp_path / 'photo_cache'))
+    # Version checks would add a query at random points of the statement counts
+    monkeypatch.setattr(config.Config, 'TAXONOMY_CHECK_INTERVAL', 3600.0)
+    flask_app = create_app()
+    with flask_app.app_context():
+        _db.create_all()
+        invalidate_taxonomy()
+        yield flask_app
+        _db.session.remove()
+        invalidate_taxonomy()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def statements(db):
+    """List of the SQL statements sent to the database during the test; clear() it to start counting."""
+    sent = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield sent
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def make_users(db):
+    """Creates users at the given (lat, lng) locations (None for no location) and returns them."""
+    created = []
+
+    def make(locations):
+        users = []
+        for lat_lng in locations:
+            user = User(username=f'user{len(created)}', password_hash='x')
+            if lat_lng is not None:
+                user.latitude, user.longitude = lat_lng
+                user.geohash = geohash.encode(user.latitude, user.longitude, config.Config.GEOHASH_PRECISION)
+            db.session.add(user)
+            created.append(user)
+            users.append(user)
+        db.session.commit()
+        return users
+
+    return make
+
+
+@pytest.fixture
+def make_group(db):
+    """Creates a group with the given users as members and returns it."""
+    def make(users, name='group'):
+        group = Group(name=name)
+        db.session.add(group)
+        db.session.flush()
+        for user in users:
+            db.session.add(GroupMember(group_id=group.id, user_id=user.id))
+        db.session.commit()
+        return group
+
+    return make
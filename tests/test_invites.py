@@ -0,0 +1,65 @@
+import time
+
+import pytest
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+
+from app.controllers import invitetoken_controller
+from app.controllers.invitetoken_controller import InviteTokenController
+from app.models import GroupMember
+
+
+@pytest.fixture(autouse=True)
+def fresh_revocations():
+    invitetoken_controller.invalidate_revocations()
+    yield
+    invitetoken_controller.invalidate_revocations()
+
+
+def test_signed_invite_is_single_use_across_workers(app, monkeypatch, make_users, make_group):
+    owner, first, second = make_users([(5.6, -0.2)] * 3)
+    first_id, second_id = first.id, second.id
+    group_id = make_group([owner]).id
+    token = InviteTokenController.generate_invite_token(group_id)
+    assert InviteTokenController.validate_invite_token(token)
+
+    InviteTokenController.redeem_invite_token(token, first_id)
+    # A worker whose revocation snapshot predates the redemption still takes the token for valid...
+    monkeypatch.setattr(invitetoken_controller, '_revoked', frozenset())
+    monkeypatch.setattr(invitetoken_controller, '_checked_at', time.monotonic())
+    assert InviteTokenController.validate_invite_token(token)
+    # ...but the database refuses a second redemption
+    with pytest.raises(BadRequest):
+        InviteTokenController.redeem_invite_token(token, second_id)
+    assert GroupMember.query.filter_by(group_id=group_id).count() == 2
+    assert GroupMember.query.filter_by(user_id=second_id).count() == 0
+
+
+def test_invites_are_not_signed_with_the_placeholder_key(app, make_users, make_group):
+    group_id = make_group(make_users([(5.6, -0.2)])).id
+    token = InviteTokenController.generate_invite_token(group_id)
+    app.config['SECRET_KEY'] = 'your-secret-key'
+    with pytest.raises(ServiceUnavailable):
+        InviteTokenController.generate_invite_token(group_id)
+    with pytest.raises(ServiceUnavailable):
+        InviteTokenController.validate_invite_token(token)
+    assert app.test_client().get(f'/generate-invite/{group_id}').status_code == 503
+
+
+def test_bulk_invites_route(app, make_users, make_group):
+    member, outsider = make_users([(5.6, -0.2)] * 2)
+    member_id, outsider_id = member.id, outsider.id
+    group_id = make_group([member]).id
+    client = app.test_client()
+    assert client.post(f'/generate-invites/{group_id}', data={'count': 3}).status_code == 401
+
+    with client.session_transaction() as session:
+        session['user_id'] = outsider_id
+    assert client.post(f'/generate-invites/{group_id}', data={'count': 3}).status_code == 403
+
+    with client.session_transaction() as session:
+        session['user_id'] = member_id
+    response = client.post(f'/generate-invites/{group_id}', data={'count': 3})
+    assert response.status_code == 200
+    links = response.get_json()['inviteLinks']
+    assert len(set(links)) == 3
+    assert client.post('/generate-invites/not-a-number').status_code == 404
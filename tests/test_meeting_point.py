@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.controllers.meeting_point import find_meeting_point, travel_distances
+
+
+def _city(seed, size=40):
+    rng = np.random.default_rng(seed)
+    return np.column_stack((5.6 + rng.random(size) * 0.1, -0.2 + rng.random(size) * 0.1))
+
+
+def _grid_around(point, span=0.02, steps=41):
+    lat, lng = point
+    offsets = np.linspace(-span, span, steps)
+    return [(lat + d_lat, lng + d_lng) for d_lat in offsets for d_lng in offsets]
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_median_minimizes_total_travel(seed):
+    coords = _city(seed)
+    median = find_meeting_point(coords, 'median')
+    total = travel_distances(coords, median).sum()
+
+    assert total <= travel_distances(coords, find_meeting_point(coords, 'centroid')).sum()
+    # No point of a fine grid around the answer does meaningfully better
+    best = min(travel_distances(coords, point).sum() for point in _grid_around(median))
+    assert total <= best + 1.0
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_minimax_minimizes_worst_travel(seed):
+    coords = _city(seed)
+    minimax = find_meeting_point(coords, 'minimax')
+    worst = travel_distances(coords, minimax).max()
+
+    for objective in ('centroid', 'median'):
+        assert worst <= travel_distances(coords, find_meeting_point(coords, objective)).max() + 1e-6
+    best = min(travel_distances(coords, point).max() for point in _grid_around(minimax))
+    assert worst <= best + 1.0
+
+
+def test_meeting_point_edge_cases():
+    assert find_meeting_point([(5.6, -0.2)]) == (5.6, -0.2)
+    # Members on both sides of the antimeridian meet near it, not in the middle of the globe
+    lat, lng = find_meeting_point([(0.0, 179.9), (0.0, -179.9)], 'centroid')
+    assert abs(lat) < 1e-9 and abs(abs(lng) - 180.0) < 1e-9
+    with pytest.raises(ValueError):
+        find_meeting_point([])
+    with pytest.raises(ValueError):
+        find_meeting_point([(5.6, -0.2)], 'nearest')
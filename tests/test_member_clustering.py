@@ -0,0 +1,46 @@
+import numpy as np
+
+from app.controllers.member_clustering import cluster_members
+from utils.geo import haversine
+
+
+def _blob(rng, lat, lng, size, spread=0.02):
+    return np.column_stack((lat + rng.uniform(-spread, spread, size), lng + rng.uniform(-spread, spread, size)))
+
+
+def _assert_valid(clusters, coords, max_distance=None):
+    indices = np.sort(np.concatenate([cluster.indices for cluster in clusters]))
+    # Every member lands in exactly one cluster
+    assert indices.tolist() == list(range(len(coords)))
+    for cluster in clusters:
+        trips = [haversine(*coords[index], *cluster.center) for index in cluster.indices]
+        assert cluster.max_distance >= max(trips) - 1e-3
+        if max_distance is not None:
+            assert max(trips) <= max_distance
+
+
+def test_separate_towns_become_separate_meetups():
+    rng = np.random.default_rng(14)
+    towns = [(5.6, -0.2), (6.7, -1.6), (9.4, -0.85)]  # Accra, Kumasi, Tamale
+    coords = np.vstack([_blob(rng, lat, lng, size) for (lat, lng), size in zip(towns, (30, 20, 10))])
+
+    clusters = cluster_members(coords, max_distance=15000)
+
+    assert [len(cluster.indices) for cluster in clusters] == [30, 20, 10]
+    _assert_valid(clusters, coords, max_distance=15000)
+
+
+def test_compact_group_stays_together():
+    coords = _blob(np.random.default_rng(1), 5.6, -0.2, 50, spread=0.01)
+    clusters = cluster_members(coords, max_distance=15000)
+    assert len(clusters) == 1
+    _assert_valid(clusters, coords, max_distance=15000)
+
+
+def test_cluster_cap_is_respected():
+    rng = np.random.default_rng(2)
+    coords = np.vstack([_blob(rng, 5.0 + i, -0.2, 5) for i in range(6)])
+    clusters = cluster_members(coords, max_distance=1000, max_clusters=3)
+    assert len(clusters) <= 3
+    _assert_valid(clusters, coords)
+    assert cluster_members([], max_distance=1000) == []
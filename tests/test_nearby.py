@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from app.controllers.nearby_controller import NearbyController, distance_bucket
+from utils.geo import haversine
+
+
+@pytest.mark.parametrize('center', [(5.6, -0.2), (64.1, -21.9), (-0.01, 179.99)])
+def test_users_near_matches_brute_force(make_users, center):
+    rng = random.Random(15)
+    lat0, lng0 = center
+    locations = [
+        (lat0 + rng.uniform(-0.2, 0.2), (lng0 + rng.uniform(-0.2, 0.2) + 180) % 360 - 180)
+        for _ in range(300)
+    ]
+    users = make_users(locations + [None])
+    user_ids = [user.id for user in users]
+    snapshot = [(user.id, user.latitude, user.longitude) for user in users]
+
+    for _ in range(40):
+        lat = lat0 + rng.uniform(-0.15, 0.15)
+        lng = (lng0 + rng.uniform(-0.15, 0.15) + 180) % 360 - 180
+        radius = rng.choice([200, 1000, 5000, 20000])
+        exclude = rng.choice(user_ids)
+
+        found = NearbyController.get_users_near(lat, lng, radius, exclude_user_id=exclude)
+        expected = sorted(
+            user_id for user_id, user_lat, user_lng in snapshot
+            if user_lat is not None and user_id != exclude and haversine(lat, lng, user_lat, user_lng) <= radius
+        )
+        assert sorted(user.id for user, _ in found) == expected
+        distances = [distance for _, distance in found]
+        assert distances == sorted(distances)
+
+
+def test_users_near_limit_keeps_nearest(make_users):
+    make_users([(5.6 + i * 0.001, -0.2) for i in range(10)])
+    found = NearbyController.get_users_near(5.6, -0.2, 5000, limit=3)
+    assert [round(distance) for _, distance in found] == [0, 111, 222]
+
+
+def test_distance_buckets():
+    assert distance_bucket(0) == (0, '<1 km')
+    assert distance_bucket(1500) == (1, '1-2 km')
+    assert distance_bucket(4999) == (2, '2-5 km')
+    assert distance_bucket(30000) == (5, '>25 km')
+
+
+def test_nearby_users_route(app, make_users):
+    me, near, far = make_users([(5.6, -0.2), (5.605, -0.2), (5.9, -0.2)])
+    client = app.test_client()
+    assert client.get('/nearby/users').status_code == 401
+
+    with client.session_transaction() as session:
+        session['user_id'] = me.id
+    # The search is around the caller's stored location, whatever the query string says
+    response = client.get('/nearby/users?radius=2000&lat=5.9&lng=-0.2')
+    assert response.status_code == 200
+    assert response.get_json() == [{'id': near.id, 'username': near.username, 'distance': '<1 km'}]
+
+
+def test_groups_near_matches_brute_force(db, make_users, make_group):
+    from app.controllers.group_aggregates import GroupAggregates
+    from app.models import GroupMember
+    from utils.geo import from_unit_vector, to_unit_vectors
+
+    rng = random.Random(16)
+    members = {}
+    for index in range(60):
+        lat0, lng0 = 5.6 + rng.uniform(-0.3, 0.3), -0.2 + rng.uniform(-0.3, 0.3)
+        users = make_users([(lat0 + rng.uniform(-0.02, 0.02), lng0 + rng.uniform(-0.02, 0.02))
+                            for _ in range(rng.randint(1, 6))])
+        group = make_group([], name=f'group{index}')
+        # Joined one by one, the way memberships are added in the app
+        for user in users:
+            db.session.add(GroupMember(group_id=group.id, user_id=user.id))
+            GroupAggregates.add_member(group.id, user.latitude, user.longitude)
+        db.session.commit()
+        members[group.id] = [(user.latitude, user.longitude) for user in users]
+
+    # A member moving across town shifts the running aggregates without a recompute
+    moved = users[0]
+    old_location = (moved.latitude, moved.longitude)
+    moved.latitude, moved.longitude = 5.9, 0.1
+    GroupAggregates.move_member(moved.id, old_location, (5.9, 0.1))
+    members[group.id][0] = (5.9, 0.1)
+    db.session.commit()
+    assert GroupAggregates.verify(fix=False)['drifted'] == []
+
+    centroids = {
+        group_id: from_unit_vector(to_unit_vectors(locations).sum(axis=0))
+        for group_id, locations in members.items()
+    }
+    for _ in range(40):
+        lat, lng = 5.6 + rng.uniform(-0.3, 0.3), -0.2 + rng.uniform(-0.3, 0.3)
+        radius = rng.choice([2000, 10000, 30000])
+        found = NearbyController.get_groups_near(lat, lng, radius)
+        expected = sorted(
+            group_id for group_id, (group_lat, group_lng) in centroids.items()
+            if haversine(lat, lng, group_lat, group_lng) <= radius
+        )
+        assert sorted(group.id for group, _ in found) == expected
@@ -0,0 +1,99 @@
+import os
+import time
+from collections import OrderedDict
+
+import pytest
+
+from app.controllers import place_photos, places_provider
+from app.controllers.place_photos import PlacePhotoStore
+
+
+class PhotoProvider:
+    name = 'photos'
+    cacheable = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def place_photo(self, photo_reference, max_width):
+        self.calls += 1
+        return b'\xff\xd8\xff' + photo_reference.encode('ascii') * 100
+
+
+def _age(store, photo_reference, width, seconds_ago):
+    path = store._ref_path(photo_reference, width)
+    timestamp = time.time() - seconds_ago
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_store_evicts_least_recently_served(tmp_path):
+    store = PlacePhotoStore(str(tmp_path), (400,), max_bytes=4000)
+    for index in range(4):
+        store.put(f'ref{index}', 400, b'\xff\xd8\xff' + bytes([index]) * 900)
+        _age(store, f'ref{index}', 400, 100 - index)
+    # Serving ref0 makes it the most recently used
+    assert store.get('ref0', 400) is not None
+
+    store.put('ref4', 400, b'\xff\xd8\xff' + b'4' * 900)
+
+    assert store.size() <= 4000 * place_photos.EVICTION_LOW_WATER
+    assert store.get('ref1', 400) is None
+    assert all(store.get(reference, 400) is not None for reference in ('ref0', 'ref4'))
+
+
+def test_shared_image_outlives_one_of_its_references(tmp_path):
+    store = PlacePhotoStore(str(tmp_path), (400,))
+    data = b'\xff\xd8\xff' + b'x' * 900
+    store.put('old', 400, data)
+    store.put('new', 400, data)
+    _age(store, 'old', 400, 100)
+
+    store.evict(store.size() - 1)
+
+    assert store.get('old', 400) is None
+    assert store.get('new', 400) is not None
+
+
+@pytest.fixture
+def photo_client(app, monkeypatch, make_users):
+    provider = PhotoProvider()
+    monkeypatch.setitem(places_provider._providers, 'photos', provider)
+    monkeypatch.setitem(app.config, 'PLACES_PROVIDER', 'photos')
+    monkeypatch.setitem(app.config, 'PLACE_PHOTO_FETCHES_PER_MINUTE', 3)
+    monkeypatch.setattr(place_photos, '_fetch_budgets', OrderedDict())
+    user = make_users([(5.6, -0.2)])[0]
+    client = app.test_client()
+    return client, provider, user.id
+
+
+def test_photo_route_limits_downloads_to_logged_in_users(photo_client):
+    client, provider, user_id = photo_client
+    # Anonymous visitors get the default image instead of a download
+    response = client.get('/place-photo/ref0')
+    assert response.status_code == 302 and response.location.endswith('/static/images/map.png')
+    assert provider.calls == 0
+
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    assert [client.get(f'/place-photo/ref{index}').status_code for index in range(5)] == [200, 200, 200, 429, 429]
+    assert provider.calls == 3
+    # Photos already on disk are served without spending the budget
+    assert client.get('/place-photo/ref0').status_code == 200
+    assert provider.calls == 3
+
+    # Stored photos are served to anonymous visitors too
+    with client.session_transaction() as session:
+        session.clear()
+    assert client.get('/place-photo/ref1').status_code == 200
+    assert provider.calls == 3
+
+
+def test_fetch_budgets_are_bounded(app, monkeypatch):
+    monkeypatch.setattr(place_photos, '_fetch_budgets', OrderedDict())
+    monkeypatch.setattr(place_photos, 'FETCH_BUDGETS_MAX_USERS', 3)
+    first = place_photos._fetch_budget(1)
+    for user_id in (2, 3, 1, 4):
+        place_photos._fetch_budget(user_id)
+    # User 2 was the least recently active
+    assert list(place_photos._fetch_budgets) == [3, 1, 4]
+    assert place_photos._fetch_budget(1) is first
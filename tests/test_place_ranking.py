@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from app.controllers.place_ranking import rank_places
+from utils.geo import distance_matrix, haversine, haversine_matrix
+
+
+@pytest.mark.parametrize('spread, tolerance', [(0.1, 1e-6), (1e-5, 1e-6), (180.0, 1e-3)])
+def test_distance_matrix_matches_haversine(spread, tolerance):
+    rng = np.random.default_rng(5)
+    a = np.column_stack((5.6 + rng.uniform(-spread, spread, 30) / 2, -0.2 + rng.uniform(-spread, spread, 30)))
+    b = np.column_stack((5.6 + rng.uniform(-spread, spread, 50) / 2, -0.2 + rng.uniform(-spread, spread, 50)))
+    np.testing.assert_allclose(distance_matrix(a, b), haversine_matrix(a, b), rtol=0, atol=tolerance)
+
+
+def test_distance_matrix_is_precise_for_nearby_points():
+    # 0.1 mm apart: the arccos of a dot product would round this to 0 or about 10 cm
+    a = np.array([[5.6, -0.2]])
+    b = np.array([[5.6 + 1e-9, -0.2], [5.6, -0.2]])
+    np.testing.assert_allclose(distance_matrix(a, b)[0], [haversine(5.6, -0.2, 5.6 + 1e-9, -0.2), 0.0], atol=1e-9)
+    assert distance_matrix(np.empty((0, 2)), b).shape == (0, 2)
+
+
+def _place(place_id, lat, lng, rating=None):
+    return {'place_id': place_id, 'rating': rating, 'geometry': {'location': {'lat': lat, 'lng': lng}}}
+
+
+def test_rank_places_scores_every_member():
+    members = [(5.60, -0.20), (5.62, -0.20), (5.61, -0.18)]
+    places = [
+        _place('far', 5.80, -0.40),
+        _place('middle', 5.61, -0.193),
+        _place('lopsided', 5.60, -0.20),
+        {'place_id': 'nowhere', 'geometry': {}},
+    ]
+    ranked = rank_places(places, members, weights={'rating': 0.0, 'preference': 0.0})
+
+    assert [place['place_id'] for place in ranked] == ['middle', 'lopsided', 'far', 'nowhere']
+    assert ranked[-1]['scores']['score'] is None
+    for place in ranked[:-1]:
+        location = place['geometry']['location']
+        trips = [haversine(lat, lng, location['lat'], location['lng']) for lat, lng in members]
+        assert place['scores']['total_distance'] == pytest.approx(sum(trips), abs=1e-3)
+        assert place['scores']['max_distance'] == pytest.approx(max(trips), abs=1e-3)
+        assert place['scores']['variance'] == pytest.approx(np.var(trips), rel=1e-6)
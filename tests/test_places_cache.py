@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.controllers.places_cache import PlacesCache
+from app.models import PlaceCacheEntry
+
+
+@pytest.fixture
+def cache(app, monkeypatch):
+    monkeypatch.setattr(PlacesCache, '_touched', {})
+    monkeypatch.setitem(app.config, 'PLACES_CACHE_MAX_ENTRIES', 2)
+    return PlacesCache
+
+
+def _age(db, key, minutes):
+    entry = PlaceCacheEntry.query.filter_by(cache_key=key).one()
+    entry.last_accessed_at = datetime.utcnow() - timedelta(minutes=minutes)
+    db.session.commit()
+
+
+def test_hits_do_not_write(cache, db, statements):
+    cache.set('a', 'cafe', [{'name': 'A'}])
+    _age(db, 'a', 1)
+    statements.clear()
+
+    assert cache.get('a') == [{'name': 'A'}]
+    assert all(statement.lstrip().upper().startswith('SELECT') for statement in statements)
+    # Accessed a minute ago: within the touch interval, nothing queued
+    assert cache._touched == {}
+
+
+def test_stale_access_times_are_saved_before_eviction(cache, db):
+    cache.set('a', 'cafe', [{'name': 'A'}])
+    cache.set('b', 'cafe', [{'name': 'B'}])
+    _age(db, 'a', 60)
+    _age(db, 'b', 30)
+
+    # 'a' is the least recently used until its hit is saved with the next write
+    assert cache.get('a') is not None
+    assert len(cache._touched) == 1
+    cache.set('c', 'cafe', [{'name': 'C'}])
+
+    assert cache._touched == {}
+    assert {entry.cache_key for entry in PlaceCacheEntry.query} == {'a', 'c'}
+
+
+def test_stats_require_login(app):
+    client = app.test_client()
+    assert client.get('/places-cache/stats').status_code == 401
+    assert client.get('/places-provider/stats').status_code == 401
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from app.controllers.places_controller import activity_type_mapping, get_nearby_places
+from app.controllers.places_provider import PlacesProvider
+
+
+class SlowProvider(PlacesProvider):
+    """Answers every place type after a fixed delay, counting calls that overlap."""
+
+    cacheable = False
+
+    def __init__(self, name, delay, delays=None):
+        self.name = name
+        self.delay = delay
+        self.delays = delays or {}
+        self.running = 0
+        self.most_running = 0
+        self._lock = threading.Lock()
+
+    def places_nearby(self, location, radius, type, page_token=None):
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            time.sleep(self.delays.get(type, self.delay))
+        finally:
+            with self._lock:
+                self.running -= 1
+        lat, lng = location
+        return {'results': [
+            {'place_id': f'{type}-{i}', 'name': f'{type} {i}', 'types': [type],
+             'geometry': {'location': {'lat': lat + i * 0.001, 'lng': lng}}}
+            for i in range(3)
+        ]}
+
+
+def test_place_types_are_fetched_concurrently(app):
+    provider = SlowProvider('slow-concurrent', delay=0.3)
+
+    started = time.perf_counter()
+    nearby = get_nearby_places((5.6, -0.2), activity_type_mapping, 'social', provider, limit=None)
+    elapsed = time.perf_counter() - started
+
+    assert provider.most_running == len(activity_type_mapping['social'])
+    # One lookup's latency, not the sum of all three
+    assert elapsed < 0.3 * 2
+    assert len(nearby['results']) == 9
+    assert not nearby['partial']
+
+
+def test_deadline_returns_partial_results(app):
+    provider = SlowProvider('slow-deadline', delay=0.05, delays={'bar': 2.0})
+
+    started = time.perf_counter()
+    nearby = get_nearby_places((5.6, -0.2), activity_type_mapping, 'social', provider, deadline=0.5, limit=None)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.5
+    assert nearby['partial']
+    assert {place['types'][0] for place in nearby['results']} == {'restaurant', 'cafe'}
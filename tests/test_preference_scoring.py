@@ -0,0 +1,48 @@
+import pytest
+
+from app.controllers.preference_scoring import PreferenceVocabulary, score_places
+
+NAMES = {
+    'ambiances': ['Quiet', 'Cozy'],
+    'cuisines': ['Italian', 'Asian'],
+    'dietary_restrictions': ['None', 'Vegetarian', 'Gluten-free'],
+    'budget_preferences': ['Moderate'],
+}
+
+# Shaped like legacy places_nearby results: generic types, cuisine only in the name
+PIZZERIA = {'name': "Luigi's Pizzeria", 'types': ['restaurant', 'food'], 'price_level': 2}
+VEGETARIAN = {'name': 'Green Leaf Vegetarian Kitchen', 'types': ['restaurant', 'food']}
+DINER = {'name': 'Joe Diner', 'types': ['restaurant', 'food']}
+LIBRARY = {'name': 'Central Library', 'types': ['library']}
+
+
+@pytest.fixture
+def vocabulary():
+    return PreferenceVocabulary(NAMES)
+
+
+def _names(places):
+    return [place['name'] for place in places]
+
+
+def test_cuisines_match_on_place_names(vocabulary):
+    scored = score_places([PIZZERIA, DINER, LIBRARY], {'cuisines': ['Italian']}, vocabulary)
+    assert [place['preference_score'] for place in scored] == [1.0, 0.0, 0.0]
+
+
+def test_dietary_restriction_keeps_places_known_to_satisfy_it(vocabulary):
+    scored = score_places([PIZZERIA, VEGETARIAN, DINER, LIBRARY], {'dietary_restrictions': ['Vegetarian']}, vocabulary)
+    # Places that serve no food are not subject to dietary restrictions
+    assert _names(scored) == ['Green Leaf Vegetarian Kitchen', 'Central Library']
+
+
+def test_dietary_restriction_nothing_can_show_is_not_enforced(vocabulary):
+    places = [PIZZERIA, DINER, LIBRARY]
+    scored = score_places(places, {'dietary_restrictions': ['Vegetarian', 'None']}, vocabulary)
+    assert _names(scored) == _names(places)
+
+
+def test_soft_preferences_are_weighted_by_category(vocabulary):
+    preferences = {'ambiances': ['Cozy', 'Quiet'], 'budget_preferences': ['Moderate']}
+    scored = score_places([PIZZERIA, LIBRARY, {'name': 'Corner Cafe', 'types': ['cafe']}], preferences, vocabulary)
+    assert [place['preference_score'] for place in scored] == [0.5, 0.25, 0.25]
@@ -0,0 +1,170 @@
+import random
+
+import pytest
+
+from app.controllers.group_controller import GroupController
+from app.controllers.preference_controller import PreferencesController
+from app.controllers.preference_taxonomy import get_taxonomy
+from app.models import User, Ambiance, Cuisine, DietaryRestriction, BudgetPreference
+
+
+@pytest.fixture
+def taxonomy(db):
+    """A few names in each preference table, with the taxonomy snapshot loaded."""
+    names = {
+        Ambiance: ['Quiet', 'Lively', 'Cozy'],
+        Cuisine: ['Italian', 'Asian', 'Mexican'],
+        DietaryRestriction: ['None', 'Vegetarian'],
+        BudgetPreference: ['Budget-friendly', 'Moderate'],
+    }
+    for model, model_names in names.items():
+        db.session.add_all(model(name=name) for name in model_names)
+    db.session.commit()
+    return get_taxonomy()
+
+
+@pytest.fixture
+def make_member_group(db, taxonomy, make_users, make_group):
+    """Creates a group of located members who each picked some preferences."""
+    rng = random.Random(0)
+    ambiances, cuisines = Ambiance.query.all(), Cuisine.query.all()
+    dietary, budgets = DietaryRestriction.query.all(), BudgetPreference.query.all()
+
+    def make(size, name):
+        users = make_users([(5.6 + rng.random() * 0.1, -0.2 + rng.random() * 0.1) for _ in range(size)])
+        for user in users:
+            user.ambiances = rng.sample(ambiances, 2)
+            user.cuisines = [rng.choice(cuisines)]
+            user.dietary_restrictions = [rng.choice(dietary)]
+            user.budget_preferences = budgets
+        db.session.commit()
+        return make_group(users, name=name)
+
+    return make
+
+
+def _count(statements, call):
+    statements.clear()
+    result = call()
+    return len(statements), result
+
+
+def test_group_lookups_use_constant_queries(db, statements, make_member_group):
+    small = make_member_group(3, 'small').id
+    large = make_member_group(60, 'large').id
+    db.session.expire_all()
+    # Seeding through the relationships counts as a taxonomy edit; reload it before counting
+    get_taxonomy()
+
+    counts = {}
+    for group_id in (small, large):
+        locations, locations_result = _count(statements, lambda: GroupController.get_group_member_locations(group_id))
+        preferences, _ = _count(statements, lambda: GroupController.get_group_member_preferences(group_id))
+        counts[group_id] = (locations, preferences)
+        assert len(locations_result) in (3, 60)
+
+    # One query for coordinates, one more for the preferences of every member
+    assert counts[small] == counts[large] == (1, 2)
+
+
+PREFERENCE_TABLES = ('user_ambiance', 'user_cuisine', 'user_dietary', 'user_budget')
+
+
+def _preference_writes(statements):
+    return [
+        statement.split(None, 1)[0] for statement in statements
+        if statement.startswith(('INSERT', 'DELETE', 'UPDATE')) and any(table in statement for table in PREFERENCE_TABLES)
+    ]
+
+
+def test_preference_saves_write_only_changes(db, statements, taxonomy, make_users):
+    user_id = make_users([(5.6, -0.2)])[0].id
+    ambiances = [str(ambiance.id) for ambiance in Ambiance.query.order_by(Ambiance.id)]
+    cuisines = [str(cuisine.id) for cuisine in Cuisine.query.order_by(Cuisine.id)]
+    dietary = [str(restriction.id) for restriction in DietaryRestriction.query.order_by(DietaryRestriction.id)]
+    budgets = [str(budget.id) for budget in BudgetPreference.query.order_by(BudgetPreference.id)]
+    selection = (ambiances[:2], cuisines, dietary[1:], budgets[:1])
+
+    # First save: one bulk INSERT per category, however many preferences were picked
+    statements.clear()
+    PreferencesController.update_user_preferences(user_id, *selection)
+    assert _preference_writes(statements) == ['INSERT'] * 4
+
+    # Saving the same selection again reads the current rows and writes nothing
+    statements.clear()
+    assert PreferencesController.update_user_preferences(user_id, *selection) == {}
+    assert len(statements) == 2
+    assert _preference_writes(statements) == []
+
+    # Swapping one ambiance touches only that category
+    statements.clear()
+    changes = PreferencesController.update_user_preferences(user_id, ambiances[1:], *selection[1:])
+    assert _preference_writes(statements) == ['DELETE', 'INSERT']
+    assert changes == {'ambiances': ([int(ambiances[2])], [int(ambiances[0])])}
+
+    db.session.expire_all()
+    assert sorted(ambiance.id for ambiance in db.session.get(User, user_id).ambiances) == \
+        [int(value) for value in ambiances[1:]]
+
+
+def _stored_index(db, user_id):
+    from app.models import UserSignature, UserSignatureBand
+
+    signature = db.session.get(UserSignature, user_id).signature
+    bands = sorted((row.band, row.bucket) for row in UserSignatureBand.query.filter_by(user_id=user_id))
+    return signature, bands
+
+
+@pytest.mark.parametrize('bands', [16, 32])
+def test_signature_updates_use_bulk_statements(app, db, statements, taxonomy, make_users, bands):
+    from app.controllers.suggestion_controller import SuggestionController
+
+    app.config['SUGGESTION_LSH_BANDS'] = bands
+    user_id = make_users([(5.6, -0.2)])[0].id
+    ambiances = [str(ambiance.id) for ambiance in Ambiance.query.order_by(Ambiance.id)]
+    cuisines = [str(cuisine.id) for cuisine in Cuisine.query.order_by(Cuisine.id)]
+    PreferencesController.update_user_preferences(user_id, ambiances[:1], cuisines[:1], [], [])
+
+    # Reads of the preferences and stored bands, the signature update, then one
+    # DELETE and one executemany INSERT for the bands, whatever the band count
+    db.session.execute(db.text('DELETE FROM user_ambiance WHERE user_id = :user_id'), {'user_id': user_id})
+    db.session.execute(db.text('INSERT INTO user_ambiance (user_id, ambiance_id) VALUES (:user_id, :id)'),
+                       [{'user_id': user_id, 'id': int(ambiance_id)} for ambiance_id in ambiances[1:]])
+    statements.clear()
+    SuggestionController.update_user(user_id)
+    db.session.commit()
+    assert len(statements) == 5
+    assert sum(statement.startswith('INSERT INTO user_signature_bands') for statement in statements) == 1
+
+    # The incremental update leaves the same index a full rebuild does
+    incremental = _stored_index(db, user_id)
+    SuggestionController.rebuild()
+    assert _stored_index(db, user_id) == incremental
+
+
+class TownGeocoder:
+    name = 'towns'
+
+    def geocode(self, address):
+        return {'osu, accra': (5.556, -0.182), 'legon, accra': (5.651, -0.187)}.get(address)
+
+
+def test_geocoding_batches_do_not_reload_users(app, db, statements, monkeypatch, make_users):
+    from app.controllers import geocoding
+    from app.controllers.user_controller import UserController
+    from app.models import GeocodeEntry
+
+    monkeypatch.setitem(geocoding._geocoders, 'towns', TownGeocoder())
+    monkeypatch.setitem(app.config, 'GEOCODER', 'towns')
+    users = make_users([None] * 20)
+    for user, address in zip(users, ['Osu, Accra', 'Legon, Accra', 'Nowhere'] * 7):
+        user.address = address
+    db.session.commit()
+
+    statements.clear()
+    report = UserController.geocode_missing_locations(batch_size=10)
+
+    assert report == {'checked': 20, 'located': 14, 'not_found': 6, 'failed': 0}
+    # Committing the cache entries mid-batch used to expire the batch's users and reload them one by one
+    assert not [statement for statement in statements if statement.startswith('SELECT') and 'WHERE users.id = ?' in statement]
+    assert GeocodeEntry.query.count() == 3
@@ -0,0 +1,77 @@
+import numpy as np
+
+from app.controllers.road_routing import ACCESS_SPEED, RoadGraph, member_travel_times
+from utils.geo import haversine_matrix
+
+
+def _grid_graph(size=8, seed=17):
+    """A size x size street grid with random one-way and two-way segments, plus a detached fragment."""
+    rng = np.random.default_rng(seed)
+    lat = np.repeat(5.6 + np.arange(size) * 0.002, size)
+    lng = np.tile(-0.2 + np.arange(size) * 0.002, size)
+    edges = []
+    for node in range(size * size):
+        row, column = divmod(node, size)
+        for neighbour in ([node + 1] if column + 1 < size else []) + ([node + size] if row + 1 < size else []):
+            seconds = float(rng.uniform(10, 60))
+            edges.append((node, neighbour, seconds))
+            if rng.random() < 0.8:
+                edges.append((neighbour, node, seconds * rng.uniform(0.8, 1.2)))
+    # Two nodes far away, connected only to each other; the graph keeps the main network only
+    lat = np.append(lat, [6.0, 6.001])
+    lng = np.append(lng, [0.5, 0.501])
+    edges.append((size * size, size * size + 1, 5.0))
+    sources, targets, weights = zip(*edges)
+    return lat, lng, np.array(sources), np.array(targets), np.array(weights, dtype=np.float32)
+
+
+def _floyd_warshall(node_count, sources, targets, weights):
+    times = np.full((node_count, node_count), np.inf)
+    np.fill_diagonal(times, 0.0)
+    for source, target, seconds in zip(sources, targets, weights):
+        times[source, target] = min(times[source, target], seconds)
+    for via in range(node_count):
+        times = np.minimum(times, times[:, via:via + 1] + times[via:via + 1, :])
+    return times
+
+
+def test_travel_times_match_all_pairs_shortest_paths():
+    lat, lng, sources, targets, weights = _grid_graph()
+    graph = RoadGraph.from_edges(lat, lng, sources, targets, weights)
+    assert graph.node_count == 64
+
+    expected = _floyd_warshall(64, sources[:-1], targets[:-1], weights[:-1])
+    rng = np.random.default_rng(0)
+    from_nodes, to_nodes = rng.integers(0, 64, 10), rng.integers(0, 64, 12)
+    np.testing.assert_allclose(graph.travel_times(from_nodes, to_nodes), expected[np.ix_(from_nodes, to_nodes)],
+                               rtol=1e-5)
+
+
+def test_snap_finds_nearest_node():
+    lat, lng, sources, targets, weights = _grid_graph()
+    graph = RoadGraph.from_edges(lat, lng, sources, targets, weights, cell_size=0.003)
+    rng = np.random.default_rng(1)
+    coords = np.column_stack((5.6 + rng.uniform(-0.002, 0.016, 50), -0.2 + rng.uniform(-0.002, 0.016, 50)))
+
+    nodes, distances = graph.snap(coords)
+
+    brute = haversine_matrix(coords, np.column_stack((graph.lat, graph.lng)))
+    np.testing.assert_allclose(distances, brute.min(axis=1), rtol=1e-9)
+    assert (brute[np.arange(len(coords)), nodes] == brute.min(axis=1)).all()
+    # Too far from any road to snap
+    assert graph.snap([(7.0, 1.0)], max_distance=1000)[0].tolist() == [-1]
+
+
+def test_member_travel_times_fall_back_to_walking_off_the_graph():
+    lat, lng, sources, targets, weights = _grid_graph()
+    graph = RoadGraph.from_edges(lat, lng, sources, targets, weights)
+    places = np.array([[5.6, -0.2], [np.nan, np.nan], [7.0, 1.0]])
+    members = [(5.614, -0.186), (5.6, -0.2)]
+
+    times = member_travel_times(graph, places, members)
+
+    assert times.shape == (3, 2)
+    assert times[0, 1] == 0.0
+    assert np.isnan(times[1]).all()
+    # Nowhere near the network: costed as a walk over the great-circle distance
+    np.testing.assert_allclose(times[2], haversine_matrix(places[2:], members)[0] / ACCESS_SPEED)
@@ -0,0 +1,111 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.controllers.suggestion_controller import SuggestionController, minhash_signatures, preference_tokens
+from app.models import Ambiance, Cuisine, DietaryRestriction, BudgetPreference, user_ambiance, user_cuisine, \
+    user_dietary, user_budget
+
+# (model, association table, column, preferences in the table)
+CATEGORIES = (
+    (Ambiance, user_ambiance, 'ambiance_id', 10),
+    (Cuisine, user_cuisine, 'cuisine_id', 30),
+    (DietaryRestriction, user_dietary, 'dietary_id', 6),
+    (BudgetPreference, user_budget, 'budget_id', 4),
+)
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def test_estimates_follow_jaccard_across_categories():
+    rng = random.Random(21)
+    # Small IDs shared by every category, so tokens differ only in their category
+    sets = [
+        {(rng.randrange(4), rng.randint(1, 8)) for _ in range(rng.randint(3, 12))}
+        for _ in range(60)
+    ]
+    owners = [owner for owner, tokens in enumerate(sets) for _ in tokens]
+    categories, ids = zip(*[token for tokens in sets for token in tokens])
+    _, signatures = minhash_signatures(owners, preference_tokens(categories, ids), 256)
+
+    errors = []
+    for first in range(len(sets)):
+        for second in range(first + 1, len(sets)):
+            estimate = (signatures[first] == signatures[second]).mean()
+            errors.append(abs(estimate - _jaccard(sets[first], sets[second])))
+    # 256 hash functions: a standard error of at most 1/32 per pair
+    assert np.mean(errors) < 0.03
+    assert max(errors) < 0.2
+
+    # The same IDs in different categories share nothing
+    _, signatures = minhash_signatures([0, 0, 1, 1], preference_tokens([0, 1, 1, 0], [1, 2, 1, 2]), 128)
+    assert (signatures[0] == signatures[1]).mean() == 0.0
+
+
+@pytest.fixture
+def preference_users(db, make_users):
+    """300 users drawn from a few dozen taste profiles, indexed; returns {user id: token set}."""
+    rng = random.Random(7)
+    for model, _, _, size in CATEGORIES:
+        db.session.execute(model.__table__.insert(), [{'name': f'{model.__name__}{i}'} for i in range(size)])
+    users = make_users([None] * 300)
+
+    profiles = [[rng.sample(range(1, size + 1), k) for (_, _, _, size), k in zip(CATEGORIES, (3, 5, 1, 1))]
+                for _ in range(40)]
+    sets = {}
+    rows = {index: [] for index in range(len(CATEGORIES))}
+    for user in users:
+        profile = rng.choice(profiles)
+        tokens = set()
+        for index, ((_, _, column, size), chosen) in enumerate(zip(CATEGORIES, profile)):
+            picked = {value for value in chosen if rng.random() > 0.2}
+            if rng.random() < 0.3:
+                picked.add(rng.randint(1, size))
+            rows[index] += [{'user_id': user.id, column: value} for value in picked]
+            tokens |= {(index, value) for value in picked}
+        sets[user.id] = tokens
+    for index, (_, table, _, _) in enumerate(CATEGORIES):
+        db.session.execute(table.insert(), rows[index])
+    db.session.commit()
+    SuggestionController.rebuild()
+    return sets
+
+
+def test_similar_users_match_brute_force(preference_users):
+    rng = random.Random(1)
+    strong, found_strong = 0, 0
+    for user_id in rng.sample(sorted(preference_users), 60):
+        mine = preference_users[user_id]
+        exact = sorted(
+            ((_jaccard(mine, tokens), other) for other, tokens in preference_users.items() if other != user_id),
+            reverse=True
+        )[:10]
+        found = SuggestionController.similar_users(user_id, limit=10)
+
+        # Reported similarities are exact, best first
+        for user, similarity in found:
+            assert similarity == pytest.approx(_jaccard(mine, preference_users[user.id]))
+        assert [similarity for _, similarity in found] == sorted((similarity for _, similarity in found), reverse=True)
+
+        # With 16 bands of 4 rows a user 70% alike shares a bucket with probability 0.99;
+        # weaker matches are found on a best effort basis
+        found_ids = {user.id for user, _ in found}
+        matches = [other for similarity, other in exact if similarity >= 0.7]
+        strong += len(matches)
+        found_strong += sum(other in found_ids for other in matches)
+    assert strong and found_strong / strong >= 0.95
+
+
+def test_suggestion_routes_require_login(app, preference_users):
+    client = app.test_client()
+    assert client.get('/suggestions/users').status_code == 401
+    assert client.get('/suggestions/groups').status_code == 401
+
+    with client.session_transaction() as session:
+        session['user_id'] = min(preference_users)
+    response = client.get('/suggestions/users?limit=5')
+    assert response.status_code == 200
+    assert 0 < len(response.get_json()) <= 5
@@ -33,3 +33,18 @@ def parse_lat_long(lat_long_str):
         raise ValueError("Invalid input for latitude and longitude. Please use the format 'lat, long'") from e
 
 
+
+
+def to_lat_lng(location):
+    """
+    Normalizes a location into a (latitude, longitude) tuple.
+
+    Parameters:
+    - location: A (lat, lng) sequence or a dict with 'latitude'/'longitude' keys.
+
+    Returns:
+    - A tuple containing (latitude, longitude) as floats.
+    """
+    if isinstance(location, dict):
+        return float(location['latitude']), float(location['longitude'])
+    return float(location[0]), float(location[1])
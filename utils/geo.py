@@ -0,0 +1,131 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8  # Mean Earth radius in meters
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance between two points.
+
+    Parameters:
+    - lat1, lng1: Coordinates of the first point in degrees.
+    - lat2, lng2: Coordinates of the second point in degrees.
+
+    Returns:
+    - The distance in meters.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius):
+    """
+    Computes a lat/lng box that contains every point within a radius.
+
+    Parameters:
+    - lat, lng: Center of the search in degrees.
+    - radius: Search radius in meters.
+
+    Returns:
+    - A tuple of (min_lat, max_lat, min_lng, max_lng) in degrees. Near the
+      poles, or when the box crosses the antimeridian, the longitude range
+      is widened to the full [-180, 180].
+    """
+    d_lat = math.degrees(radius / EARTH_RADIUS_M)
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    d_lng = math.degrees(radius / (EARTH_RADIUS_M * math.cos(math.radians(lat))))
+    min_lng, max_lng = lng - d_lng, lng + d_lng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def to_unit_vectors(coords):
+    """
+    Converts an (N, 2) array of (lat, lng) degrees into (N, 3) unit vectors.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    lat = np.radians(coords[:, 0])
+    lng = np.radians(coords[:, 1])
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def from_unit_vector(vector):
+    """
+    Converts a 3D vector back into a (lat, lng) tuple in degrees.
+
+    The vector does not need to be normalized.
+    """
+    x, y, z = vector
+    lat = math.degrees(math.atan2(z, math.hypot(x, y)))
+    lng = math.degrees(math.atan2(y, x))
+    return lat, lng
+
+
+def angular_distances(vectors, point):
+    """
+    Central angles in radians between each row of an (N, 3) unit vector array and a unit vector.
+    """
+    # arctan2 of cross and dot stays accurate for both tiny and near-antipodal angles
+    cross = np.linalg.norm(np.cross(vectors, point), axis=1)
+    return np.arctan2(cross, vectors @ point)
+
+
+def haversine_matrix(coords_a, coords_b):
+    """
+    Pairwise great-circle distances between two sets of points.
+
+    Parameters:
+    - coords_a: (N, 2) array of (lat, lng) degrees.
+    - coords_b: (M, 2) array of (lat, lng) degrees.
+
+    Returns:
+    - An (N, M) float64 array of distances in meters.
+    """
+    a = np.radians(np.asarray(coords_a, dtype=np.float64))
+    b = np.radians(np.asarray(coords_b, dtype=np.float64))
+    lat_a, lng_a = a[:, 0:1], a[:, 1:2]
+    lat_b, lng_b = b[:, 0], b[:, 1]
+    h = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lng_b - lng_a) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def distance_matrix(coords_a, coords_b):
+    """
+    Pairwise great-circle distances computed with a single matrix multiply.
+
+    Chord lengths come from the squared norms and dot products of the unit
+    vectors taken relative to the mean of all points, and the central angle
+    is 2 * arctan2(chord, sqrt(4 - chord^2)). Working relative to the mean
+    keeps the dot products small, so nearby points do not lose the chord to
+    rounding the way the arccos of a plain dot product does (about 10 cm
+    error for points a few meters apart). For points spread over a city the
+    error is below a millimeter; it grows towards that of the arccos form as
+    the spread approaches a hemisphere. The only per-pair trigonometry is
+    one arctan2, so it is faster than haversine_matrix on large inputs.
+
+    Parameters:
+    - coords_a: (N, 2) array of (lat, lng) degrees.
+    - coords_b: (M, 2) array of (lat, lng) degrees.
+
+    Returns:
+    - An (N, M) float64 array of distances in meters.
+    """
+    a = to_unit_vectors(coords_a)
+    b = to_unit_vectors(coords_b)
+    if len(a) and len(b):
+        origin = np.vstack((a, b)).mean(axis=0)
+        a -= origin
+        b -= origin
+    squared = np.einsum('ij,ij->i', a, a)[:, np.newaxis] + np.einsum('ij,ij->i', b, b) - 2 * (a @ b.T)
+    np.clip(squared, 0.0, 4.0, out=squared)
+    angle = np.arctan2(np.sqrt(squared), np.sqrt(4.0 - squared))
+    return 2 * EARTH_RADIUS_M * angle
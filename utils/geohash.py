@@ -0,0 +1,80 @@
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Sorts after every geohash character, so [prefix, prefix + PREFIX_END) spans all hashes with that prefix
+PREFIX_END = '~'
+
+
+def encode(lat, lng, precision=9):
+    """
+    Encodes a location as a geohash.
+
+    Parameters:
+    - lat, lng: Coordinates in degrees.
+    - precision: Number of geohash characters; 9 characters is about 5m.
+
+    Returns:
+    - The geohash string. Hashes sharing a prefix lie in the same cell, so
+      a prefix range scan on an indexed column finds every point in a cell.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bit, value, even = 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, longitude first
+        bounds, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (bounds[0] + bounds[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            bounds[0] = middle
+        else:
+            value <<= 1
+            bounds[1] = middle
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[value])
+            bit, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Height and width in degrees of a geohash cell at a precision."""
+    bits = 5 * precision
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def covering_cells(min_lat, max_lat, min_lng, max_lng, max_cells=16, max_precision=9):
+    """
+    Finds geohash cells that together cover a bounding box.
+
+    The finest precision whose covering needs at most max_cells cells is
+    used, which keeps the number of index range scans small while the
+    covered area stays close to the box.
+
+    Returns:
+    - A sorted list of geohash prefixes.
+    """
+    for precision in range(max_precision, 0, -1):
+        cell_lat, cell_lng = cell_size(precision)
+        lat_start = math.floor((min_lat + 90.0) / cell_lat)
+        lat_stop = math.floor((min(max_lat, 90.0 - 1e-12) + 90.0) / cell_lat)
+        lng_start = math.floor((min_lng + 180.0) / cell_lng)
+        lng_stop = math.floor((min(max_lng, 180.0 - 1e-12) + 180.0) / cell_lng)
+        if (lat_stop - lat_start + 1) * (lng_stop - lng_start + 1) <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    for lat_index in range(lat_start, lat_stop + 1):
+        for lng_index in range(lng_start, lng_stop + 1):
+            # Encoding each cell's center yields that cell's hash
+            cells.add(encode(
+                -90.0 + (lat_index + 0.5) * cell_lat,
+                -180.0 + (lng_index + 0.5) * cell_lng,
+                precision
+            ))
+    return sorted(cells)